@@ -0,0 +1 @@
+"""Micro-benchmarks for the OptiAttack core and client."""
@@ -0,0 +1,61 @@
+"""
+Measure the cost of sampling the archive as in the MIO loop, for archives from long runs.
+
+Fills an archive with improving individuals and times sample_individual, archiving an improvement
+from the sampled parent every --improvement-interval samples, which resets its sampling counter.
+Run from the repository root::
+
+    python -m benchmarks.archive_sampling_benchmark --sizes 10000 100000 --samples 10000
+"""
+import argparse
+import time
+
+from core.search.evaluated_individual import EvaluatedIndividual
+from core.search.fitness_value import FitnessValue
+from core.search.individual import Individual
+from core.search.phase_controller import PhaseController
+from core.search.service.archive import Archive
+from core.search.service.randomness import Randomness
+from core.search.service.search_time_controller import SearchTimeController
+from core.utils.label_table import LabelTable
+
+
+def fill_archive(size: int) -> Archive:
+    """Return an archive of the given number of individuals, each improving on the previous one."""
+    stc = SearchTimeController({}, pc=PhaseController())
+    archive = Archive(stc, Randomness({"seed": 0}), {}, LabelTable())
+    stc.set_current_fitness(FitnessValue(float(size + 1), []))
+    for i in range(size):
+        archive.add_archive_if_needed(EvaluatedIndividual(Individual(), FitnessValue(float(size - i), [])))
+    return archive
+
+
+def run(size: int, samples: int, improvement_interval: int) -> float:
+    """Run the benchmark for an archive size and return the microseconds per sample."""
+    archive = fill_archive(size)
+    fitness = archive.stc.get_current_fitness_value()
+
+    start = time.perf_counter()
+    for i in range(samples):
+        parent = archive.sample_individual()
+        if i % improvement_interval == 0:
+            fitness -= 1e-6
+            archive.add_archive_if_needed(EvaluatedIndividual(Individual(), FitnessValue(fitness, [])), parent)
+    return (time.perf_counter() - start) * 1e6 / samples
+
+
+def main():
+    """Run the benchmark for all sizes and print a summary table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--samples", type=int, default=10000)
+    parser.add_argument("--improvement-interval", type=int, default=100)
+    args = parser.parse_args()
+
+    print(f"{'archive size':>12} {'us/sample':>12}")
+    for size in args.sizes:
+        print(f"{size:>12} {run(size, args.samples, args.improvement_interval):>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
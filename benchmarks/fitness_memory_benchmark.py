@@ -0,0 +1,90 @@
+"""
+Measure the memory kept per evaluated individual for the ways of storing its predictions.
+
+Evaluates individuals of a few actions against a NUT with many classes and keeps them, as the
+archive and the GA populations do, storing the predictions as a list of Label objects, as the
+dense float64 score vector of the NUT response, as a compact float32 array or as its top-k scores.
+Reports the allocated and the resident memory per individual, each mode in a fresh process.
+Run from the repository root::
+
+    python -m benchmarks.fitness_memory_benchmark --classes 1000 --individuals 5000
+"""
+import argparse
+import gc
+import multiprocessing
+import os
+import resource
+import tracemalloc
+
+import numpy as np
+
+from core.search.action import Action
+from core.search.evaluated_individual import EvaluatedIndividual
+from core.search.fitness_value import FitnessValue
+from core.search.individual import Individual
+from core.utils.label import Label
+from core.utils.label_table import LabelTable
+from core.utils.nut_request import NutRequest
+
+MODES = {
+    "label list": lambda result: [Label(label.label, label.value) for label in result.predictions],
+    "float64 dense": lambda result: result.predictions,
+    "float32 dense": lambda result: result.get_predictions(),
+    "float32 top-10": lambda result: result.get_predictions(top_k=10),
+}
+
+
+def resident_bytes() -> int:
+    """Return the resident memory of the process in bytes."""
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * resource.getpagesize()
+
+
+def evaluate(classes: int, individuals: int, store) -> list[EvaluatedIndividual]:
+    """Evaluate random individuals on random scores and keep them with their stored predictions."""
+    rng = np.random.default_rng(0)
+    labels = [f"class_{i}" for i in range(classes)]
+    label_table = LabelTable(labels)
+    evaluated = []
+    for _ in range(individuals):
+        individual = Individual()
+        for x, y in rng.integers(0, 224, (10, 2)).tolist():
+            individual.add_action(Action((x, y), 1, 2, 3))
+        result = NutRequest.from_scores(labels, rng.random(classes), label_table=label_table)
+        evaluated.append(EvaluatedIndividual(individual, FitnessValue(0.5, store(result))))
+    return evaluated
+
+
+def run(classes: int, individuals: int, mode: str) -> tuple[float, float]:
+    """Return the allocated and the resident bytes per evaluated individual of a storage mode."""
+    gc.collect()
+    rss = resident_bytes()
+    tracemalloc.start()
+    evaluated = evaluate(classes, individuals, MODES[mode])
+    gc.collect()
+    allocated = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    resident = resident_bytes() - rss
+    del evaluated
+    return allocated / individuals, resident / individuals
+
+
+def main():
+    """Run the benchmark for all storage modes and print a summary table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--classes", type=int, default=1000)
+    parser.add_argument("--individuals", type=int, default=5000)
+    args = parser.parse_args()
+
+    print(f"{'predictions':>16} {'allocated B/ind':>16} {'resident B/ind':>16}")
+    for mode in MODES:
+        # A fresh process per mode, so the memory freed by the previous mode is not reused
+        with multiprocessing.get_context("spawn").Pool(1) as pool:
+            allocated, resident = pool.apply(run, (args.classes, args.individuals, mode))
+        print(f"{mode:>16} {allocated:>16.0f} {resident:>16.0f}")
+
+
+if __name__ == "__main__":
+    if not os.path.exists("/proc/self/statm"):
+        raise SystemExit("The resident memory is read from /proc/self/statm")
+    main()
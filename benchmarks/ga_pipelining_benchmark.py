@@ -0,0 +1,91 @@
+"""
+Measure the GA throughput with one evaluation at a time, with batch requests and with pipelining.
+
+Starts a collect_info server wrapping a 1000-class dummy model that takes --model-latency
+milliseconds per call, as a GPU model or a remote NUT would, once as is and once grouping up to
+--in-flight concurrent requests in one call. Runs GA generations against them and reports the
+milliseconds per evaluation. Pipelining only pays off when the NUT time is latency that concurrent requests can
+share; with a model that answers instantly the extra event loop makes it slower. Run from the
+repository root::
+
+    python -m benchmarks.ga_pipelining_benchmark --model-latency 20 --in-flight 4 --generations 3
+"""
+import argparse
+import time
+from functools import partial
+
+from benchmarks.utils import create_container, dummy_model, random_image, wait_for_server
+from client.core.optiattack_client import collect_info
+from core.utils.application import configure_container
+from core.utils.images import ProcessedImage
+
+HOST = "localhost"
+PORT = 38102
+# Serves the same model grouping concurrent requests in one call
+BATCHING_PORT = 38103
+
+
+def latency_model(image_array, additional_data=None, latency=0.0):
+    """Return the dummy predictions after waiting for the model latency, once per call, for one or several images."""
+    time.sleep(latency)
+    if additional_data and "batch_size" in additional_data:
+        return {"predictions": [dummy_model(image)["predictions"] for image in image_array]}
+    return dummy_model(image_array)
+
+
+def modes(in_flight: int):
+    """Return the name and the configuration of each benchmarked mode."""
+    return [
+        ("sequential", {"nut_port": PORT, "max_in_flight": 1, "batch_evaluation": False}),
+        ("pair batches", {"nut_port": PORT, "max_in_flight": 1, "batch_evaluation": True}),
+        (f"pipelined x{in_flight}", {"nut_port": PORT, "max_in_flight": in_flight, "batch_evaluation": False}),
+        (f"pipelined x{in_flight} + NUT batching",
+         {"nut_port": BATCHING_PORT, "max_in_flight": in_flight, "batch_evaluation": False}),
+    ]
+
+
+def run(config: dict, population_size: int, generations: int) -> float:
+    """Run GA generations with a configuration and return the milliseconds per evaluation."""
+    container = create_container({"nut_host": HOST, "wire_format": "binary", "seed": 0,
+                                  "algorithm": "genetic", "population_size": population_size,
+                                  "fitness_cache_size": 0, **config})
+    configure_container(container)
+    image = random_image()
+    archive = container.archive()
+    archive.set_image(ProcessedImage(None, None, image))
+    archive.set_original_prediction_results(container.remote_controller().run_nut(image))
+    container.stc().start_search()
+    algorithm = container.algorithm()
+    algorithm.setup_before_search()
+
+    start = time.perf_counter()
+    for _ in range(generations):
+        algorithm.search_once()
+    elapsed = time.perf_counter() - start
+
+    container.remote_controller().stop_nut()
+    return elapsed * 1000 / (2 * population_size * generations)
+
+
+def main():
+    """Run the benchmark for all modes and print a summary table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--model-latency", type=float, default=20.0, help="Model latency per call in ms")
+    parser.add_argument("--in-flight", type=int, default=4)
+    parser.add_argument("--population-size", type=int, default=20)
+    parser.add_argument("--generations", type=int, default=3)
+    args = parser.parse_args()
+
+    model = partial(latency_model, latency=args.model_latency / 1000)
+    collect_info(host=HOST, port=PORT)(model)
+    collect_info(host=HOST, port=BATCHING_PORT, max_batch_size=args.in_flight)(model)
+    wait_for_server(HOST, PORT)
+    wait_for_server(HOST, BATCHING_PORT)
+
+    print(f"{'mode':<32} {'ms/eval':>9}")
+    for name, config in modes(args.in_flight):
+        print(f"{name:<32} {run(config, args.population_size, args.generations):>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Measure the cost of the GA parent selection of one generation, for growing populations.
+
+Times GeneticAlgorithm.selection, which draws the partners of the whole population from
+probabilities computed once per generation, against the former selection, which recomputed the
+softmax over the population and copied the selected parent for every individual.
+Run from the repository root::
+
+    python -m benchmarks.ga_selection_benchmark --sizes 10 100 1000 10000
+"""
+import argparse
+import time
+from unittest.mock import MagicMock
+
+import numpy as np
+
+from core.search.algorithms.genetic_algorithm import GeneticAlgorithm
+from core.search.evaluated_individual import EvaluatedIndividual
+from core.search.fitness_value import FitnessValue
+from core.search.individual import Individual
+from core.search.service.randomness import Randomness
+
+
+def per_parent_selection(algorithm: GeneticAlgorithm) -> list[EvaluatedIndividual]:
+    """Select the partners of a generation as the GA did before, one softmax per parent."""
+    partners = []
+    for parent1 in algorithm.population:
+        all_fitnesses = np.array([ind.fitness.value for ind in algorithm.population])
+        scaled_fitness = 1.0 - all_fitnesses
+        selection_probs = np.exp(scaled_fitness) / np.sum(np.exp(scaled_fitness))
+        selected = algorithm.randomness.get_random_element(algorithm.population, selection_probs=selection_probs)
+        while parent1 is selected:
+            selected = algorithm.randomness.get_random_element(algorithm.population, selection_probs=selection_probs)
+        partners.append(selected.copy())
+    return partners
+
+
+def run(size: int, max_seconds: float) -> dict:
+    """Run the benchmark for a population size and return the milliseconds per generation."""
+    randomness = Randomness({"seed": 0})
+    algorithm = GeneticAlgorithm(MagicMock(), randomness, MagicMock(), MagicMock(), {}, MagicMock(), MagicMock(),
+                                 MagicMock(), MagicMock())
+    fitness = randomness.next_floats(size).tolist()
+    algorithm.population = [EvaluatedIndividual(Individual(), FitnessValue(value, [])) for value in fitness]
+
+    results = {}
+    for name, select in (("per parent", per_parent_selection), ("per generation", GeneticAlgorithm.selection)):
+        generations = 0
+        start = time.perf_counter()
+        while generations == 0 or time.perf_counter() - start < max_seconds:
+            select(algorithm)
+            generations += 1
+        results[name] = (time.perf_counter() - start) * 1000 / generations
+    return results
+
+
+def main():
+    """Run the benchmark for all population sizes and print a summary table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--max-seconds", type=float, default=1.0)
+    args = parser.parse_args()
+
+    results = {size: run(size, args.max_seconds) for size in args.sizes}
+    modes = list(next(iter(results.values())))
+    print(f"{'population':>10} " + " ".join(f"{mode + ' ms':>18}" for mode in modes) + f" {'speedup':>8}")
+    for size, result in results.items():
+        speedup = result["per parent"] / result["per generation"]
+        print(f"{size:>10} " + " ".join(f"{result[mode]:>18.3f}" for mode in modes) + f" {speedup:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Measure the cost of building, copying and applying individuals and of the basic Action operations.
+
+Samples individuals of increasing size with add_action, as the samplers do, and reports the time of
+add_action for the whole individual, of Individual.copy, of a mutation of one action, of
+get_action_image and of hashing and comparing the actions. Run from the repository root::
+
+    python -m benchmarks.individual_benchmark --sizes 10 100 1000 --repeat 20
+"""
+import argparse
+import timeit
+
+import numpy as np
+
+from benchmarks.utils import IMAGE_SHAPE
+from core.search.action import Action
+from core.search.individual import Individual
+
+
+def random_actions(size: int, seed: int = 0) -> list[Action]:
+    """Return random actions inside the benchmark image."""
+    rng = np.random.default_rng(seed)
+    locations = rng.integers(0, IMAGE_SHAPE[:2], (size, 2))
+    colors = rng.integers(0, 256, (size, 3))
+    return [Action((int(x), int(y)), *(int(c) for c in color)) for (x, y), color in zip(locations, colors)]
+
+
+def build(actions: list[Action]) -> Individual:
+    """Build an individual like the samplers, skipping the actions at an occupied location."""
+    individual = Individual()
+    for action in actions:
+        individual.add_action(action, replace=False)
+    return individual
+
+
+def mutate(individual: Individual) -> Individual:
+    """Copy the individual and change the color of one action, like the mutators."""
+    mutated = individual.copy()
+    index = mutated.size() // 2
+    mutated.set_action(index, mutated.get_action(index).with_color((1, 2, 3)))
+    return mutated
+
+
+def run(size: int, repeat: int) -> dict:
+    """Run the benchmark for an individual size and return the milliseconds per call of each operation."""
+    actions = random_actions(size)
+    individual = build(actions)
+    image = np.zeros(IMAGE_SHAPE, dtype=np.uint8)
+    others = random_actions(size, seed=1)
+
+    operations = {
+        "add_action": lambda: build(actions),
+        "copy": individual.copy,
+        "mutate": lambda: mutate(individual),
+        "action_image": lambda: individual.get_action_image(image),
+        "hash+eq": lambda: [hash(a) == hash(b) and a == b for a, b in zip(actions, others)],
+        "get_color": lambda: [action.get_color() for action in actions],
+    }
+    return {name: timeit.timeit(operation, number=repeat) * 1000 / repeat for name, operation in operations.items()}
+
+
+def main():
+    """Run the benchmark for all sizes and print a summary table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    results = {size: run(size, args.repeat) for size in args.sizes}
+    operations = list(next(iter(results.values())))
+    print(f"{'actions':>8} " + " ".join(f"{name + ' ms':>16}" for name in operations))
+    for size, result in results.items():
+        print(f"{size:>8} " + " ".join(f"{result[name]:>16.3f}" for name in operations))
+
+
+if __name__ == "__main__":
+    main()
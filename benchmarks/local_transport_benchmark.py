@@ -0,0 +1,77 @@
+"""
+Compare the local Unix-domain-socket transport with the HTTP binary format.
+
+Starts a collect_info server wrapping a 1000-class dummy model on both HTTP and a Unix domain
+socket, and reports the per-evaluation latency of each transport, sequentially and with several
+evaluations in flight. The in-process row calls the same model directly, as the zero-overhead
+baseline. Run from the repository root::
+
+    python -m benchmarks.local_transport_benchmark --evaluations 200 --in-flight 4
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.utils import create_container, dummy_model, random_image, wait_for_server
+from client.core.optiattack_client import collect_info
+from core.utils.application import configure_container
+
+HOST = "localhost"
+PORT = 38101
+SOCKET_PATH = os.path.join(tempfile.gettempdir(), "optiattack-benchmark.sock")
+
+
+def transports(in_flight: int):
+    """Return the name and the configuration of each benchmarked transport."""
+    http = {"nut_host": HOST, "nut_port": PORT, "wire_format": "binary"}
+    local = {"nut_socket": SOCKET_PATH}
+    return [
+        ("http", {**http, "max_in_flight": 1}),
+        (f"http x{in_flight}", {**http, "max_in_flight": in_flight}),
+        ("socket", {**local, "max_in_flight": 1}),
+        (f"socket x{in_flight}", {**local, "max_in_flight": in_flight}),
+        ("in-process", {"nut_module": "benchmarks.utils:dummy_model"}),
+    ]
+
+
+def run(config: dict, evaluations: int):
+    """Run the benchmark for a transport and return the latency of a single evaluation in milliseconds."""
+    container = create_container(config)
+    configure_container(container)
+    remote_controller = container.remote_controller()
+
+    image = random_image()
+    remote_controller.run_nut(image)
+    # warm up the connection and the label table
+    remote_controller.new_action(image)
+    images = [random_image(i) for i in range(evaluations)]
+
+    start = time.perf_counter()
+    # The controllers bound the evaluations in flight themselves
+    futures = [remote_controller.submit_new_action(image) for image in images]
+    for future in futures:
+        future.result()
+    elapsed = time.perf_counter() - start
+
+    remote_controller.stop_nut()
+    return elapsed * 1000 / evaluations
+
+
+def main():
+    """Run the benchmark for all transports and print a summary table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--evaluations", type=int, default=200)
+    parser.add_argument("--in-flight", type=int, default=4)
+    args = parser.parse_args()
+
+    collect_info(host=HOST, port=PORT, socket_path=SOCKET_PATH)(dummy_model)
+    wait_for_server(HOST, PORT)
+
+    print(f"{'transport':<12} {'ms/eval':>9}")
+    for name, config in transports(args.in_flight):
+        print(f"{name:<12} {run(config, args.evaluations):>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Measure the cost of mutating a population one individual at a time and with a batch mutation.
+
+Mutates K individuals with mutate, one call each, and with a single mutate_batch call, for the
+standard and the one/zero mutators. Run from the repository root::
+
+    python -m benchmarks.mutation_benchmark --sizes 10 100 1000 --repeat 20
+"""
+import argparse
+import timeit
+from unittest.mock import MagicMock
+
+from benchmarks.individual_benchmark import build, random_actions
+from benchmarks.utils import IMAGE_SHAPE
+from core.search.service.mutator.one_zero_mutator import OneZeroMutator
+from core.search.service.mutator.standard_mutator import StandardMutator
+from core.search.service.randomness import Randomness
+
+MUTATORS = {"standard": StandardMutator, "one/zero": OneZeroMutator}
+
+
+def create_mutator(mutator_class):
+    """Create a mutator for the benchmark image with fixed sigmas."""
+    config = {"seed": 0, "image_height": IMAGE_SHAPE[0], "image_width": IMAGE_SHAPE[1],
+              "one_mutation_rate": 0.1, "zero_mutation_rate": 0.1}
+    apc = MagicMock(get_pixel_apc=MagicMock(return_value=20.0), get_location_apc=MagicMock(return_value=2.0))
+    return mutator_class(Randomness(config), MagicMock(), config, apc)
+
+
+def run(size: int, repeat: int) -> dict:
+    """Run the benchmark for a population size and return the milliseconds per population mutation."""
+    population = [build(random_actions(20, seed)) for seed in range(size)]
+    results = {}
+    for name, mutator_class in MUTATORS.items():
+        mutator = create_mutator(mutator_class)
+        results[f"{name} loop"] = timeit.timeit(lambda: [mutator.mutate(i) for i in population], number=repeat)
+        results[f"{name} batch"] = timeit.timeit(lambda: mutator.mutate_batch(population), number=repeat)
+    return {name: seconds * 1000 / repeat for name, seconds in results.items()}
+
+
+def main():
+    """Run the benchmark for all population sizes and print a summary table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    results = {size: run(size, args.repeat) for size in args.sizes}
+    operations = list(next(iter(results.values())))
+    print(f"{'population':>10} " + " ".join(f"{name + ' ms':>18}" for name in operations))
+    for size, result in results.items():
+        print(f"{size:>10} " + " ".join(f"{result[name]:>18.3f}" for name in operations))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Measure the cost of the scalar random draws of the search loop.
+
+Times next_bool, next_int and random_gaussian on a Randomness drawing each value with its own
+generator call and with pools of pre-drawn values, against the legacy global np.random functions.
+Run from the repository root::
+
+    python -m benchmarks.randomness_benchmark --draws 100000 --pool-sizes 0 1024
+"""
+import argparse
+import timeit
+
+import numpy as np
+
+from core.search.service.randomness import Randomness
+
+LEGACY = {
+    "next_bool": lambda: np.random.rand() < 0.3,
+    "next_int": lambda: np.random.randint(0, 224),
+    "random_gaussian": lambda: np.random.normal(0, 2.0),
+}
+
+
+def operations(randomness: Randomness) -> dict:
+    """Return the timed scalar draws of a Randomness."""
+    return {
+        "next_bool": lambda: randomness.next_bool(0.3),
+        "next_int": lambda: randomness.next_int(0, 224),
+        "random_gaussian": lambda: randomness.random_gaussian(0, 2.0),
+    }
+
+
+def main():
+    """Run the benchmark for the legacy draws and all pool sizes and print a summary table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--draws", type=int, default=100000)
+    parser.add_argument("--pool-sizes", type=int, nargs="+", default=[0, 1024])
+    args = parser.parse_args()
+
+    modes = {"legacy np.random": LEGACY}
+    for pool_size in args.pool_sizes:
+        modes[f"pool {pool_size}"] = operations(Randomness({"seed": 0, "random_pool_size": pool_size}))
+
+    print(f"{'draws':>18} " + " ".join(f"{name + ' ns':>20}" for name in LEGACY))
+    for mode, draws in modes.items():
+        times = [timeit.timeit(draw, number=args.draws) * 1e9 / args.draws for draw in draws.values()]
+        print(f"{mode:>18} " + " ".join(f"{value:>20.0f}" for value in times))
+
+
+if __name__ == "__main__":
+    main()
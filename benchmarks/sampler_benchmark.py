@@ -0,0 +1,50 @@
+"""
+Measure the cost of sampling individuals one action at a time and with the vectorized sampling.
+
+Samples individuals of a fixed number of actions with the random sampler, drawing and retrying one
+action at a time, as without vectorized_sampling, and with one sampling without replacement of the
+pixels per individual. The cost of the retries grows as the number of actions approaches the number
+of pixels. Run from the repository root::
+
+    python -m benchmarks.sampler_benchmark --image-size 64 --actions 10 100 1000 4000 --individuals 20
+"""
+import argparse
+import timeit
+from unittest.mock import MagicMock
+
+from core.search.service.randomness import Randomness
+from core.search.service.sampler.random_sampler import RandomSampler
+
+
+def run(image_size: int, actions: int, individuals: int) -> dict:
+    """Run the benchmark for a number of actions and return the milliseconds per individual."""
+    results = {}
+    for mode, vectorized in (("loop", False), ("vectorized", True), ("vectorized batch", True)):
+        config = {"seed": 0, "image_height": image_size, "image_width": image_size, "min_action_size": actions,
+                  "max_action_size": actions, "vectorized_sampling": vectorized}
+        sampler = RandomSampler(Randomness(config), MagicMock(), config)
+        if mode == "vectorized batch":
+            seconds = timeit.timeit(lambda: sampler.sample_batch(individuals), number=1)
+        else:
+            seconds = timeit.timeit(sampler.sample, number=individuals)
+        results[mode] = seconds * 1000 / individuals
+    return results
+
+
+def main():
+    """Run the benchmark for all numbers of actions and print a summary table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--image-size", type=int, default=64)
+    parser.add_argument("--actions", type=int, nargs="+", default=[10, 100, 1000, 4000])
+    parser.add_argument("--individuals", type=int, default=20)
+    args = parser.parse_args()
+
+    results = {actions: run(args.image_size, actions, args.individuals) for actions in args.actions}
+    modes = list(next(iter(results.values())))
+    print(f"{'actions':>8} " + " ".join(f"{mode + ' ms':>20}" for mode in modes))
+    for actions, result in results.items():
+        print(f"{actions:>8} " + " ".join(f"{result[mode]:>20.3f}" for mode in modes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Shared helpers for the benchmarks."""
+import time
+
+import numpy as np
+import requests
+
+from core.problem.base_module import BaseModule
+
+IMAGE_SHAPE = (224, 224, 3)
+NUMBER_OF_CLASSES = 1000
+
+
+def dummy_model(image_array, additional_data=None):
+    """Return a deterministic 1000-class prediction list for the provided image."""
+    scores = np.full(NUMBER_OF_CLASSES, 1.0 / NUMBER_OF_CLASSES)
+    scores[int(image_array.reshape(-1)[0]) % NUMBER_OF_CLASSES] += 0.5
+    return {"predictions": [{"label": f"class_{i}", "score": float(score)} for i, score in enumerate(scores)]}
+
+
+def wait_for_server(host, port, timeout=10.0):
+    """Block until the collect_info server answers on the provided address."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            requests.get(f"http://{host}:{port}/", timeout=1)
+            return
+        except requests.exceptions.ConnectionError:
+            time.sleep(0.1)
+    raise TimeoutError(f"Server at {host}:{port} did not start in {timeout}s")
+
+
+def create_container(config: dict) -> BaseModule:
+    """Create a container with the default parameters overridden by the provided ones."""
+    container = BaseModule()
+    parameters = container.config_parser().default_params().copy()
+    parameters.update(config)
+    container.config.override(parameters)
+    return container
+
+
+def random_image(seed: int = 0) -> np.ndarray:
+    """Return a random uint8 image with the benchmark shape."""
+    return np.random.default_rng(seed).integers(0, 256, IMAGE_SHAPE, dtype=np.uint8)
+
+
+class ByteCounter:
+
+    """Count request and response body bytes of a requests.Session through a response hook."""
+
+    def __init__(self, session: requests.Session):
+        """Register the hook on the session."""
+        self.sent = 0
+        self.received = 0
+        self.requests = 0
+        session.hooks["response"].append(self.hook)
+
+    def hook(self, response, *args, **kwargs):
+        """Accumulate the body sizes of a response and its request."""
+        body = response.request.body or b""
+        self.sent += len(body)
+        self.received += len(response.content)
+        self.requests += 1
+
+    def reset(self):
+        """Reset the counters."""
+        self.sent = self.received = self.requests = 0
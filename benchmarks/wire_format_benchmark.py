@@ -0,0 +1,87 @@
+"""
+Compare the JSON, binary and delta wire formats of the newAction endpoints.
+
+Starts a collect_info server wrapping a 1000-class dummy model and reports the bytes on the wire and
+the per-evaluation latency for each format. The delta format sends a fixed number of perturbed pixels
+per evaluation. The in-process row calls the same model without HTTP, as the zero-overhead baseline.
+Run from the repository root::
+
+    python -m benchmarks.wire_format_benchmark --evaluations 200 --actions 30
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.utils import IMAGE_SHAPE, ByteCounter, create_container, dummy_model, random_image, wait_for_server
+from client.core.optiattack_client import collect_info
+from core.search.action import Action
+from core.utils.application import configure_container
+
+HOST = "localhost"
+PORT = 38100
+IN_PROCESS = "in-process"
+
+
+def random_actions(size: int, seed: int):
+    """Return random actions inside the benchmark image."""
+    rng = np.random.default_rng(seed)
+    return [Action((int(rng.integers(IMAGE_SHAPE[0])), int(rng.integers(IMAGE_SHAPE[1]))),
+                   *(int(c) for c in rng.integers(0, 256, 3)))
+            for _ in range(size)]
+
+
+def run(wire_format: str, evaluations: int, actions: int):
+    """Run the benchmark for a wire format and return the statistics of a single evaluation."""
+    if wire_format == IN_PROCESS:
+        container = create_container({"nut_module": "benchmarks.utils:dummy_model"})
+        configure_container(container)
+    else:
+        container = create_container({"nut_host": HOST, "nut_port": PORT, "wire_format": wire_format})
+    remote_controller = container.remote_controller()
+    counter = ByteCounter(remote_controller.connection)
+
+    image = random_image()
+    remote_controller.run_nut(image)
+    # warm up the connection and the label table
+    remote_controller.new_action(image)
+    counter.reset()
+
+    if wire_format == "delta":
+        payloads = [random_actions(actions, i) for i in range(evaluations)]
+        send = remote_controller.new_action_delta
+    else:
+        payloads = [random_image(i) for i in range(evaluations)]
+        send = remote_controller.new_action
+
+    start = time.perf_counter()
+    for payload in payloads:
+        send(payload)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "sent_bytes": counter.sent / evaluations,
+        "received_bytes": counter.received / evaluations,
+        "latency_ms": elapsed * 1000 / evaluations,
+    }
+
+
+def main():
+    """Run the benchmark for all wire formats and print a summary table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--evaluations", type=int, default=200)
+    parser.add_argument("--actions", type=int, default=30)
+    args = parser.parse_args()
+
+    collect_info(host=HOST, port=PORT)(dummy_model)
+    wait_for_server(HOST, PORT)
+
+    print(f"{'format':<10} {'sent B/eval':>12} {'recv B/eval':>12} {'ms/eval':>9}")
+    for wire_format in ("json", "binary", "delta", IN_PROCESS):
+        result = run(wire_format, args.evaluations, args.actions)
+        print(f"{wire_format:<10} {result['sent_bytes']:>12.0f} {result['received_bytes']:>12.0f} "
+              f"{result['latency_ms']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
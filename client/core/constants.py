@@ -1,8 +1,23 @@
 DEFAULT_CONTROLLER_PORT = 38000
 DEFAULT_CONTROLLER_HOST = 'localhost'
+DEFAULT_MAX_BATCH_SIZE = 1
+DEFAULT_MAX_BATCH_DELAY = 0.005
+DEFAULT_MAX_DELTA_SESSIONS = 4
 BASE_PATH = "/api/v1"
 INFO_NUT_PATH = f"{BASE_PATH}/infoNUT"
 RUN_NUT_PATH = f"{BASE_PATH}/runNUT"
 STOP_NUT_PATH = f"{BASE_PATH}/stopNUT"
 TEST_RESULTS = f"{BASE_PATH}/testResults"
 NEW_ACTION = f"{BASE_PATH}/newAction"
+NEW_ACTION_BATCH = f"{BASE_PATH}/newActionBatch"
+BINARY_CONTENT_TYPE = "application/octet-stream"
+IMAGE_SHAPE_HEADER = "X-Image-Shape"
+IMAGE_DTYPE_HEADER = "X-Image-Dtype"
+TARGET_HEADER = "X-Target"
+LABEL_COUNT_HEADER = "X-Label-Count"
+NEW_ACTION_DELTA = f"{BASE_PATH}/newActionDelta"
+SESSION_HEADER = "X-Session"
+TOP_K_HEADER = "X-Top-K"
+LOCAL_FRAME_HEADER = "!I"
+LOCAL_STATUS_OK = 0
+LOCAL_STATUS_ERROR = 1
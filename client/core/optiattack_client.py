@@ -1,14 +1,23 @@
+import asyncio
 import base64
-from typing import Optional
+import json
+import os
+import socket
+import struct
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+from typing import List, Optional
 
 import numpy as np
 import uvicorn
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request, Response
 from functools import wraps
 import threading
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
 
 try:
     from client.core import constants
@@ -19,10 +28,455 @@ except ImportError:
 class MatrixModel(BaseModel):
     image: str
     target: Optional[str] = None
+    shape: Optional[List[int]] = None
+
+
+class MatrixBatchModel(BaseModel):
+    images: List[str]
+
+
+class LabelTable:
+    """Keeps the order of the labels used by the binary score vectors."""
+
+    def __init__(self):
+        self.labels = []
+        self.index = {}
+
+    def update(self, predictions):
+        for prediction in predictions:
+            if prediction["label"] not in self.index:
+                self.index[prediction["label"]] = len(self.labels)
+                self.labels.append(prediction["label"])
+
+    def to_scores(self, result):
+        predictions = result["predictions"]
+        self.update(predictions)
+        scores = np.zeros(len(self.labels), dtype=np.float32)
+        for prediction in predictions:
+            scores[self.index[prediction["label"]]] = prediction["score"]
+        return scores
+
+    def to_binary_response(self, result):
+        scores = self.to_scores(result)
+        return Response(content=scores.tobytes(),
+                        media_type=constants.BINARY_CONTENT_TYPE,
+                        headers={constants.LABEL_COUNT_HEADER: str(len(self.labels))})
+
+    def to_top_k_response(self, result):
+        """Return the predictions as int32 label ids followed by their float32 scores."""
+        predictions = result["predictions"]
+        self.update(predictions)
+        ids = np.array([self.index[prediction["label"]] for prediction in predictions], dtype=np.int32)
+        scores = np.array([prediction["score"] for prediction in predictions], dtype=np.float32)
+        return Response(content=ids.tobytes() + scores.tobytes(),
+                        media_type=constants.BINARY_CONTENT_TYPE,
+                        headers={constants.LABEL_COUNT_HEADER: str(len(self.labels)),
+                                 constants.TOP_K_HEADER: str(len(predictions))})
+
+
+class DeltaSession:
+    """
+    Base image of an attack session.
+
+    Delta requests only carry the perturbed pixels as (x, y, r, g, b) rows. The image is rebuilt
+    in a reused buffer: the pixels of the previous request are restored from the base image and
+    the new pixels are written on top, so no full-frame copy is made per request.
+    """
+
+    def __init__(self, image):
+        self.base = image
+        self.buffer = image.copy()
+        self.last_locations = None
+        # The buffer must not change while the model reads it
+        self.lock = asyncio.Lock()
+
+    def apply(self, actions):
+        if self.last_locations is not None:
+            self.buffer[self.last_locations] = self.base[self.last_locations]
+        # With repeated locations numpy keeps the last assigned value, i.e. the last action wins
+        self.last_locations = (actions[:, 0], actions[:, 1])
+        self.buffer[self.last_locations] = actions[:, 2:]
+        return self.buffer.reshape(-1)
+
+
+class DeltaSessions:
+    """
+    Delta sessions by id, keeping at most max_sessions of them.
+
+    Every runNUT opens a session holding a full copy of the image under test. The least recently
+    used session is dropped when a new one would exceed the limit, so a client that keeps calling
+    runNUT without stopNUT does not grow the memory of the NUT.
+    """
+
+    def __init__(self, max_sessions=constants.DEFAULT_MAX_DELTA_SESSIONS):
+        self.max_sessions = max_sessions
+        self.sessions = OrderedDict()
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def add(self, image):
+        session = uuid.uuid4().hex
+        self.sessions[session] = DeltaSession(image)
+        while len(self.sessions) > self.max_sessions:
+            self.sessions.popitem(last=False)
+        return session
+
+    def get(self, session):
+        delta_session = self.sessions.get(session)
+        if delta_session is not None:
+            self.sessions.move_to_end(session)
+        return delta_session
+
+    def clear(self):
+        self.sessions.clear()
+
+
+class MicroBatcher:
+    """
+    Runs the model in a worker thread and groups concurrent requests into batches.
+
+    Requests are queued and flushed to the model as a single batch once max_batch_size images are
+    waiting or max_batch_delay seconds after the first one arrived. Only images with the same shape,
+    dtype and target are batched together. The model receives the stacked images and
+    additional_data["batch_size"], like in the newActionBatch endpoint. With max_batch_size 1 every
+    request goes to the model on its own.
+    """
+
+    def __init__(self, func, max_batch_size=constants.DEFAULT_MAX_BATCH_SIZE,
+                 max_batch_delay=constants.DEFAULT_MAX_BATCH_DELAY):
+        self.func = func
+        self.max_batch_size = max_batch_size
+        self.max_batch_delay = max_batch_delay
+        # A single worker, so the model is never called from two threads at the same time
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.pending = {}
+
+    def is_batching(self):
+        return self.max_batch_size > 1
+
+    async def run(self, array_data, additional_data):
+        """Call the model in the worker thread without blocking the event loop."""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self.func, array_data, additional_data)
+
+    def call(self, array_data, additional_data):
+        """Call the model in the worker thread from a thread other than the event loop."""
+        return self.executor.submit(self.func, array_data, additional_data).result()
+
+    async def predict(self, array_data, additional_data):
+        """Predict a single image, batched with the concurrent requests if batching is enabled."""
+        if not self.is_batching():
+            return await self.run(array_data, additional_data)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        key = (array_data.shape, array_data.dtype.str, additional_data.get("target"))
+        batch = self.pending.setdefault(key, [])
+        batch.append((array_data, future))
+
+        if len(batch) == 1:
+            loop.call_later(self.max_batch_delay, self.flush, key, batch)
+        if len(batch) >= self.max_batch_size:
+            self.flush(key, batch)
+        return await future
+
+    def flush(self, key, batch):
+        if self.pending.get(key) is not batch:
+            # Already flushed because it was full
+            return
+        del self.pending[key]
+        asyncio.ensure_future(self.run_batch(key, batch))
+
+    async def run_batch(self, key, batch):
+        additional_data = {
+            "target": key[2],
+            "batch_size": len(batch)
+        }
+        try:
+            result = await self.run(np.stack([array_data for array_data, _ in batch]), additional_data)
+            if len(result["predictions"]) != len(batch):
+                raise HTTPException(status_code=500,
+                                    detail="Batch predictions must contain one prediction list per image.")
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), predictions in zip(batch, result["predictions"]):
+            if not future.done():
+                future.set_result({"predictions": predictions})
+
+
+async def predict_delta(batcher: MicroBatcher, session: DeltaSession, actions, additional_data):
+    """Predict the base image of a session with the perturbed pixels applied."""
+    if batcher.is_batching():
+        # The buffer is reused by the next request of the session before the batch is flushed
+        return await batcher.predict(session.apply(actions).copy(), additional_data)
+
+    async with session.lock:
+        return await batcher.predict(session.apply(actions), additional_data)
+
+
+def attach_shared_memory(name, owner_pid):
+    """Attach to a shared memory block created by the controller, which stays responsible for unlinking it."""
+    shm = shared_memory.SharedMemory(name=name)
+    if owner_pid != os.getpid():
+        # The block is registered again when attached, and would be unlinked when this process exits
+        resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+class ImageRing:
+    """Images written by a controller in a shared memory block, one flattened image per slot."""
+
+    def __init__(self, name, shape, dtype, slots, owner_pid):
+        self.shm = attach_shared_memory(name, owner_pid)
+        self.images = np.ndarray((slots, int(np.prod(shape))), dtype=np.dtype(dtype), buffer=self.shm.buf)
+
+    def __getitem__(self, slot):
+        return self.images[slot]
+
+    def close(self):
+        # The views on the buffer must be released before the block is closed
+        self.images = None
+        self.shm.close()
+
+
+def read_frame(conn):
+    """Read a length-prefixed frame, or return None if the connection was closed."""
+    header = recv_exactly(conn, struct.calcsize(constants.LOCAL_FRAME_HEADER))
+    if header is None:
+        return None
+    return recv_exactly(conn, struct.unpack(constants.LOCAL_FRAME_HEADER, header)[0])
+
+
+def recv_exactly(conn, size):
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = conn.recv_into(view[received:])
+        if count == 0:
+            return None
+        received += count
+    return buffer
+
+
+def write_frame(conn, status, body):
+    header = struct.pack(constants.LOCAL_FRAME_HEADER + "B", len(body) + 1, status)
+    conn.sendall(header + body)
+
+
+class LocalTransport:
+    """
+    Serves the NUT over a Unix domain socket to a controller running on the same host.
+
+    The controller writes the images into a shared memory ring of slots and only sends a small
+    length-prefixed JSON frame naming the slot, so the image bytes never go through the socket and
+    the model reads them in place. A newAction response is a float32 score vector, preceded by the
+    labels that the connection has not seen yet. The requests of a connection are answered in
+    order, so the controller can send the frames of several slots before reading the responses.
+    """
+
+    def __init__(self, socket_path, batcher, label_table, state):
+        self.socket_path = socket_path
+        self.batcher = batcher
+        self.label_table = label_table
+        self.state = state
+        self.server = None
+
+    def start(self):
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(self.socket_path)
+        self.server.listen()
+        threading.Thread(target=self.serve, daemon=True).start()
+
+    def close(self):
+        self.server.close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    def serve(self):
+        while True:
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                # The server socket was closed
+                return
+            threading.Thread(target=self.handle, args=(conn,), daemon=True).start()
+
+    def handle(self, conn):
+        connection = {"ring": None, "known_labels": 0}
+        with conn:
+            while True:
+                frame = read_frame(conn)
+                if frame is None:
+                    break
+                try:
+                    body = self.dispatch(connection, json.loads(frame))
+                except Exception as e:
+                    write_frame(conn, constants.LOCAL_STATUS_ERROR, str(e).encode())
+                    continue
+                write_frame(conn, constants.LOCAL_STATUS_OK, body)
+        if connection["ring"] is not None:
+            connection["ring"].close()
+
+    def dispatch(self, connection, request):
+        op = request.get("op")
+        if op == "new_action":
+            return self.new_action(connection, request["slot"])
+        if op == "run":
+            return json.dumps(self.run_nut(connection, request)).encode()
+        if op == "stop":
+            return json.dumps(self.stop_nut(connection)).encode()
+        if op == "info":
+            return json.dumps(self.state).encode()
+        raise ValueError(f"Unknown operation {op}.")
+
+    def run_nut(self, connection, request):
+        if connection["ring"] is not None:
+            connection["ring"].close()
+        ring = ImageRing(request["shm"], request["shape"], request["dtype"], request["slots"], request["owner"])
+        connection["ring"] = ring
+        self.state["is_running"] = True
+        self.state["controller_host"] = self.socket_path
+        self.state["controller_port"] = None
+        self.state["target"] = request.get("target")
+        self.state["predictions"] = self.batcher.call(ring[0], {"target": self.state["target"]})["predictions"]
+        self.label_table.update(self.state["predictions"])
+        connection["known_labels"] = len(self.label_table.labels)
+        return self.state
+
+    def stop_nut(self, connection):
+        self.state["is_running"] = False
+        self.state["controller_host"] = ""
+        self.state["controller_port"] = None
+        if connection["ring"] is not None:
+            connection["ring"].close()
+            connection["ring"] = None
+        return self.state
+
+    def new_action(self, connection, slot):
+        if connection["ring"] is None:
+            raise ValueError("No image ring. Call run first.")
+        result = self.batcher.call(connection["ring"][slot], {"target": self.state["target"]})
+        scores = self.label_table.to_scores(result)
+        # Only the labels added since the last response are sent
+        new_labels = json.dumps(self.label_table.labels[connection["known_labels"]:]).encode()
+        connection["known_labels"] = len(self.label_table.labels)
+        return struct.pack(constants.LOCAL_FRAME_HEADER, len(new_labels)) + new_labels + scores.tobytes()
+
+
+def is_binary(request: Request) -> bool:
+    """Check whether the request body is a raw image instead of base64-inside-JSON."""
+    return request.headers.get("content-type", "").startswith(constants.BINARY_CONTENT_TYPE)
+
+
+def accepts_binary(request: Request) -> bool:
+    """Check whether the caller negotiated compact float32 score vectors as response."""
+    return constants.BINARY_CONTENT_TYPE in request.headers.get("accept", "")
+
+
+def requested_top_k(request: Request) -> int:
+    """Return the number of best predictions the caller asked for, or 0 for all of them."""
+    try:
+        return max(0, int(request.headers.get(constants.TOP_K_HEADER, 0)))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid top-k header.")
+
+
+def rank_labels(predictions):
+    """Return the labels of the predictions from the highest to the lowest score."""
+    return [prediction["label"] for prediction in sorted(predictions, key=lambda p: p["score"], reverse=True)]
+
+
+def top_k_predictions(predictions, k, keep):
+    """
+    Return the k predictions with the highest scores, plus the ones whose label is in keep.
+
+    The best predictions are found by partial selection, only the selected ones are sorted. Ties are
+    broken by response order.
+    """
+    if len(predictions) <= k:
+        return predictions
+    scores = np.fromiter((prediction["score"] for prediction in predictions), dtype=np.float64,
+                         count=len(predictions))
+    threshold = scores[np.argpartition(scores, -k)[-k]]
+    candidates = np.flatnonzero(scores >= threshold)
+    selected = set(candidates[np.argsort(-scores[candidates], kind="stable")[:k]].tolist())
+    selected.update(i for i, prediction in enumerate(predictions) if prediction["label"] in keep)
+    return [predictions[i] for i in sorted(selected, key=lambda i: (-scores[i], i))]
+
+
+def keep_top_k(predictions, k, target, original_ranking):
+    """Return the k best predictions, together with the target and the k best labels of the original image."""
+    return top_k_predictions(predictions, k, {target, *original_ranking[:k]})
+
+
+def format_result(request: Request, result, label_table: LabelTable, target=None, original_ranking=()):
+    """
+    Return the result as a float32 score vector if the caller accepts it, otherwise as JSON.
+
+    If the caller negotiated a top-k response, only the k best predictions are returned, together
+    with the target and the k best labels of the original image, so the caller can always score them.
+    A binary top-k response carries the label ids and the scores of the returned predictions.
+    """
+    top_k = requested_top_k(request)
+    if top_k:
+        result = {"predictions": keep_top_k(result["predictions"], top_k, target, original_ranking)}
+        if accepts_binary(request):
+            return label_table.to_top_k_response(result)
+        return result
+
+    if accepts_binary(request):
+        return label_table.to_binary_response(result)
+    return result
+
+
+def format_batch_result(request: Request, result, target=None, original_ranking=()):
+    """Return the prediction lists of a batch, each one cut to the negotiated top-k if any."""
+    top_k = requested_top_k(request)
+    if not top_k:
+        return result
+    return {"predictions": [keep_top_k(predictions, top_k, target, original_ranking)
+                            for predictions in result["predictions"]]}
+
+
+async def read_matrix(request: Request):
+    """
+    Read the image, the target and the shape of a request.
+
+    Binary requests carry the raw image bytes in the body and describe them with the
+    shape/dtype headers. Other requests are parsed as MatrixModel JSON bodies.
+    """
+    if is_binary(request):
+        body = await request.body()
+        dtype = np.dtype(request.headers.get(constants.IMAGE_DTYPE_HEADER, "uint8"))
+        array_data = np.frombuffer(body, dtype)
+        shape = request.headers.get(constants.IMAGE_SHAPE_HEADER)
+        shape = tuple(int(dim) for dim in shape.split(",")) if shape else None
+        if shape and int(np.prod(shape)) != array_data.size:
+            raise HTTPException(status_code=400, detail="Image size does not match the shape header.")
+        return array_data, request.headers.get(constants.TARGET_HEADER), shape
+
+    try:
+        data = MatrixModel(**await request.json())
+    except (ValueError, ValidationError) as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    shape = tuple(data.shape) if data.shape else None
+    return np.frombuffer(base64.b64decode(data.image), np.uint8), data.target, shape
 
 
 def collect_info(host: str = constants.DEFAULT_CONTROLLER_HOST,
-                 port: int = constants.DEFAULT_CONTROLLER_PORT):
+                 port: int = constants.DEFAULT_CONTROLLER_PORT,
+                 max_batch_size: int = constants.DEFAULT_MAX_BATCH_SIZE,
+                 max_batch_delay: float = constants.DEFAULT_MAX_BATCH_DELAY,
+                 socket_path: Optional[str] = None,
+                 max_delta_sessions: int = constants.DEFAULT_MAX_DELTA_SESSIONS):
     """
     Decorator generator that:
     - Tracks method calls.
@@ -31,9 +485,18 @@ def collect_info(host: str = constants.DEFAULT_CONTROLLER_HOST,
     Args:
         host (str): Host where the FastAPI app will run.
         port (int): Port where the FastAPI app will run.
+        max_batch_size (int): Maximum number of concurrent newAction requests sent to the model as a
+            single batch. Values greater than 1 require a function that accepts stacked images.
+        max_batch_delay (float): Maximum time in seconds a request waits for its batch to fill up.
+        socket_path (str): If given, the NUT is also served over this Unix domain socket, with the
+            images passed through shared memory, for a controller running on the same host.
+        max_delta_sessions (int): Maximum number of attack sessions whose base image is kept for delta
+            requests. The least recently used session is dropped first.
     """
 
     def decorator(func):
+        label_table = LabelTable()
+        batcher = MicroBatcher(func, max_batch_size, max_batch_delay)
         # State dictionary to track method call counts
         state = {
             "is_running": False,
@@ -44,7 +507,13 @@ def collect_info(host: str = constants.DEFAULT_CONTROLLER_HOST,
             "stop_nut": constants.STOP_NUT_PATH,
             "info_nut": constants.INFO_NUT_PATH,
             "new_action": constants.NEW_ACTION,
+            "new_action_batch": constants.NEW_ACTION_BATCH,
+            "new_action_delta": constants.NEW_ACTION_DELTA,
+            "labels": label_table.labels,
         }
+        sessions = DeltaSessions(max_delta_sessions)
+        # Labels of the image under test from the highest to the lowest score, kept in top-k responses
+        original_ranking = []
         app = FastAPI()
 
         @wraps(func)
@@ -60,35 +529,72 @@ def collect_info(host: str = constants.DEFAULT_CONTROLLER_HOST,
             return state
 
         @app.post(f"{constants.RUN_NUT_PATH}")
-        async def run_nut(data: MatrixModel):
+        async def run_nut(request: Request):
+            array_data, target, shape = await read_matrix(request)
             state["is_running"] = True
             state["controller_host"] = host
             state["controller_port"] = port
-            state["target"] = data.target
-            image_base64 = base64.b64decode(data.image)
-            array_data = np.frombuffer(image_base64, np.uint8)
+            state["target"] = target
             additional_data = {
-                "target": data.target,
+                "target": target,
             }
-            state["predictions"] = func(array_data, additional_data)["predictions"]
+            state["predictions"] = (await batcher.run(array_data, additional_data))["predictions"]
+            label_table.update(state["predictions"])
+            original_ranking[:] = rank_labels(state["predictions"])
 
-            return state
+            if shape is None:
+                return state
+
+            # The image shape is known, so later requests of this attack can send only the perturbed pixels
+            session = sessions.add(array_data.reshape(shape).copy())
+            return {**state, "session": session}
 
         @app.post(f"{constants.STOP_NUT_PATH}")
         async def stop_nut():
             state["is_running"] = False
             state["controller_host"] = ""
             state["controller_port"] = None
+            sessions.clear()
             return state
 
         @app.post(f"{constants.NEW_ACTION}")
-        async def new_action(data: MatrixModel):
-            image_base64 = base64.b64decode(data.image)
-            array_data = np.frombuffer(image_base64, np.uint8)
+        async def new_action(request: Request):
+            array_data, _, _ = await read_matrix(request)
+            additional_data = {
+                "target": state["target"]
+            }
+            result = await batcher.predict(array_data, additional_data)
+            return format_result(request, result, label_table, state["target"], original_ranking)
+
+        @app.post(f"{constants.NEW_ACTION_DELTA}")
+        async def new_action_delta(request: Request):
+            session = sessions.get(request.headers.get(constants.SESSION_HEADER))
+            if session is None:
+                raise HTTPException(status_code=404, detail="Unknown session. Call runNUT first.")
+
+            actions = np.frombuffer(await request.body(), dtype=np.int16).reshape(-1, 5)
             additional_data = {
                 "target": state["target"]
             }
-            return func(array_data, additional_data)
+            result = await predict_delta(batcher, session, actions, additional_data)
+            return format_result(request, result, label_table, state["target"], original_ranking)
+
+        @app.post(f"{constants.NEW_ACTION_BATCH}")
+        async def new_action_batch(data: MatrixBatchModel, request: Request):
+            # All images of a batch share the same shape, so they are stacked
+            # into a single (N, ...) array and passed to the model at once.
+            array_data = np.stack([np.frombuffer(base64.b64decode(image), np.uint8)
+                                   for image in data.images])
+            additional_data = {
+                "target": state["target"],
+                "batch_size": len(data.images)
+            }
+            result = await batcher.run(array_data, additional_data)
+
+            if len(result["predictions"]) != len(data.images):
+                raise HTTPException(status_code=500,
+                                    detail="Batch predictions must contain one prediction list per image.")
+            return format_batch_result(request, result, state["target"], original_ranking)
 
         def start_server():
             uvicorn.run(app, host=host, port=port)
@@ -96,6 +602,11 @@ def collect_info(host: str = constants.DEFAULT_CONTROLLER_HOST,
         wrapper.app = app
         threading.Thread(target=start_server, daemon=True).start()
 
+        wrapper.local_transport = None
+        if socket_path:
+            wrapper.local_transport = LocalTransport(socket_path, batcher, label_table, state)
+            wrapper.local_transport.start()
+
         return wrapper
 
     return decorator
@@ -1,12 +1,19 @@
 import numpy as np
 import pytest
 from PIL import Image
+from fastapi import HTTPException
 from fastapi.testclient import TestClient
 from io import BytesIO
+import asyncio
 import base64
+import json
+import socket
+import struct
+import threading
 
 from client.core import constants
-from client.core.optiattack_client import collect_info
+from client.core.optiattack_client import (DeltaSession, LabelTable, LocalTransport, MicroBatcher, collect_info,
+                                           read_frame)
 
 PROCESS_IMAGE_RESPONSE = {
     "predictions": [
@@ -19,6 +26,8 @@ PROCESS_IMAGE_RESPONSE = {
 @collect_info(host=constants.DEFAULT_CONTROLLER_HOST,
               port=constants.DEFAULT_CONTROLLER_PORT)
 def process_image(image_array: np.ndarray, additional_data=None):
+    if additional_data and additional_data.get("batch_size"):
+        return {"predictions": [PROCESS_IMAGE_RESPONSE["predictions"]] * image_array.shape[0]}
     return PROCESS_IMAGE_RESPONSE
 
 
@@ -91,3 +100,204 @@ def test_new_action_endpoint():
 
     assert response.status_code == 200
     assert response.json() == PROCESS_IMAGE_RESPONSE
+
+
+def test_new_action_batch_endpoint():
+    image = get_test_image()
+
+    json_data = base64.b64encode(np.array(image)).decode()
+    body = {"images": [json_data, json_data, json_data]}
+
+    response = client.post(constants.NEW_ACTION_BATCH, json=body)
+
+    assert response.status_code == 200
+    assert response.json() == {"predictions": [PROCESS_IMAGE_RESPONSE["predictions"]] * 3}
+
+
+def test_new_action_binary_endpoint():
+    image_array = np.array(get_test_image())
+    headers = {
+        "Content-Type": constants.BINARY_CONTENT_TYPE,
+        "Accept": constants.BINARY_CONTENT_TYPE,
+        constants.IMAGE_SHAPE_HEADER: ",".join(str(dim) for dim in image_array.shape),
+        constants.IMAGE_DTYPE_HEADER: "uint8",
+    }
+
+    response = client.post(constants.NEW_ACTION, content=image_array.tobytes(), headers=headers)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == constants.BINARY_CONTENT_TYPE
+    labels = client.get(constants.INFO_NUT_PATH).json()["labels"]
+    assert int(response.headers[constants.LABEL_COUNT_HEADER]) == len(labels)
+
+    scores = np.frombuffer(response.content, dtype=np.float32)
+    expected = {p["label"]: p["score"] for p in PROCESS_IMAGE_RESPONSE["predictions"]}
+    for label, score in zip(labels, scores):
+        assert score == pytest.approx(expected[label])
+
+
+def test_new_action_binary_shape_mismatch():
+    headers = {
+        "Content-Type": constants.BINARY_CONTENT_TYPE,
+        constants.IMAGE_SHAPE_HEADER: "10,10,3",
+    }
+
+    response = client.post(constants.NEW_ACTION, content=b"\x00" * 10, headers=headers)
+    assert response.status_code == 400
+
+
+def test_run_nut_binary_endpoint():
+    image_array = np.array(get_test_image())
+    headers = {
+        "Content-Type": constants.BINARY_CONTENT_TYPE,
+        constants.IMAGE_SHAPE_HEADER: ",".join(str(dim) for dim in image_array.shape),
+        constants.TARGET_HEADER: "horse",
+    }
+
+    response = client.post(constants.RUN_NUT_PATH, content=image_array.tobytes(), headers=headers)
+    assert response.status_code == 200
+    assert response.json()["is_running"] is True
+    assert response.json()["target"] == "horse"
+    assert set(response.json()["labels"]) == {"zebra", "horse"}
+
+
+def test_delta_session_apply():
+    base = np.zeros((4, 4, 3), dtype=np.uint8)
+    session = DeltaSession(base.copy())
+
+    image = session.apply(np.array([[1, 2, 255, 0, 0], [1, 2, 0, 255, 0], [3, 0, 1, 2, 3]], dtype=np.int16))
+    image = image.reshape(base.shape)
+    assert list(image[1, 2]) == [0, 255, 0]
+    assert list(image[3, 0]) == [1, 2, 3]
+    assert np.count_nonzero(image.any(axis=2)) == 2
+
+    # pixels of the previous request are restored from the base image
+    image = session.apply(np.array([[0, 0, 9, 9, 9]], dtype=np.int16)).reshape(base.shape)
+    assert list(image[0, 0]) == [9, 9, 9]
+    assert np.count_nonzero(image.any(axis=2)) == 1
+
+
+def test_new_action_delta_endpoint():
+    image = get_test_image()
+    image_array = np.array(image)
+
+    json_data = base64.b64encode(image_array).decode()
+    body = {"image": json_data, "shape": list(image_array.shape)}
+    session = client.post(constants.RUN_NUT_PATH, json=body).json()["session"]
+
+    actions = np.array([[1, 2, 255, 255, 255]], dtype=np.int16)
+    response = client.post(constants.NEW_ACTION_DELTA, content=actions.tobytes(),
+                           headers={constants.SESSION_HEADER: session})
+    assert response.status_code == 200
+    assert response.json() == PROCESS_IMAGE_RESPONSE
+
+
+def test_new_action_delta_unknown_session():
+    actions = np.array([[1, 2, 255, 255, 255]], dtype=np.int16)
+    response = client.post(constants.NEW_ACTION_DELTA, content=actions.tobytes(),
+                           headers={constants.SESSION_HEADER: "unknown"})
+    assert response.status_code == 404
+
+
+def batch_model(calls):
+    def predict(image_array, additional_data):
+        calls.append(additional_data.get("batch_size"))
+        return {"predictions": [[{"label": "zebra", "score": float(image[0])}] for image in image_array]}
+    return predict
+
+
+def test_micro_batcher_flushes_full_batch():
+    calls = []
+    batcher = MicroBatcher(batch_model(calls), max_batch_size=4, max_batch_delay=10)
+
+    async def predict_all():
+        return await asyncio.gather(*[batcher.predict(np.full(3, i, dtype=np.uint8), {"target": None})
+                                      for i in range(4)])
+
+    results = asyncio.run(predict_all())
+    assert calls == [4]
+    assert [result["predictions"][0]["score"] for result in results] == [0, 1, 2, 3]
+
+
+def test_micro_batcher_flushes_after_deadline():
+    calls = []
+    batcher = MicroBatcher(batch_model(calls), max_batch_size=4, max_batch_delay=0.01)
+
+    async def predict_all():
+        return await asyncio.gather(*[batcher.predict(np.full(3, i, dtype=np.uint8), {"target": None})
+                                      for i in range(2)])
+
+    results = asyncio.run(predict_all())
+    assert calls == [2]
+    assert len(results) == 2
+
+
+def test_micro_batcher_separates_shapes():
+    calls = []
+    batcher = MicroBatcher(batch_model(calls), max_batch_size=2, max_batch_delay=0.01)
+
+    async def predict_all():
+        return await asyncio.gather(batcher.predict(np.zeros(3, dtype=np.uint8), {"target": None}),
+                                    batcher.predict(np.zeros(6, dtype=np.uint8), {"target": None}))
+
+    asyncio.run(predict_all())
+    assert calls == [1, 1]
+
+
+def test_micro_batcher_prediction_count_mismatch():
+    batcher = MicroBatcher(lambda image_array, additional_data: {"predictions": [[]]},
+                           max_batch_size=2, max_batch_delay=0.01)
+
+    async def predict_all():
+        return await asyncio.gather(batcher.predict(np.zeros(3, dtype=np.uint8), {"target": None}),
+                                    batcher.predict(np.zeros(3, dtype=np.uint8), {"target": None}),
+                                    return_exceptions=True)
+
+    results = asyncio.run(predict_all())
+    assert all(isinstance(result, HTTPException) and result.status_code == 500 for result in results)
+
+
+def test_local_transport_errors():
+    server, client = socket.socketpair()
+    state = {"is_running": False, "target": None, "labels": []}
+    transport = LocalTransport("unused.sock", MicroBatcher(lambda image, data: PROCESS_IMAGE_RESPONSE),
+                               LabelTable(), state)
+    threading.Thread(target=transport.handle, args=(server,), daemon=True).start()
+
+    for request in ({"op": "new_action", "slot": 0}, {"op": "unknown"}, {"op": "info"}):
+        payload = json.dumps(request).encode()
+        client.sendall(struct.pack(constants.LOCAL_FRAME_HEADER, len(payload)) + payload)
+
+    # The responses come back in the order of the requests, and the errors do not close the connection
+    assert read_frame(client)[0] == constants.LOCAL_STATUS_ERROR
+    assert b"Unknown operation" in read_frame(client)[1:]
+    info = read_frame(client)
+    assert info[0] == constants.LOCAL_STATUS_OK
+    assert json.loads(bytes(info[1:]))["is_running"] is False
+    client.close()
+
+
+def test_top_k_predictions():
+    from client.core.optiattack_client import top_k_predictions
+    predictions = [{"label": f"class_{i}", "score": score} for i, score in enumerate([0.1, 0.5, 0.05, 0.3, 0.05])]
+
+    selected = top_k_predictions(predictions, 2, {"class_4"})
+
+    assert [prediction["label"] for prediction in selected] == ["class_1", "class_3", "class_4"]
+    assert top_k_predictions(predictions, 5, set()) is predictions
+
+
+def test_new_action_top_k_binary(setup_test_app):
+    image = np.zeros((2, 2, 3), dtype=np.uint8)
+    setup_test_app.post(constants.RUN_NUT_PATH, json={"image": base64.b64encode(image).decode()})
+
+    response = setup_test_app.post(constants.NEW_ACTION, content=image.tobytes(),
+                                   headers={"Content-Type": constants.BINARY_CONTENT_TYPE,
+                                            "Accept": constants.BINARY_CONTENT_TYPE,
+                                            constants.TOP_K_HEADER: "1"})
+
+    assert response.headers[constants.TOP_K_HEADER] == "1"
+    ids = np.frombuffer(response.content[:4], dtype=np.int32)
+    scores = np.frombuffer(response.content[4:], dtype=np.float32)
+    assert ids[0] == 0
+    assert scores[0] == pytest.approx(0.99)
@@ -126,12 +126,141 @@ class ConfigParser:
         """Base endpoint for the NUT."""
         return "/api/v1"
 
+    @cfg("NUT function called in process instead of over HTTP, as 'package.module:function'. "
+         "It has the same signature as the function wrapped by collect_info and receives the image array directly. "
+         "It must be the plain model function, in a module that does not decorate it with collect_info, as the "
+         "decorator starts a server on import. If empty, the NUT is reached over HTTP.")
+    def nut_module(self):
+        """NUT function called in process."""
+        return ""
+
+    @cfg("Unix domain socket of a NUT on the same host, started with collect_info(socket_path=...). "
+         "The images are passed through a shared memory ring with max_in_flight slots instead of HTTP. "
+         "If empty, the NUT is reached over HTTP.")
+    def nut_socket(self):
+        """Unix domain socket of a co-located NUT."""
+        return ""
+
+    @cfg("Comma-separated list of NUT replicas as host:port, e.g. 'localhost:38000,localhost:38001'. "
+         "Evaluations are spread across the replicas with least-outstanding-requests balancing. "
+         "If empty, nut_host and nut_port are used.")
+    def nut_endpoints(self):
+        """Comma-separated list of NUT replicas."""
+        return ""
+
+    @cfg("Interval in seconds between the health checks of the NUT replicas. "
+         "Failing replicas are taken out of rotation until they answer again. Zero disables the checks.")
+    def health_check_interval(self):
+        """Interval in seconds between the health checks of the NUT replicas."""
+        return 5.0
+
+    @cfg("Upper bound in seconds of the timeout of a NUT evaluation request. Once enough round-trip times are "
+         "observed, the timeout adapts to timeout_multiplier times their p95. Zero disables timeouts.")
+    def request_timeout(self):
+        """Upper bound in seconds of the timeout of a NUT evaluation request."""
+        return 30.0
+
+    @cfg("Multiple of the p95 round-trip time used as the timeout of a NUT evaluation request.")
+    def timeout_multiplier(self):
+        """Multiple of the p95 round-trip time used as the timeout of a NUT evaluation request."""
+        return 4.0
+
+    @cfg("Send a duplicate of a NUT evaluation request to another replica or connection when no response "
+         "arrives within the p95 round-trip time, and keep the first response.")
+    def hedge_requests(self):
+        """Hedge the NUT evaluation requests."""
+        return False
+
+    @cfg("Number of retries of a NUT evaluation request that fails or times out.")
+    def max_retries(self):
+        """Number of retries of a NUT evaluation request."""
+        return 2
+
+    @cfg("Base backoff in seconds before retrying a NUT evaluation request. "
+         "It doubles at each retry and is jittered.")
+    def retry_backoff(self):
+        """Base backoff in seconds before retrying a NUT evaluation request."""
+        return 0.1
+
+    @cfg("Send the candidates of a batch evaluation in a single request to the NUT. "
+         "The NUT function must accept stacked images and return one prediction list per image.")
+    def batch_evaluation(self):
+        """Send batch evaluations in a single request."""
+        return False
+
+    @cfg("Maximum number of evaluations in flight at the same time. "
+         "Values greater than 1 pipeline the requests to the NUT through an asynchronous controller.")
+    def max_in_flight(self):
+        """Maximum number of evaluations in flight at the same time."""
+        return 1
+
+    @cfg("Write the pixels of a candidate into a persistent working image and revert them once the request "
+         "is serialized, instead of copying the whole image per evaluation. Disable it if the NUT function "
+         "keeps a reference to the image it receives in process.")
+    def reuse_image_buffer(self):
+        """Reuse a working image buffer for the candidate images."""
+        return True
+
+    class WireFormat:
+
+        """Wire formats used to exchange images and predictions with the NUT."""
+
+        JSON = "json"
+        BINARY = "binary"
+        DELTA = "delta"
+
+    @cfg("Wire format used to exchange images and predictions with the NUT. Options: 'json', 'binary' or 'delta'. "
+         "Binary mode sends raw image bytes and receives float32 score vectors. "
+         "Delta mode uploads the image once and then sends only the perturbed pixels. "
+         "Both fall back to JSON if the NUT does not support them.")
+    def wire_format(self):
+        """Wire format used to exchange images and predictions with the NUT."""
+        return ConfigParser.WireFormat.JSON
+
+    @cfg("Number of best predictions the NUT returns per evaluation, negotiated with the X-Top-K header. "
+         "The target and the best labels of the original image are always returned as well. "
+         "Zero returns all the predictions.")
+    def top_k(self):
+        """Number of best predictions the NUT returns per evaluation."""
+        return 0
+
+    @cfg("Number of best scores kept per evaluated individual, plus the target. The scores are kept as float32 "
+         "arrays indexed by label id. Zero keeps the scores of all the labels.")
+    def predictions_top_k(self):
+        """Number of best scores kept per evaluated individual."""
+        return 0
+
+    @cfg("Maximum number of NUT responses kept in the fitness cache. Candidates with the same final pixels are "
+         "evaluated by the NUT only once, and still count as an evaluation for the search budget. "
+         "Zero disables the cache.")
+    def fitness_cache_size(self):
+        """Maximum number of NUT responses kept in the fitness cache."""
+        return 1024
+
+    class FitnessCacheEviction:
+
+        """Eviction policies of the fitness cache."""
+
+        LRU = "lru"
+        FIFO = "fifo"
+
+    @cfg("Eviction policy of the fitness cache. Options: 'lru' or 'fifo'.")
+    def fitness_cache_eviction(self):
+        """Eviction policy of the fitness cache."""
+        return ConfigParser.FitnessCacheEviction.LRU
+
     @cfg("Seed number for the random number generator. "
-         "Negative values mean use the system time.")
+         "Negative values mean use fresh entropy from the operating system.")
     def seed(self):
         """Seed number for the random number generator."""
         return -1
 
+    @cfg("Number of uniform and normal values drawn at once into the pools used by the scalar random "
+         "draws. 0 draws each value with its own generator call.")
+    def random_pool_size(self):
+        """Size of the pools of pre-drawn random values."""
+        return 1024
+
     @cfg("Path to the input image.")
     def input_image(self):
         """Path to the input image."""
@@ -200,6 +329,25 @@ class ConfigParser:
         """Maximum number of evaluations for the search."""
         return 1000
 
+    @cfg("Maximum number of individuals in the archive. When exceeded, the oldest individuals are merged into "
+         "one, which keeps the archived image. Zero is unbounded.")
+    def archive_max_size(self):
+        """Maximum number of individuals in the archive."""
+        return 0
+
+    @cfg("Estimated maximum memory of the archived individuals in bytes. When exceeded, the oldest individuals "
+         "are merged into one, which keeps the archived image. Zero is unbounded.")
+    def archive_max_bytes(self):
+        """Estimated maximum memory of the archived individuals in bytes."""
+        return 0
+
+    @cfg("Drop the archived individuals whose actions are all overwritten by later ones at the same locations. "
+         "The archive is checked whenever its size doubles or it exceeds its bounds. Disabled by default, as the "
+         "dropped individuals could still be sampled by MIO.")
+    def archive_drop_shadowed(self):
+        """Drop the archived individuals shadowed by later ones."""
+        return False
+
     @cfg("Show progress of the search.")
     def show_progress(self):
         """Show progress of the search."""
@@ -320,6 +468,12 @@ class ConfigParser:
         """Sampler type for the search."""
         return ConfigParser.SamplerType.RANDOM_SAMPLER
 
+    @cfg("Draw the distinct pixels of a sampled individual with a single sampling without replacement "
+         "and the colors of a batch of individuals as one array, instead of one action at a time.")
+    def vectorized_sampling(self):
+        """Vectorized sampling of the individuals."""
+        return True
+
     @cfg("The start value of the adaptive parameter control")
     def apc_start_time(self):
         """APC start time."""
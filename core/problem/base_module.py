@@ -10,6 +10,7 @@ from core.search.phase_controller import PhaseController
 from core.search.service.adaptive_parameter_control import AdaptiveParameterControl
 from core.search.service.archive import Archive
 from core.search.service.crossover.crossover import Crossover
+from core.search.service.fitness_function.fitness_cache import FitnessCache
 from core.search.service.fitness_function.fitness_function import FitnessFunction
 from core.search.service.monitor.search_status_updater import SearchStatusUpdater
 from core.search.service.monitor.statistics import Statistics
@@ -18,6 +19,7 @@ from core.search.service.pruner.pruner import Pruner
 from core.search.service.randomness import Randomness
 from core.search.service.sampler.sampler import Sampler
 from core.search.service.search_time_controller import SearchTimeController
+from core.utils.label_table import LabelTable
 
 
 def configure_logger():
@@ -44,21 +46,28 @@ class BaseModule(containers.DeclarativeContainer):
     pc = providers.Singleton(PhaseController)
     stc = providers.Singleton(SearchTimeController, config=config, pc=pc)
     apc = providers.Singleton(AdaptiveParameterControl, stc=stc, config=config)
+    label_table = providers.Singleton(LabelTable)
     remote_controller = providers.Singleton(RemoteController,
                                             config=config,
-                                            stc=stc)
+                                            stc=stc,
+                                            label_table=label_table)
     archive = providers.Singleton(Archive,
                                   stc=stc,
                                   randomness=randomness,
-                                  config=config)
+                                  config=config,
+                                  label_table=label_table)
     search_status_updater = providers.Singleton(SearchStatusUpdater,
                                                 stc=stc,
                                                 config=config,
                                                 archive=archive)
-    ff = providers.Singleton(FitnessFunction, archive=archive, remote_controller=remote_controller, stc=stc)
+    fitness_cache = providers.Singleton(FitnessCache, config=config)
+    ff = providers.Singleton(FitnessFunction, archive=archive, remote_controller=remote_controller, stc=stc,
+                             cache=fitness_cache)
     mutator = providers.Singleton(Mutator, randomness=randomness, stc=stc, config=config, apc=apc)
     crossover = providers.Singleton(Crossover, randomness=randomness, stc=stc, config=config, apc=apc)
-    statistics = providers.Singleton(Statistics, stc=stc, archive=archive, config=config)
+    statistics = providers.Singleton(Statistics, stc=stc, archive=archive, config=config,
+                                     remote_controller=remote_controller, fitness_cache=fitness_cache,
+                                     label_table=label_table)
     sampler = providers.Singleton(Sampler,
                                   randomness=randomness,
                                   config=config)
@@ -0,0 +1,136 @@
+"""async_remote_controller.py - RemoteController that keeps several evaluations in flight."""
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+
+import httpx
+
+from core.remote.remote_controller import RemoteController
+from core.utils.label_table import LabelTable
+
+
+class AsyncRemoteController(RemoteController):
+
+    """
+    RemoteController that pipelines the newAction requests.
+
+    The requests are sent by an httpx.AsyncClient running on an event loop in a background
+    thread, so the search can prepare the next candidates while up to max_in_flight
+    evaluations wait for the NUT. The setup requests (run_nut, stop_nut, ...) stay blocking.
+    """
+
+    def __init__(self, config, stc, label_table: LabelTable):
+        """Initialize the controller and start its event loop."""
+        super().__init__(config, stc, label_table)
+        self.max_in_flight = max(1, config.get("max_in_flight", 1))
+        self.loop = asyncio.new_event_loop()
+        # Hedged requests need a second connection per evaluation in flight
+        max_connections = self.max_in_flight * (2 if self.hedge_requests else 1)
+        self.client = httpx.AsyncClient(timeout=None, limits=httpx.Limits(max_connections=max_connections))
+        self.semaphore = None
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+
+    def submit_new_action(self, image_array) -> Future:
+        """Send new action without waiting for the NUT and return a future of its result."""
+        logging.info("Submitting new action")
+        self.stc.new_individual_evaluation()
+        request = self.new_action_body(image_array)
+        return asyncio.run_coroutine_threadsafe(self.post("newAction", request), self.loop)
+
+    def submit_new_action_delta(self, actions) -> Future:
+        """Send the perturbed pixels of a new action without waiting for the NUT."""
+        logging.info("Submitting new action as delta")
+        self.stc.new_individual_evaluation()
+        request = self.new_action_delta_body(actions)
+        return asyncio.run_coroutine_threadsafe(self.post("newActionDelta", request), self.loop)
+
+    def new_action(self, image_array):
+        """Send new action and wait for its result."""
+        return self.submit_new_action(image_array).result()
+
+    def new_action_delta(self, actions):
+        """Send the perturbed pixels of a new action and wait for its result."""
+        return self.submit_new_action_delta(actions).result()
+
+    async def post(self, name, request):
+        """
+        Post a request to the NUT once a slot is free and parse its response.
+
+        Requests that fail or time out are retried with a jittered exponential backoff.
+        """
+        if self.semaphore is None:
+            # Created lazily so that it is bound to the loop of the background thread
+            self.semaphore = asyncio.Semaphore(self.max_in_flight)
+
+        # httpx expects raw bodies as content
+        request = {"content" if key == "data" else key: value for key, value in request.items()}
+
+        async with self.semaphore:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    return await self.post_hedged(name, request)
+                except (ConnectionError, TimeoutError):
+                    if attempt == self.max_retries:
+                        raise
+                    self.count("retries")
+                    await asyncio.sleep(self.get_retry_backoff(attempt))
+
+    async def post_hedged(self, name, request):
+        """Post a request, and a duplicate to another replica if no response arrives within the p95 round-trip time."""
+        hedge_delay = self.get_hedge_delay()
+        primary = asyncio.ensure_future(self.post_to_pool(name, request))
+        if hedge_delay is None:
+            return await primary
+
+        done, _ = await asyncio.wait([primary], timeout=hedge_delay)
+        if done:
+            return primary.result()
+
+        self.count("hedges")
+        hedge = asyncio.ensure_future(self.post_to_pool(name, request))
+        pending = {primary, hedge}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    # The slower request is not needed anymore
+                    for other in pending:
+                        other.cancel()
+                    if task is hedge:
+                        self.count("hedge_wins")
+                    return task.result()
+        return primary.result()
+
+    async def post_to_pool(self, name, request):
+        """Post a request to the least loaded replica, moving to the next one if it cannot be reached or times out."""
+        tried = []
+        for _ in self.pool.endpoints:
+            try:
+                with self.pool.connect(exclude=tried) as endpoint:
+                    tried.append(endpoint)
+                    return self.parse_response(await self.post_to_async(endpoint, name, request), endpoint)
+            except (ConnectionError, TimeoutError) as e:
+                error = e
+
+        logging.error(error)
+        raise error
+
+    async def post_to_async(self, endpoint, name, request):
+        """Post a request to a replica, renewing its delta session if the replica has lost it."""
+        request = {**request, "headers": self.request_headers(request)}
+        headers = request["headers"]
+        try:
+            if self.SESSION_HEADER in headers:
+                headers[self.SESSION_HEADER] = endpoint.session
+            response = await self.client.post(endpoint.urls[name], timeout=self.get_request_timeout(), **request)
+            if response.status_code == 404 and self.SESSION_HEADER in headers:
+                await asyncio.to_thread(self.renew_session, endpoint, headers[self.SESSION_HEADER])
+                headers[self.SESSION_HEADER] = endpoint.session
+                response = await self.client.post(endpoint.urls[name], timeout=self.get_request_timeout(), **request)
+            return response
+        except httpx.TimeoutException:
+            self.count("timeouts")
+            raise TimeoutError("NUT request timed out")
+        except httpx.TransportError:
+            raise ConnectionError("Connection Error")
@@ -0,0 +1,126 @@
+"""in_process_remote_controller.py - RemoteController that calls the NUT function in the same process."""
+import importlib
+import logging
+
+import numpy as np
+
+from core.remote.remote_controller import RemoteController
+from core.utils.label_table import LabelTable
+from core.utils.nut_request import NutRequest
+
+
+def load_nut_function(path: str):
+    """
+    Load the NUT function given as 'package.module:function'.
+
+    It must be the plain model function. A function decorated by collect_info is rejected, as
+    importing it has already started the HTTP server of the NUT, and the socket one if configured.
+    """
+    module_name, _, function_name = path.partition(":")
+    if not module_name or not function_name:
+        raise ValueError(f"NUT module must be given as 'package.module:function', got '{path}'")
+
+    function = getattr(importlib.import_module(module_name), function_name)
+    # collect_info keeps the FastAPI app of the server it has started on its wrapper
+    if hasattr(function, "app"):
+        raise ValueError(f"NUT function '{path}' is decorated by collect_info, which starts a server on import. "
+                         f"Give the plain model function in a module that does not decorate it.")
+    return function
+
+
+class InProcessRemoteController(RemoteController):
+
+    """
+    RemoteController that calls the NUT function directly, without HTTP.
+
+    The function has the same signature as the one wrapped by collect_info: it receives the flattened
+    uint8 image and the additional data, and returns the prediction list. No request is serialized,
+    so the evaluations are only bound by the model.
+    """
+
+    def __init__(self, config, stc, label_table: LabelTable):
+        """Initialize the controller and load the NUT function."""
+        super().__init__(config, stc, label_table)
+        self.nut_module = config.get("nut_module")
+        self.nut_function = load_nut_function(self.nut_module)
+        self.nut_state = {
+            "is_running": False,
+            "target": self.target,
+            "controller_host": "in-process",
+            "controller_port": None,
+            "predictions": [],
+        }
+
+    def is_binary(self) -> bool:
+        """Check if raw image bytes are exchanged with the NUT. Nothing is exchanged in process."""
+        return False
+
+    def is_delta(self) -> bool:
+        """Check if only the perturbed pixels are sent to the NUT. The full image is passed in process."""
+        return False
+
+    def predict(self, image_array: np.ndarray, additional_data: dict) -> dict:
+        """Call the NUT function with the flattened image, as the collect_info server does."""
+        return self.nut_function(image_array.reshape(-1), additional_data)
+
+    def get_nut_info(self, endpoint=None):
+        """Get NUT info."""
+        return dict(self.nut_state)
+
+    def get_statistics(self) -> list[dict]:
+        """Return the request statistics of the NUT replicas. There are no replicas in process."""
+        return []
+
+    def run_nut(self, image_array):
+        """Run NUT."""
+        logging.info(f"Running NUT in process with {self.nut_module}")
+        self.base_image = image_array
+        self.nut_state["is_running"] = True
+        self.nut_state["predictions"] = self.predict(image_array, {"target": self.target})["predictions"]
+        return dict(self.nut_state)
+
+    def stop_nut(self):
+        """Stop NUT."""
+        logging.info("Stopping NUT")
+        self.nut_state["is_running"] = False
+        return dict(self.nut_state)
+
+    def get_test_results(self):
+        """Get test results."""
+        return {}
+
+    def new_action(self, image_array):
+        """Send new action."""
+        self.stc.new_individual_evaluation()
+        return NutRequest(self.predict(image_array, {"target": self.target}), self.target, self.label_table)
+
+    def new_action_batch(self, image_arrays):
+        """
+        Send a batch of new actions.
+
+        If batch evaluation is enabled, the stacked images are passed to the NUT function at once
+        with additional_data["batch_size"], like in the newActionBatch endpoint. The images may be
+        any iterable, each one is copied into its row before the next one is read.
+        """
+        if not self.batch_evaluation:
+            return [self.new_action(image_array) for image_array in image_arrays]
+
+        rows = [image_array.reshape(-1).copy() for image_array in image_arrays]
+        for _ in rows:
+            self.stc.new_individual_evaluation()
+        additional_data = {
+            "target": self.target,
+            "batch_size": len(rows)
+        }
+        images = np.stack(rows)
+        response = self.nut_function(images, additional_data)
+        return [NutRequest({"predictions": predictions}, self.target, self.label_table)
+                for predictions in response["predictions"]]
+
+    def new_action_delta(self, actions):
+        """Apply the actions on the base image and send it as a new action."""
+        image_array = self.base_image.copy()
+        for action in actions:
+            x, y = action.get_location()
+            image_array[x, y] = action.get_color()
+        return self.new_action(image_array)
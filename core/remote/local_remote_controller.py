@@ -0,0 +1,278 @@
+"""local_remote_controller.py - RemoteController that talks to a co-located NUT over a Unix domain socket."""
+import json
+import logging
+import os
+import queue
+import socket
+import struct
+import threading
+from collections import deque
+from concurrent import futures
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+from typing import Callable
+
+import numpy as np
+
+from core.remote.remote_controller import RemoteController
+from core.utils.label_table import LabelTable
+from core.utils.nut_request import NutRequest
+
+FRAME_HEADER = struct.Struct("!I")
+STATUS_OK = 0
+
+
+def recv_exactly(sock: socket.socket, size: int):
+    """Read exactly size bytes, or return None if the connection was closed."""
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:])
+        if count == 0:
+            return None
+        received += count
+    return buffer
+
+
+def read_frame(sock: socket.socket):
+    """Read a length-prefixed frame, or return None if the connection was closed."""
+    header = recv_exactly(sock, FRAME_HEADER.size)
+    if header is None:
+        return None
+    return recv_exactly(sock, FRAME_HEADER.unpack(header)[0])
+
+
+class LocalRemoteController(RemoteController):
+
+    """
+    RemoteController for a NUT on the same host, served by collect_info with a socket_path.
+
+    The images are written into a shared memory ring with one slot per evaluation in flight, and
+    only a small length-prefixed JSON frame naming the slot goes through the Unix domain socket.
+    The NUT answers the frames of the connection in order, so up to max_in_flight evaluations are
+    pipelined: a background thread reads the responses and completes the futures.
+    """
+
+    def __init__(self, config, stc, label_table: LabelTable):
+        """Initialize the controller. The socket is connected on the first request."""
+        super().__init__(config, stc, label_table)
+        self.socket_path = config.get("nut_socket")
+        self.max_in_flight = max(1, config.get("max_in_flight", 1))
+        self.socket = None
+        self.reader = None
+        # Whether the NUT has attached the ring on the current connection. It keeps the ring per connection,
+        # so once the connection is lost no new action can be sent until run_nut is called again
+        self.running = False
+        self.send_lock = threading.Lock()
+        # Futures of the requests sent, in the order of the responses
+        self.pending: deque[tuple[Future, Callable]] = deque()
+        self.ring = None
+        self.images = None
+        self.free_slots = queue.Queue()
+        # Labels of the score vectors, extended by the labels that come with the responses, and their ids
+        self.labels = []
+        self.label_ids = np.empty(0, dtype=np.intp)
+
+    def is_binary(self) -> bool:
+        """Check if raw image bytes are exchanged with the NUT. The images are shared in memory instead."""
+        return False
+
+    def is_delta(self) -> bool:
+        """Check if only the perturbed pixels are sent to the NUT. The full image is shared in memory."""
+        return False
+
+    def connect(self):
+        """Connect to the socket of the NUT and start reading the responses."""
+        if self.socket is not None:
+            return
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.socket_path)
+        except OSError as e:
+            sock.close()
+            raise ConnectionError(f"Could not connect to the NUT socket {self.socket_path}: {e}") from e
+        self.socket = sock
+        self.reader = threading.Thread(target=self.read_responses, args=(sock,), daemon=True)
+        self.reader.start()
+
+    def disconnect(self):
+        """Close the socket and wait until the reading thread has failed the pending futures."""
+        with self.send_lock:
+            sock, reader = self.socket, self.reader
+        if sock is None:
+            return
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        reader.join()
+
+    def request(self, request: dict, parse: Callable = None) -> Future:
+        """
+        Send a request frame and return the future of its response, parsed in the reading thread.
+
+        The future is queued before sending, as the response may arrive before sendall returns, and
+        removed again if the send fails.
+        """
+        payload = json.dumps(request).encode()
+        future = Future()
+        entry = (future, parse or self.parse_json)
+        with self.send_lock:
+            if request["op"] == "new_action" and not self.running:
+                raise ConnectionError(f"The NUT socket {self.socket_path} has no image ring. Call run_nut again.")
+            self.connect()
+            self.pending.append(entry)
+            try:
+                self.socket.sendall(FRAME_HEADER.pack(len(payload)) + payload)
+            except OSError as e:
+                if entry in self.pending:
+                    self.pending.remove(entry)
+                raise ConnectionError(f"Could not send to the NUT socket {self.socket_path}: {e}") from e
+        return future
+
+    @staticmethod
+    def parse_json(body) -> dict:
+        """Parse the JSON response of a control request."""
+        return json.loads(bytes(body))
+
+    def read_responses(self, sock: socket.socket):
+        """Complete the pending futures with the responses of the NUT until the connection is closed."""
+        try:
+            while True:
+                frame = read_frame(sock)
+                if frame is None:
+                    break
+                future, parse = self.pending.popleft()
+                try:
+                    if frame[0] != STATUS_OK:
+                        raise RuntimeError(bytes(frame[1:]).decode())
+                    future.set_result(parse(memoryview(frame)[1:]))
+                except Exception as e:
+                    future.set_exception(e)
+        except OSError:
+            pass
+
+        with self.send_lock:
+            if self.socket is sock:
+                self.socket = None
+                self.running = False
+            while self.pending:
+                self.pending.popleft()[0].set_exception(ConnectionError("The NUT socket was closed"))
+        sock.close()
+
+    def call(self, op: str, **fields) -> dict:
+        """Send a control request and wait for its JSON response, up to request_timeout."""
+        timeout = self.request_timeout if self.request_timeout > 0 else None
+        return self.wait(self.request({"op": op, **fields}), timeout)
+
+    def wait(self, future: Future, timeout):
+        """Wait for the result of a request. A concurrent.futures timeout is raised as the builtin TimeoutError."""
+        try:
+            return future.result(timeout=timeout)
+        except futures.TimeoutError:
+            self.count("timeouts")
+            raise TimeoutError("NUT request timed out")
+
+    def create_ring(self, image_array: np.ndarray):
+        """Create the shared memory ring with a slot per evaluation in flight."""
+        self.close_ring()
+        self.ring = shared_memory.SharedMemory(create=True, size=self.max_in_flight * image_array.nbytes)
+        self.images = np.ndarray((self.max_in_flight, image_array.size), dtype=image_array.dtype,
+                                 buffer=self.ring.buf)
+        self.free_slots = queue.Queue()
+        for slot in range(self.max_in_flight):
+            self.free_slots.put(slot)
+
+    def close_ring(self):
+        """Release the shared memory ring. The NUT detaches from it on stop or on the next run."""
+        if self.ring is None:
+            return
+        self.images = None
+        self.ring.close()
+        self.ring.unlink()
+        self.ring = None
+
+    def get_nut_info(self, endpoint=None):
+        """Get NUT info."""
+        return self.call("info")
+
+    def get_statistics(self) -> list[dict]:
+        """Return the request statistics of the NUT replicas. The socket has no replicas."""
+        return []
+
+    def run_nut(self, image_array):
+        """Run NUT. If it fails, the shared memory ring and the socket are closed."""
+        logging.info(f"Running NUT on {self.socket_path}")
+        self.base_image = image_array
+        self.create_ring(image_array)
+        self.images[0] = image_array.reshape(-1)
+        try:
+            nut_info = self.call("run", shm=self.ring.name, shape=list(image_array.shape),
+                                 dtype=str(image_array.dtype), slots=self.max_in_flight, owner=os.getpid(),
+                                 target=self.target)
+        except Exception:
+            self.disconnect()
+            self.close_ring()
+            raise
+        self.labels = list(nut_info.get("labels", []))
+        self.label_ids = self.label_table.get_ids(self.labels)
+        self.running = True
+        return nut_info
+
+    def stop_nut(self):
+        """Stop NUT. The shared memory ring is released even if the NUT cannot be reached."""
+        logging.info("Stopping NUT")
+        self.running = False
+        try:
+            return self.call("stop")
+        finally:
+            self.close_ring()
+
+    def get_test_results(self):
+        """Get test results."""
+        return {}
+
+    def parse_scores(self, body) -> NutRequest:
+        """Parse a float32 score vector, preceded by the labels the NUT added since the last response."""
+        (size,) = FRAME_HEADER.unpack_from(body)
+        if size:
+            new_labels = json.loads(bytes(body[FRAME_HEADER.size:FRAME_HEADER.size + size]))
+            self.labels.extend(new_labels)
+            self.label_ids = np.concatenate([self.label_ids, self.label_table.get_ids(new_labels)])
+        scores = np.frombuffer(body, dtype=np.float32, offset=FRAME_HEADER.size + size)
+        return NutRequest.from_ids(self.label_table, self.label_ids, scores, self.target)
+
+    def submit_new_action(self, image_array) -> Future:
+        """Write the image into a free slot of the ring and ring the NUT, waiting while all slots are in flight."""
+        self.stc.new_individual_evaluation()
+        slot = self.free_slots.get()
+        self.images[slot] = image_array.reshape(-1)
+        try:
+            future = self.request({"op": "new_action", "slot": slot}, self.parse_scores)
+        except ConnectionError:
+            self.free_slots.put(slot)
+            raise
+        future.add_done_callback(lambda _: self.free_slots.put(slot))
+        return future
+
+    def new_action(self, image_array):
+        """Send new action."""
+        return self.wait(self.submit_new_action(image_array), self.get_request_timeout())
+
+    def new_action_batch(self, image_arrays):
+        """Send a batch of new actions, pipelined through the slots of the ring."""
+        submitted = [self.submit_new_action(image_array) for image_array in image_arrays]
+        return [self.wait(future, self.get_request_timeout()) for future in submitted]
+
+    def submit_new_action_delta(self, actions) -> Future:
+        """Apply the actions on the base image and submit it as a new action."""
+        image_array = self.base_image.copy()
+        for action in actions:
+            x, y = action.get_location()
+            image_array[x, y] = action.get_color()
+        return self.submit_new_action(image_array)
+
+    def new_action_delta(self, actions):
+        """Apply the actions on the base image and send it as a new action."""
+        return self.wait(self.submit_new_action_delta(actions), self.get_request_timeout())
@@ -0,0 +1,183 @@
+"""nut_pool.py - Pool of NUT replicas with load balancing and health checks."""
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Optional
+
+import numpy as np
+import requests
+
+from core.utils.incremental_average import IncrementalAverage
+from core.utils.label_table import LabelTable
+
+NUT_PATHS = {
+    "info": "infoNUT",
+    "run": "runNUT",
+    "stop": "stopNUT",
+    "testResults": "testResults",
+    "newAction": "newAction",
+    "newActionBatch": "newActionBatch",
+    "newActionDelta": "newActionDelta"
+}
+
+
+class NutEndpoint:
+
+    """A replica of the NUT and the statistics of the requests sent to it."""
+
+    def __init__(self, base_url: str):
+        """Initialize the endpoint with the base url of the replica."""
+        self.base_url = base_url
+        self.urls = {name: f"{base_url}/{path}" for name, path in NUT_PATHS.items()}
+        self.healthy = True
+        # Number of requests sent to the replica and not answered yet
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        # Response time of the successful requests in milliseconds
+        self.latency = IncrementalAverage()
+        # Labels in the order used by the binary score vectors of the replica, and their ids in the label table
+        self.labels: list[str] = []
+        self.label_ids = np.empty(0, dtype=np.intp)
+        # Session of the base image kept by the replica for the delta wire format
+        self.session = None
+
+    def set_labels(self, labels: list[str], label_table: LabelTable):
+        """Set the labels of the binary score vectors of the replica, interning them in the label table."""
+        self.labels = labels
+        self.label_ids = label_table.get_ids(labels)
+
+    def get_statistics(self) -> dict:
+        """Return the request statistics of the replica."""
+        return {
+            "url": self.base_url,
+            "healthy": self.healthy,
+            "requests": self.requests,
+            "failures": self.failures,
+            "latency_avg_ms": self.latency.mean,
+            "latency_min_ms": self.latency.min,
+            "latency_max_ms": self.latency.max,
+        }
+
+
+class NutPool:
+
+    """
+    Pool of NUT replicas serving the same model.
+
+    Requests go to the healthy replica with the fewest outstanding requests, ties are broken in
+    round-robin order. A replica that cannot be reached is taken out of rotation until a health
+    check on its infoNUT endpoint succeeds again. If no replica is healthy, all of them are tried.
+    """
+
+    def __init__(self, base_urls: list[str]):
+        """Initialize the pool with the base urls of the replicas."""
+        self.endpoints = [NutEndpoint(base_url) for base_url in base_urls]
+        self.lock = threading.Lock()
+        self.next_index = 0
+        self.health_check_thread = None
+        # Round-trip time per image of the last answered requests in milliseconds, over all replicas
+        self.round_trip_times = deque(maxlen=100)
+
+    def acquire(self, exclude=()) -> NutEndpoint:
+        """Pick the least loaded replica that is not excluded and count the new outstanding request."""
+        with self.lock:
+            # Rotate the candidates so that min() breaks the ties in round-robin order
+            candidates = [endpoint for endpoint in self.endpoints[self.next_index:] + self.endpoints[:self.next_index]
+                          if endpoint not in exclude]
+            if not candidates:
+                raise ConnectionError("Connection Error")
+
+            endpoint = min([endpoint for endpoint in candidates if endpoint.healthy] or candidates,
+                           key=lambda candidate: candidate.outstanding)
+            endpoint.outstanding += 1
+            self.next_index = (self.endpoints.index(endpoint) + 1) % len(self.endpoints)
+            return endpoint
+
+    def release(self, endpoint: NutEndpoint, elapsed_ms: Optional[float] = None, failed: bool = False,
+                images: int = 1):
+        """
+        Record the end of a request sent to the replica. The latency is only recorded for answered requests.
+
+        The round-trip time of a request carrying several images is recorded per image.
+        """
+        with self.lock:
+            endpoint.outstanding -= 1
+            endpoint.requests += 1
+            if failed:
+                endpoint.failures += 1
+                self.set_health(endpoint, False)
+            elif elapsed_ms is not None:
+                endpoint.latency.add_value(elapsed_ms)
+                self.round_trip_times.append(elapsed_ms / max(images, 1))
+                self.set_health(endpoint, True)
+
+    @contextmanager
+    def connect(self, exclude=(), images: int = 1):
+        """
+        Acquire a replica for a request carrying a number of images and release it once done.
+
+        A ConnectionError or a TimeoutError marks the replica as failing. Other errors, e.g. a cancelled
+        hedged request, release it without recording the latency.
+        """
+        endpoint = self.acquire(exclude)
+        start = time.perf_counter()
+        try:
+            yield endpoint
+        except (ConnectionError, TimeoutError):
+            self.release(endpoint, failed=True)
+            raise
+        except BaseException:
+            self.release(endpoint)
+            raise
+        else:
+            self.release(endpoint, (time.perf_counter() - start) * 1000, images=images)
+
+    def get_round_trip_time_percentile(self, percentile: float, min_samples: int = 10) -> Optional[float]:
+        """Compute a percentile of the round-trip time per image of the last 100 requests, or None if too few."""
+        with self.lock:
+            samples = list(self.round_trip_times)
+        if len(samples) < min_samples:
+            return None
+
+        return float(np.percentile(samples, percentile))
+
+    @staticmethod
+    def set_health(endpoint: NutEndpoint, healthy: bool):
+        """Put the replica in or out of rotation."""
+        if endpoint.healthy and not healthy:
+            logging.warning(f"NUT replica {endpoint.base_url} is failing. Taking it out of rotation.")
+        elif healthy and not endpoint.healthy:
+            logging.info(f"NUT replica {endpoint.base_url} is healthy again.")
+        endpoint.healthy = healthy
+
+    def check_health(self, timeout: float, on_recovered=None):
+        """Query the infoNUT endpoint of every replica and update their health."""
+        for endpoint in self.endpoints:
+            try:
+                healthy = requests.get(endpoint.urls["info"], timeout=timeout).ok
+            except requests.exceptions.RequestException:
+                healthy = False
+
+            recovered = healthy and not endpoint.healthy
+            with self.lock:
+                self.set_health(endpoint, healthy)
+            if recovered and on_recovered is not None:
+                on_recovered(endpoint)
+
+    def start_health_checks(self, interval: float, on_recovered=None):
+        """Check the health of the replicas every interval seconds in a background thread."""
+        def run():
+            while True:
+                time.sleep(interval)
+                self.check_health(interval, on_recovered)
+
+        self.health_check_thread = threading.Thread(target=run, daemon=True)
+        self.health_check_thread.start()
+
+    def get_statistics(self) -> list[dict]:
+        """Return the request statistics of every replica."""
+        with self.lock:
+            return [endpoint.get_statistics() for endpoint in self.endpoints]
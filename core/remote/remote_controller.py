@@ -1,8 +1,18 @@
 """remote_controller.py - RemoteController class to interact with the NUT server."""
 import base64
 import logging
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed, wait
+from typing import Optional
+
+import numpy as np
 import requests
 
+from core.config_parser import ConfigParser
+from core.remote.nut_pool import NutEndpoint, NutPool
+from core.utils.label_table import LabelTable
 from core.utils.nut_request import NutRequest
 
 
@@ -10,60 +20,192 @@ class RemoteController:
 
     """RemoteController class to interact with the NUT server."""
 
-    def __init__(self, config, stc):
+    BINARY_CONTENT_TYPE = "application/octet-stream"
+    IMAGE_SHAPE_HEADER = "X-Image-Shape"
+    IMAGE_DTYPE_HEADER = "X-Image-Dtype"
+    TARGET_HEADER = "X-Target"
+    LABEL_COUNT_HEADER = "X-Label-Count"
+    SESSION_HEADER = "X-Session"
+    TOP_K_HEADER = "X-Top-K"
+    # Lower bounds of the adaptive timeout and of the hedging delay
+    MIN_TIMEOUT_SECONDS = 0.5
+    MIN_HEDGE_DELAY_SECONDS = 0.005
+
+    def __init__(self, config, stc, label_table: LabelTable):
         """Initialize the RemoteController class."""
-        # python 3.10 is not supported nested f-string. So,
-        # we need to use config['NUT_PORT'] instead of config["NUT_PORT"]
-        base_url = (f"http://{config.get('nut_host')}:"
-                    f"{config.get('nut_port')}{config.get('base_endpoint')}")
-        self.NUT_ENDPOINTS = {
-            "info": f"{base_url}/infoNUT",
-            "run": f"{base_url}/runNUT",
-            "stop": f"{base_url}/stopNUT",
-            "testResults": f"{base_url}/testResults",
-            "newAction": f"{base_url}/newAction"
-        }
+        # The replicas of the NUT, each one as host:port. Defaults to the single nut_host and nut_port
+        nut_endpoints = config.get("nut_endpoints") or f"{config.get('nut_host')}:{config.get('nut_port')}"
+        self.pool = NutPool([f"http://{endpoint.strip()}{config.get('base_endpoint')}"
+                             for endpoint in nut_endpoints.split(",") if endpoint.strip()])
 
         # Create a session to keep the connection alive
         self.connection = requests.Session()
         self.stc = stc
         self.target = config.get("target")
+        self.batch_evaluation = config.get("batch_evaluation", False)
+        self.wire_format = config.get("wire_format", ConfigParser.WireFormat.JSON)
+        # Ids of the class labels, shared with the archive and the statistics
+        self.label_table = label_table
+        # Number of best predictions asked from the NUT, 0 for all of them
+        self.top_k = config.get("top_k", 0)
+        # Number of evaluations that can be in flight at the same time
+        self.max_in_flight = 1
+        # Image sent by run_nut, used to set up the replicas again after they have lost it
+        self.base_image = None
+
+        # Latency-aware timeouts, hedging and retries of the newAction requests
+        self.request_timeout = config.get("request_timeout", 30.0)
+        self.timeout_multiplier = config.get("timeout_multiplier", 4.0)
+        self.hedge_requests = config.get("hedge_requests", False)
+        self.max_retries = config.get("max_retries", 2)
+        self.retry_backoff = config.get("retry_backoff", 0.1)
+        # Own generator, so that the jitter does not change the random sequence of the search
+        self.jitter = random.Random()
+        self.request_counters = {"timeouts": 0, "retries": 0, "hedges": 0, "hedge_wins": 0}
+        self.counters_lock = threading.Lock()
+        self.hedge_executor = ThreadPoolExecutor(max_workers=4) if self.hedge_requests else None
+
+        health_check_interval = config.get("health_check_interval", 0)
+        if len(self.pool.endpoints) > 1 and health_check_interval > 0:
+            self.pool.start_health_checks(health_check_interval, self.endpoint_recovered)
+
+    def is_binary(self) -> bool:
+        """Check if raw image bytes and float32 score vectors are exchanged with the NUT."""
+        return self.wire_format in (ConfigParser.WireFormat.BINARY, ConfigParser.WireFormat.DELTA)
+
+    def is_delta(self) -> bool:
+        """Check if only the perturbed pixels are sent to the NUT."""
+        return self.wire_format == ConfigParser.WireFormat.DELTA
+
+    def binary_headers(self, image_array: np.ndarray) -> dict:
+        """Return the headers that describe a raw image body."""
+        return {
+            "Content-Type": self.BINARY_CONTENT_TYPE,
+            "Accept": self.BINARY_CONTENT_TYPE,
+            self.IMAGE_SHAPE_HEADER: ",".join(str(dim) for dim in image_array.shape),
+            self.IMAGE_DTYPE_HEADER: str(image_array.dtype),
+        }
 
-    def get_nut_info(self):
-        """Get NUT info."""
+    def parse_response(self, response, endpoint: NutEndpoint) -> NutRequest:
+        """Parse a newAction response, either a float32 score vector or a JSON prediction list."""
+        if not response.headers.get("content-type", "").startswith(self.BINARY_CONTENT_TYPE):
+            return NutRequest(response.json(), self.target, self.label_table)
+
+        top_k = response.headers.get(self.TOP_K_HEADER)
+        if top_k is None:
+            scores = np.frombuffer(response.content, dtype=np.float32)
+        else:
+            # Label ids of the returned predictions, followed by their scores
+            ids = np.frombuffer(response.content, dtype=np.int32, count=int(top_k))
+            scores = np.frombuffer(response.content, dtype=np.float32, offset=ids.nbytes)
+
+        if int(response.headers.get(self.LABEL_COUNT_HEADER, len(scores))) != len(endpoint.labels):
+            # The replica has seen new labels since the last request
+            endpoint.set_labels(self.get_nut_info(endpoint)["labels"], self.label_table)
+
+        label_ids = endpoint.label_ids if top_k is None else endpoint.label_ids[ids]
+        return NutRequest.from_ids(self.label_table, label_ids, scores, self.target)
+
+    def get_nut_info(self, endpoint: NutEndpoint = None):
+        """Get NUT info. Defaults to the first replica of the pool."""
+        endpoint = endpoint or self.pool.endpoints[0]
         try:
             logging.info("Getting NUT info")
-            return self.connection.get(self.NUT_ENDPOINTS["info"]).json()
+            return self.connection.get(endpoint.urls["info"]).json()
         except requests.exceptions.ConnectionError:
             logging.error("Connection Error")
             raise ConnectionError("Connection Error")
 
+    def get_statistics(self) -> list[dict]:
+        """Return the request statistics of every NUT replica."""
+        return self.pool.get_statistics()
+
     def run_nut(self, image_array):
-        """Run NUT."""
+        """Run NUT on every replica. The replicas that cannot be reached are taken out of rotation."""
+        logging.info("Running NUT. Sending image to NUT for testing...")
+        self.base_image = image_array
+        nut_info = None
+        for endpoint in self.pool.endpoints:
+            try:
+                endpoint_info = self.run_nut_on(endpoint, image_array)
+                nut_info = nut_info or endpoint_info
+            except ConnectionError:
+                with self.pool.lock:
+                    self.pool.set_health(endpoint, False)
+
+        if nut_info is None:
+            logging.error("Connection Error")
+            raise ConnectionError("Connection Error")
+        return nut_info
+
+    def run_nut_on(self, endpoint: NutEndpoint, image_array):
+        """Send the image under test to a replica of the NUT."""
         try:
-            logging.info("Running NUT. Sending image to NUT for testing...")
+            if self.is_binary():
+                headers = self.binary_headers(image_array)
+                if self.target is not None:
+                    headers[self.TARGET_HEADER] = self.target
+                response = self.connection.post(endpoint.urls["run"], data=image_array.tobytes(), headers=headers)
+                if response.status_code not in (415, 422):
+                    nut_info = response.json()
+                    endpoint.set_labels(nut_info.get("labels", []), self.label_table)
+                    self.start_session(endpoint, nut_info)
+                    return nut_info
+
+                logging.warning("NUT does not support the binary wire format. Falling back to JSON.")
+                self.wire_format = ConfigParser.WireFormat.JSON
+
             json_data = base64.b64encode(image_array).decode()
-            return self.connection.post(self.NUT_ENDPOINTS["run"],
-                                        json={"image": json_data, "target": self.target}).json()
+            nut_info = self.connection.post(endpoint.urls["run"],
+                                            json={"image": json_data, "target": self.target}).json()
+            # The label ids follow the order of the NUT
+            self.label_table.get_ids(nut_info.get("labels", []))
+            return nut_info
         except requests.exceptions.ConnectionError:
-            logging.error("Connection Error")
             raise ConnectionError("Connection Error")
 
-    def stop_nut(self):
-        """Stop NUT."""
+    def start_session(self, endpoint: NutEndpoint, nut_info):
+        """Keep the session of the base image, or leave the delta wire format if the NUT has not opened one."""
+        if not self.is_delta():
+            return
+
+        endpoint.session = nut_info.get("session")
+        if endpoint.session is None:
+            logging.warning("NUT does not support the delta wire format. Falling back to binary.")
+            self.wire_format = ConfigParser.WireFormat.BINARY
+
+    def endpoint_recovered(self, endpoint: NutEndpoint):
+        """Send the image under test again to a replica that is back in rotation, as it may have been restarted."""
+        if self.base_image is None:
+            return
+
         try:
-            logging.info("Stopping NUT")
-            return self.connection.post(self.NUT_ENDPOINTS["stop"]).json()
-        except requests.exceptions.ConnectionError:
+            self.run_nut_on(endpoint, self.base_image)
+        except ConnectionError:
+            with self.pool.lock:
+                self.pool.set_health(endpoint, False)
+
+    def stop_nut(self):
+        """Stop NUT on every replica."""
+        logging.info("Stopping NUT")
+        nut_info = None
+        for endpoint in self.pool.endpoints:
+            try:
+                nut_info = nut_info or self.connection.post(endpoint.urls["stop"]).json()
+            except requests.exceptions.ConnectionError:
+                logging.warning(f"NUT replica {endpoint.base_url} cannot be reached to stop it.")
+
+        if nut_info is None:
             logging.error("Connection Error")
             raise ConnectionError("Connection Error")
+        return nut_info
 
     def get_test_results(self):
         """Get test results."""
         # TODO: Not implemented and tested
         try:
             logging.info("Getting test results")
-            return (self.connection.get(self.NUT_ENDPOINTS["testResults"])
+            return (self.connection.get(self.pool.endpoints[0].urls["testResults"])
                     .json())
         except requests.exceptions.ConnectionError:
             logging.error("Connection Error")
@@ -71,15 +213,214 @@ class RemoteController:
 
     def new_action(self, image_array):
         """Send new action."""
-        try:
-            logging.info("Sending new action")
-            json_data = base64.b64encode(image_array).decode()
-            self.stc.new_individual_evaluation()
-            response = self.connection.post(self.NUT_ENDPOINTS["newAction"],
-                                            json={"image": json_data}).json()
-            nut_request = NutRequest(response, self.target)
-            return nut_request
+        logging.info("Sending new action")
+        self.stc.new_individual_evaluation()
+        return self.send("newAction", self.new_action_body(image_array))
+
+    def new_action_body(self, image_array) -> dict:
+        """Return the body and headers of a newAction request in the current wire format."""
+        if self.is_binary():
+            return {"data": image_array.tobytes(), "headers": self.binary_headers(image_array)}
+
+        return {"json": {"image": base64.b64encode(image_array).decode()}}
+
+    def send(self, name, request, parse=None, images: int = 1):
+        """
+        Send a request carrying a number of images to the NUT and parse its response.
 
+        Requests that fail or time out are retried with a jittered exponential backoff.
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self.send_hedged(name, request, parse or self.parse_response, images)
+            except (ConnectionError, TimeoutError):
+                if attempt == self.max_retries:
+                    raise
+                self.count("retries")
+                time.sleep(self.get_retry_backoff(attempt))
+
+    def send_hedged(self, name, request, parse, images: int = 1):
+        """Send a request, and a duplicate to another replica if no response arrives within the p95 round-trip time."""
+        hedge_delay = self.get_hedge_delay(images)
+        if hedge_delay is None:
+            return self.send_to_pool(name, request, parse, images)
+
+        primary = self.hedge_executor.submit(self.send_to_pool, name, request, parse, images)
+        if wait([primary], timeout=hedge_delay).done:
+            return primary.result()
+
+        self.count("hedges")
+        hedge = self.hedge_executor.submit(self.send_to_pool, name, request, parse, images)
+        for future in as_completed([primary, hedge]):
+            if future.exception() is None:
+                if future is hedge:
+                    self.count("hedge_wins")
+                return future.result()
+        return primary.result()
+
+    def send_to_pool(self, name, request, parse, images: int = 1):
+        """
+        Send a request to the least loaded replica of the NUT and parse its response.
+
+        A replica that cannot be reached or times out is taken out of rotation and the request is sent to the next one.
+        """
+        tried = []
+        for _ in self.pool.endpoints:
+            try:
+                with self.pool.connect(exclude=tried, images=images) as endpoint:
+                    tried.append(endpoint)
+                    return parse(self.post_to(endpoint, name, request, images), endpoint)
+            except (ConnectionError, TimeoutError) as e:
+                error = e
+
+        logging.error(error)
+        raise error
+
+    def request_headers(self, request) -> dict:
+        """Return an own copy of the headers of a request, with the number of predictions asked from the NUT."""
+        # Own copy, as a hedged copy of the request may be in flight to another replica
+        headers = dict(request.get("headers", {}))
+        if self.top_k > 0:
+            headers[self.TOP_K_HEADER] = str(self.top_k)
+        return headers
+
+    def post_to(self, endpoint: NutEndpoint, name, request, images: int = 1):
+        """Post a request to a replica, renewing its delta session if the replica has lost it."""
+        request = {**request, "headers": self.request_headers(request)}
+        headers = request["headers"]
+        timeout = self.get_request_timeout(images)
+        try:
+            if self.SESSION_HEADER in headers:
+                headers[self.SESSION_HEADER] = endpoint.session
+            response = self.connection.post(endpoint.urls[name], timeout=timeout, **request)
+            if response.status_code == 404 and self.SESSION_HEADER in headers:
+                self.renew_session(endpoint, headers[self.SESSION_HEADER])
+                headers[self.SESSION_HEADER] = endpoint.session
+                response = self.connection.post(endpoint.urls[name], timeout=timeout, **request)
+            return response
+        except requests.exceptions.Timeout:
+            self.count("timeouts")
+            raise TimeoutError("NUT request timed out")
         except requests.exceptions.ConnectionError:
-            logging.error("Connection Error")
             raise ConnectionError("Connection Error")
+
+    def get_request_timeout(self, images: int = 1) -> Optional[float]:
+        """
+        Return the timeout of a request carrying a number of images in seconds, or None if timeouts are disabled.
+
+        Once enough requests are answered, the timeout is a multiple of the p95 of their round-trip time
+        per image, scaled by the number of images and capped by request_timeout.
+        """
+        if self.request_timeout <= 0:
+            return None
+
+        p95 = self.pool.get_round_trip_time_percentile(95)
+        if p95 is None:
+            return self.request_timeout
+        return min(self.request_timeout,
+                   max(self.MIN_TIMEOUT_SECONDS, self.timeout_multiplier * p95 * images / 1000))
+
+    def get_hedge_delay(self, images: int = 1) -> Optional[float]:
+        """
+        Return how long to wait for a response before hedging a request, or None if it is not hedged.
+
+        The delay is the p95 of the round-trip time per image, scaled by the number of images of the request.
+        """
+        if not self.hedge_requests:
+            return None
+
+        p95 = self.pool.get_round_trip_time_percentile(95)
+        if p95 is None:
+            return None
+        return max(self.MIN_HEDGE_DELAY_SECONDS, p95 * images / 1000)
+
+    def get_retry_backoff(self, attempt: int) -> float:
+        """Return the time to wait in seconds before a retry, doubled at each attempt and jittered."""
+        return self.retry_backoff * 2 ** attempt * self.jitter.uniform(0.5, 1.0)
+
+    def count(self, counter: str) -> None:
+        """Increment a request counter."""
+        with self.counters_lock:
+            self.request_counters[counter] += 1
+
+    def get_request_statistics(self) -> dict:
+        """Return the number of timeouts, retries and hedges of the newAction requests."""
+        with self.counters_lock:
+            return dict(self.request_counters)
+
+    def submit_new_action(self, image_array) -> Future:
+        """
+        Send new action and return its result as a future. The request is completed before returning.
+
+        Every controller serializes the image before returning, so the caller may reuse its buffer.
+        """
+        return self.completed_future(self.new_action, image_array)
+
+    def submit_new_action_delta(self, actions) -> Future:
+        """Send the perturbed pixels of a new action and return its result as a future."""
+        return self.completed_future(self.new_action_delta, actions)
+
+    @staticmethod
+    def completed_future(function, *args) -> Future:
+        """Run the function and wrap its result or exception into a completed future."""
+        future: Future = Future()
+        try:
+            future.set_result(function(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def new_action_batch(self, image_arrays):
+        """
+        Send a batch of new actions.
+
+        If batch evaluation is disabled, the images are sent one by one to the newAction
+        endpoint. Otherwise, all images are sent in a single request to the newActionBatch
+        endpoint and the NUT is expected to return one prediction list per image. The images
+        may be any iterable, each one is serialized before the next one is read.
+        """
+        if not self.batch_evaluation:
+            return [self.new_action(image_array) for image_array in image_arrays]
+
+        json_data = [base64.b64encode(image_array).decode() for image_array in image_arrays]
+        logging.info(f"Sending {len(json_data)} new actions as a batch")
+        for _ in json_data:
+            self.stc.new_individual_evaluation()
+        return self.send("newActionBatch", {"json": {"images": json_data}}, self.parse_batch_response,
+                         len(json_data))
+
+    def parse_batch_response(self, response, endpoint: NutEndpoint) -> list[NutRequest]:
+        """Parse a newActionBatch response into one NutRequest per image."""
+        return [NutRequest({"predictions": predictions}, self.target, self.label_table)
+                for predictions in response.json()["predictions"]]
+
+    def new_action_delta(self, actions):
+        """
+        Send only the perturbed pixels of a new action.
+
+        The actions are applied in order on the base image sent by run_nut, so a later action
+        overrides an earlier one at the same location.
+        """
+        logging.info("Sending new action as delta")
+        self.stc.new_individual_evaluation()
+        return self.send("newActionDelta", self.new_action_delta_body(actions))
+
+    def new_action_delta_body(self, actions) -> dict:
+        """Return the body and headers of a newActionDelta request. The session is set per replica when sent."""
+        body = np.array([(*action.get_location(), *action.get_color()) for action in actions],
+                        dtype=np.int16).tobytes()
+        headers = {
+            "Content-Type": self.BINARY_CONTENT_TYPE,
+            "Accept": self.BINARY_CONTENT_TYPE,
+            self.SESSION_HEADER: None,
+        }
+        return {"data": body, "headers": headers}
+
+    def renew_session(self, endpoint: NutEndpoint, expired_session):
+        """Upload the base image again if the replica has lost the session (e.g. it was restarted)."""
+        if endpoint.session != expired_session:
+            # Another request has already renewed it
+            return
+
+        logging.warning("NUT session expired. Sending the base image again.")
+        self.run_nut_on(endpoint, self.base_image)
@@ -5,7 +5,16 @@ import numpy as np
 
 class Action:
 
-    """Represents an action with a location, RGB color, noise calculation, and parent-child relationship."""
+    """
+    Represents an action with a location, RGB color, noise calculation, and parent-child relationship.
+
+    Actions are small value objects. The attributes are kept in slots, and the color array and the
+    hash are built on first use and cached. The color array is read-only, as it is shared by all
+    callers. Use with_color and with_location to derive a changed action; the setters are kept for
+    compatibility and refresh the cache.
+    """
+
+    __slots__ = ("location", "red", "green", "blue", "parent", "noise", "color", "hash_value")
 
     def __init__(self, location: Tuple[int, int], red: int, green: int, blue: int) -> None:
         """Initializes an Action instance with a location, RGB color values, and default parent (None) and noise (0)."""
@@ -15,6 +24,8 @@ class Action:
         self.blue = blue
         self.parent = None
         self.noise = 0
+        self.color = None
+        self.hash_value = None
 
     def set_parent(self, parent) -> None:
         """Sets the parent of the current action to the provided parent object."""
@@ -25,20 +36,41 @@ class Action:
         return self.parent
 
     def get_location(self):
-        """Returns the location of the action as a tuple (x, y)."""
+        """Returns the location of the action as a (row, column) tuple, as the image arrays are indexed."""
         return self.location
 
     def set_location(self, x, y):
         """Sets the location of the action to the provided x and y values."""
         self.location = (x, y)
+        self.hash_value = None
 
     def get_color(self):
-        """Returns the RGB color of the action as a NumPy array [red, green, blue]."""
-        return np.array([self.red, self.green, self.blue])
+        """Returns the RGB color of the action as a read-only NumPy array [red, green, blue]."""
+        if self.color is None:
+            color = np.array([self.red, self.green, self.blue])
+            color.flags.writeable = False
+            self.color = color
+        return self.color
 
     def set_color(self, color):
         """Sets the RGB color of the action to the provided color."""
         self.red, self.green, self.blue = color
+        self.color = None
+        self.hash_value = None
+
+    def with_color(self, color):
+        """Returns a copy of the action with the provided color."""
+        action = Action(self.location, *color)
+        action.parent = self.parent
+        action.noise = self.noise
+        return action
+
+    def with_location(self, x, y):
+        """Returns a copy of the action at the provided location."""
+        action = Action((x, y), self.red, self.green, self.blue)
+        action.parent = self.parent
+        action.noise = self.noise
+        return action
 
     def calculate_noise(self, current_value):
         """
@@ -55,7 +87,7 @@ class Action:
         """Compares two Action objects for equality based on their location and color."""
         if not isinstance(o, Action):
             return False
-        return self.location == o.location and all(self.get_color() == o.get_color())
+        return self.location == o.location and (self.red, self.green, self.blue) == (o.red, o.green, o.blue)
 
     def same_location(self, o: object) -> bool:
         """Compares two Action objects for equality based on their location."""
@@ -65,15 +97,19 @@ class Action:
 
     def __hash__(self) -> int:
         """Returns a hash of the Action object based on its location and color."""
-        return hash((self.location, tuple(self.get_color())))
+        if self.hash_value is None:
+            self.hash_value = hash((self.location, (self.red, self.green, self.blue)))
+        return self.hash_value
 
     def __str__(self) -> str:
         """Returns a string representation of the action, including its location and color."""
         return f"Action at {self.location} with color {self.get_color()}"
 
     def copy(self):
-        """Returns a copy of the action."""
+        """Returns a copy of the action. The cached color array and hash are shared, the setters replace them."""
         action = Action(self.location, self.red, self.green, self.blue)
-        action.set_parent(self.parent)
+        action.parent = self.parent
         action.noise = self.noise
+        action.color = self.color
+        action.hash_value = self.hash_value
         return action
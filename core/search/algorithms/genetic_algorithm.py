@@ -1,4 +1,6 @@
 """Genetic algorithm implementation."""
+from functools import partial
+
 import numpy as np
 
 from core.config_parser import ConfigParser
@@ -37,8 +39,7 @@ class GeneticAlgorithm(SearchAlgorithm):
         self.population_size = self.config.get("population_size")
         self.population: list[EvaluatedIndividual] = []
 
-        for _ in range(self.population_size):
-            individual = self.sampler.sample()
+        for individual in self.sampler.sample_batch(self.population_size):
             ei = self.ff.calculate_fitness(individual)
             self.archive.add_archive_if_needed(ei)
             self.population.append(ei)
@@ -47,30 +48,59 @@ class GeneticAlgorithm(SearchAlgorithm):
         """Return the type of the search algorithm."""
         return ConfigParser.Algorithms.GENETIC
 
-    def selection(self, parent1: EvaluatedIndividual):
-        """Roullette wheel selection to select a parent for crossover."""
-        all_fitnesses = np.array([ind.fitness.value for ind in self.population])
-        scaled_fitness = 1.0 - all_fitnesses
-        selection_probs = np.exp(scaled_fitness) / np.sum(np.exp(scaled_fitness))
-        selected = self.randomness.get_random_element(self.population, selection_probs=selection_probs)
-        while parent1 == selected:
-            selected = self.randomness.get_random_element(self.population, selection_probs=selection_probs)
-        return selected.copy()
+    def selection(self) -> list[EvaluatedIndividual]:
+        """
+        Roulette wheel selection of a crossover partner for each individual of the population.
+
+        The selection probabilities are the softmax of 1 - fitness over the population, computed once
+        per generation. The partner of the i-th individual is drawn from the other individuals, with
+        the probabilities renormalized without it: a uniform value over 1 - p_i is located in the
+        cumulative probabilities, skipping the interval of the i-th individual.
+        """
+        size = len(self.population)
+        if size < 2:
+            return list(self.population)
+
+        scaled_fitness = 1.0 - np.array([ind.fitness.value for ind in self.population])
+        weights = np.exp(scaled_fitness - scaled_fitness.max())
+        selection_probs = weights / weights.sum()
+        cumulative = np.cumsum(selection_probs)
+
+        values = self.randomness.next_floats(size) * (1.0 - selection_probs)
+        values += np.where(values >= cumulative - selection_probs, selection_probs, 0.0)
+        partners = np.minimum(np.searchsorted(cumulative, values, side="right"), size - 1)
+        # Rounding may land on the excluded individual at the edge of its interval
+        indices = np.arange(size)
+        partners = np.where(partners == indices, (indices + 1) % size, partners)
+        return [self.population[partner] for partner in partners.tolist()]
 
     def search_once(self):
-        """Search for a solution."""
+        """
+        Search for a solution.
 
-        for i in range(self.population_size):
-            parent1 = self.population[i].copy()
-            parent2 = self.selection(parent1)
+        The children of a generation only depend on the population at its start, so they are all
+        created first. With several evaluations in flight they are pipelined, otherwise each pair is
+        evaluated with a batch request.
+        """
+        children = []
+        for ei, parent2 in zip(self.population, self.selection()):
+            # The crossover changes the parents in place, the copies share their actions until then
+            individual1 = ei.individual.copy()
+            individual2 = parent2.individual.copy()
 
-            self.crossover.apply_crossover(parent1.individual, parent2.individual)
-            child1 = self.mutator.mutate(parent1.individual)
-            child2 = self.mutator.mutate(parent2.individual)
+            self.crossover.apply_crossover(individual1, individual2)
+            children.append(self.mutator.mutate_batch([individual1, individual2]))
 
-            fitness1 = self.ff.calculate_fitness(child1)
-            fitness2 = self.ff.calculate_fitness(child2)
+        if self.ff.get_max_in_flight() > 1:
+            evaluated = [[None, None] for _ in children]
+            for pair, (child1, child2) in zip(evaluated, children):
+                self.submit_evaluation(child1, partial(pair.__setitem__, 0))
+                self.submit_evaluation(child2, partial(pair.__setitem__, 1))
+            self.wait_pending_evaluations()
+        else:
+            evaluated = [self.ff.calculate_fitness_batch(pair) for pair in children]
 
+        for i, (fitness1, fitness2) in enumerate(evaluated):
             final_fitness = fitness1 if fitness1.fitness.value < fitness2.fitness.value else fitness2
             self.archive.add_archive_if_needed(final_fitness)
             self.population[i] = final_fitness
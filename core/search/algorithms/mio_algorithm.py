@@ -15,15 +15,15 @@ class MioAlgorithm(SearchAlgorithm):
     def search_once(self):
         """Search for a solution."""
 
-        if self.archive.is_empty() or self.randomness.next_bool(self.apc.get_probability_random_sampling()):
+        sample = None
+        if not (self.archive.is_empty() or self.randomness.next_bool(self.apc.get_probability_random_sampling())):
+            sample = self.archive.sample_individual()
+
+        # A new individual is sampled as well if the archive only holds the merged individual
+        if sample is None:
             individual = self.sampler.sample()
-            ei = self.ff.calculate_fitness(individual)
-            self.archive.add_archive_if_needed(ei)
+            self.submit_evaluation(individual, self.archive.add_archive_if_needed)
             return
 
-        sample = self.archive.sample_individual()
-
-        if sample is not None:
-            mutated = self.mutator.mutate(sample.individual)
-            ei = self.ff.calculate_fitness(mutated)
-            self.archive.add_archive_if_needed(ei, sample)
+        mutated = self.mutator.mutate(sample.individual)
+        self.submit_evaluation(mutated, lambda ei: self.archive.add_archive_if_needed(ei, sample))
@@ -15,5 +15,4 @@ class RandomAlgorithm(SearchAlgorithm):
         """Search for a solution."""
 
         individual = self.sampler.sample()
-        ei = self.ff.calculate_fitness(individual)
-        self.archive.add_archive_if_needed(ei)
+        self.submit_evaluation(individual, self.archive.add_archive_if_needed)
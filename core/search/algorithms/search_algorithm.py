@@ -1,4 +1,9 @@
 """Abstract class for search algorithms."""
+from collections import deque
+from typing import Callable
+
+from core.search.evaluated_individual import EvaluatedIndividual
+from core.search.individual import Individual
 from core.search.service.adaptive_parameter_control import AdaptiveParameterControl
 from core.search.service.archive import Archive
 from core.search.service.crossover.crossover import Crossover
@@ -33,6 +38,8 @@ class SearchAlgorithm:
         self.crossover = crossover
         self.sampler = sampler
         self.apc = apc
+        # Submitted evaluations with the callbacks that consume them, in submission order
+        self.pending_evaluations = deque()
 
     def get_type(self):
         """Return the type of the search algorithm."""
@@ -55,9 +62,33 @@ class SearchAlgorithm:
         while self.stc.should_continue_search():
             self.search_once()
 
+        self.wait_pending_evaluations()
         solution = self.after_search()
         return solution
 
     def after_search(self):
         """Actions to do after the search."""
         return self.archive.extract_solution()
+
+    def submit_evaluation(self, individual: Individual,
+                          on_evaluated: Callable[[EvaluatedIndividual], None]) -> None:
+        """
+        Submit an individual for evaluation and consume the results once the pipeline is full.
+
+        The callbacks are called in submission order, so with a single evaluation in flight
+        this is equivalent to evaluating the individual and calling the callback right away.
+        """
+        self.pending_evaluations.append((self.ff.submit_fitness(individual), on_evaluated))
+
+        while len(self.pending_evaluations) >= self.ff.get_max_in_flight():
+            self.consume_pending_evaluation()
+
+    def wait_pending_evaluations(self) -> None:
+        """Wait for all the evaluations in flight and consume their results."""
+        while self.pending_evaluations:
+            self.consume_pending_evaluation()
+
+    def consume_pending_evaluation(self) -> None:
+        """Wait for the oldest evaluation in flight and call its callback."""
+        future, on_evaluated = self.pending_evaluations.popleft()
+        on_evaluated(future.result())
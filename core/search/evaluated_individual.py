@@ -14,6 +14,10 @@ class EvaluatedIndividual:
         self.individual = individual
         self.sampling_counter = 0
 
+    def get_memory_size(self) -> int:
+        """Returns an estimate of the memory used by the individual and its fitness value, in bytes."""
+        return self.individual.get_memory_size() + self.fitness.get_memory_size()
+
     def copy(self):
         """Returns a copy of the EvaluatedIndividual."""
         return EvaluatedIndividual(self.individual.copy(), self.fitness.copy())
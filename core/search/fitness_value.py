@@ -4,6 +4,10 @@ Represents a fitness value and execution time
 Represents a fitness value and execution time, with methods to set fitness value
 and execution time in milliseconds.
 """
+import sys
+from collections.abc import Sequence
+
+from core.utils.nut_request import Predictions
 
 
 class FitnessValue:
@@ -13,9 +17,11 @@ class FitnessValue:
 
     Represents a fitness value and execution time, with methods to set fitness value
     and execution time in milliseconds.
+
+    The predictions are usually a compact Predictions score array, expanded to labels when reported.
     """
 
-    def __init__(self, value: float, predictions: list, execution_time_ms: int = 0):
+    def __init__(self, value: float, predictions: Sequence, execution_time_ms: int = 0):
         """Initializes FitnessValue with default fitness_value=0 and execution_time_ms=0."""
         self.value = value
         self.execution_time_ms = execution_time_ms
@@ -33,6 +39,12 @@ class FitnessValue:
         """Sets the predictions to the provided list."""
         self.predictions = predictions
 
+    def get_memory_size(self) -> int:
+        """Returns an estimate of the memory used by the fitness value and its predictions, in bytes."""
+        if isinstance(self.predictions, Predictions):
+            return sys.getsizeof(self) + self.predictions.get_memory_size()
+        return sys.getsizeof(self) + sys.getsizeof(self.predictions) + sum(map(sys.getsizeof, self.predictions))
+
     def copy(self):
         """Returns a copy of the FitnessValue."""
         return FitnessValue(self.value, self.predictions, self.execution_time_ms)
@@ -1,36 +1,220 @@
 """Individual search functions."""
+import sys
+
+import numpy as np
+
+from core.search.action import Action
 
 
 class Individual:
 
-    """Individual search functions."""
+    """
+    Individual search functions.
+
+    The actions are stored as a struct of arrays: an Nx2 int16 location array, an Nx3 uint8 color
+    array and a hash from location to index. No two actions share a location, so copies, crossovers
+    and image writes are vectorized and location collisions are found in constant time. Action
+    objects are only built as views for the callers that need them.
+
+    Copies are copy-on-write: they share the arrays and the location index until one of them
+    writes. An action set on shared arrays, as the mutators do, is kept as an override of its slot,
+    so a mutation allocates O(1). The overrides are written into own arrays when the arrays are read.
+    """
 
     def __init__(self):
-        """Initializes an individual with an empty list of actions."""
-        self.actions = []
+        """Initializes an individual with no actions."""
+        # The buffers grow by doubling, only the first `length` rows are actions
+        self.location_buffer = np.empty((0, 2), dtype=np.int16)
+        self.color_buffer = np.empty((0, 3), dtype=np.uint8)
+        self.length = 0
+        self.location_index: dict[tuple[int, int], int] = {}
         self.individual_origin = None
+        # The buffers and the location index are shared with a copy and must be copied before writing
+        self.shared = False
+        # Actions set on the shared buffers by index, and the index of their locations
+        self.overrides: dict[int, tuple[tuple[int, int], np.ndarray]] = {}
+        self.override_index: dict[tuple[int, int], int] = {}
+
+    @property
+    def actions(self) -> list[Action]:
+        """The actions of the individual, as Action views."""
+        return self.get_actions()
+
+    def get_locations(self) -> np.ndarray:
+        """Get the Nx2 location array of the actions. It must not be modified."""
+        if self.overrides:
+            self.own()
+        return self.location_buffer[:self.length]
+
+    def get_colors(self) -> np.ndarray:
+        """Get the Nx3 color array of the actions. It must not be modified."""
+        if self.overrides:
+            self.own()
+        return self.color_buffer[:self.length]
+
+    def own(self):
+        """Copy the shared buffers and location index, and write the overrides into them."""
+        if not self.shared:
+            return
+        self.location_buffer = self.location_buffer[:self.length].copy()
+        self.color_buffer = self.color_buffer[:self.length].copy()
+        self.location_index = self.location_index.copy()
+        self.shared = False
+
+        # The locations replaced are removed first, as an override may take the location of another slot
+        for index in self.overrides:
+            del self.location_index[tuple(self.location_buffer[index].tolist())]
+        for index, (key, color) in self.overrides.items():
+            self.location_buffer[index] = key
+            self.color_buffer[index] = color
+            self.location_index[key] = index
+        self.overrides = {}
+        self.override_index = {}
+
+    def find(self, key: tuple[int, int]):
+        """Get the index of the action at a location, or None."""
+        index = self.override_index.get(key)
+        if index is not None:
+            return index
+        index = self.location_index.get(key)
+        return None if index in self.overrides else index
+
+    def reserve(self, size: int):
+        """Grow the buffers to hold at least size actions."""
+        if self.shared:
+            self.own()
+        if size <= len(self.location_buffer):
+            return
+        capacity = max(size, 2 * len(self.location_buffer), 8)
+        location_buffer = np.empty((capacity, 2), dtype=np.int16)
+        color_buffer = np.empty((capacity, 3), dtype=np.uint8)
+        location_buffer[:self.length] = self.get_locations()
+        color_buffer[:self.length] = self.get_colors()
+        self.location_buffer = location_buffer
+        self.color_buffer = color_buffer
 
     def add_action(self, action, replace=True):
-        """Add an action to the individual."""
-        does_contain = [action.same_location(a) for a in self.actions]
+        """
+        Add an action to the individual.
 
-        if not replace and any(does_contain):
-            # If the action already exists in the individual and we don't want to replace it, return False
-            return False
+        An action at the location of another one replaces it, unless replace is False, in which
+        case the action is not added and False is returned.
+        """
+        x, y = action.get_location()
+        key = (int(x), int(y))
+        index = self.find(key) if self.shared else self.location_index.get(key)
 
-        if any(does_contain):
-            # If the action already exists in the individual, replace it
-            index = does_contain.index(True)
-            self.actions[index] = action
+        if index is not None:
+            if not replace:
+                # If the action already exists in the individual and we don't want to replace it, return False
+                return False
+            self.own()
+            self.color_buffer[index] = action.get_color()
             return True
 
-        if action not in self.actions:
-            self.actions.append(action)
-            return True
+        self.reserve(self.length + 1)
+        self.location_buffer[self.length] = key
+        self.color_buffer[self.length] = action.get_color()
+        self.location_index[key] = self.length
+        self.length += 1
+        return True
+
+    def add_actions(self, locations: np.ndarray, colors: np.ndarray, replace=True):
+        """
+        Add actions given as Nx2 location and Nx3 color arrays.
+
+        Like add_action, an action at an existing location replaces it unless replace is False, and
+        a later action replaces an earlier one at the same location.
+        """
+        locations = np.asarray(locations, dtype=np.int16).reshape(-1, 2)
+        colors = np.asarray(colors).reshape(-1, 3)
+        self.own()
+        first_new = self.length
+
+        size = self.length
+        indices = np.empty(len(locations), dtype=np.intp)
+        for i, key in enumerate(map(tuple, locations.tolist())):
+            index = self.location_index.setdefault(key, size)
+            if index == size:
+                size += 1
+            indices[i] = index
+
+        self.reserve(size)
+        new = indices >= first_new
+        self.location_buffer[indices[new]] = locations[new]
+        if not replace:
+            indices, colors = indices[new], colors[new]
+        # With repeated indices the last assignment wins
+        self.color_buffer[indices] = colors
+        self.length = size
+
+    def get_action(self, index: int) -> Action:
+        """Get the action at the index as an Action view."""
+        override = self.overrides.get(index)
+        if override is not None:
+            key, color = override
+            return Action(key, *color.tolist())
+        x, y = self.location_buffer[index].tolist()
+        red, green, blue = self.color_buffer[index].tolist()
+        return Action((x, y), red, green, blue)
 
     def get_actions(self):
         """Get the actions of the individual."""
-        return self.actions
+        return [Action((x, y), red, green, blue)
+                for (x, y), (red, green, blue) in zip(self.get_locations().tolist(), self.get_colors().tolist())]
+
+    def set_action(self, index: int, action):
+        """
+        Replace the action at the index. An action already at the new location is removed.
+
+        On shared buffers, the action is kept as an override unless it removes another action.
+        """
+        x, y = action.get_location()
+        key = (int(x), int(y))
+        other = self.find(key)
+        if self.shared and other in (None, index):
+            self.set_override(index, key, np.asarray(action.get_color(), dtype=np.uint8))
+            return
+
+        self.own()
+        if other is not None and other != index:
+            self.remove_action(other)
+            if other < index:
+                index -= 1
+
+        del self.location_index[tuple(self.location_buffer[index].tolist())]
+        self.location_buffer[index] = key
+        self.color_buffer[index] = action.get_color()
+        self.location_index[key] = index
+
+    def set_override(self, index: int, key: tuple[int, int], color: np.ndarray):
+        """Override the action at the index of the shared buffers."""
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("Action index out of range")
+        previous = self.overrides.get(index)
+        if previous is not None:
+            del self.override_index[previous[0]]
+        self.overrides[index] = (key, color)
+        self.override_index[key] = index
+
+    def remove_action(self, index: int):
+        """Remove the action at the index."""
+        self.own()
+        del self.location_index[tuple(self.location_buffer[index].tolist())]
+        self.location_buffer[index:self.length - 1] = self.location_buffer[index + 1:self.length]
+        self.color_buffer[index:self.length - 1] = self.color_buffer[index + 1:self.length]
+        self.length -= 1
+        for i, key in enumerate(map(tuple, self.location_buffer[index:self.length].tolist()), start=index):
+            self.location_index[key] = i
+
+    def truncate(self, size: int):
+        """Keep only the first size actions."""
+        self.own()
+        for key in map(tuple, self.location_buffer[size:self.length].tolist()):
+            del self.location_index[key]
+        self.length = min(size, self.length)
 
     def set_individual_origin(self, individual_origin):
         """Set the individual origin."""
@@ -38,39 +222,53 @@ class Individual:
 
     def size(self):
         """Get the number of actions in the individual."""
-        return len(self.actions)
+        return self.length
+
+    def get_memory_size(self) -> int:
+        """Get an estimate of the memory used by the individual, in bytes."""
+        # The keys of the location index are (x, y) tuples
+        return (sys.getsizeof(self) + self.location_buffer.nbytes + self.color_buffer.nbytes
+                + sys.getsizeof(self.location_index) + len(self.location_index) * sys.getsizeof((0, 0)))
 
     def copy(self):
-        """Copy the individual."""
+        """Copy the individual. The buffers and the location index are shared until one of the individuals writes."""
         new_individual = Individual()
-        for action in self.actions:
-            new_individual.add_action(action.copy())
+        new_individual.location_buffer = self.location_buffer
+        new_individual.color_buffer = self.color_buffer
+        new_individual.length = self.length
+        new_individual.location_index = self.location_index
+        new_individual.overrides = self.overrides.copy()
+        new_individual.override_index = self.override_index.copy()
+        new_individual.shared = self.shared = True
         return new_individual
 
     def get_action_image(self, action_image):
         """Get the image."""
-        for action in self.actions:
-            x, y = action.get_location()
-            action_image[x, y] = action.get_color()
+        locations = self.get_locations()
+        action_image[locations[:, 0], locations[:, 1]] = self.get_colors()
         return action_image
 
     def crossover(self, other, position1: int, position2: int):
-        """Perform crossover between two individuals."""
+        """
+        Perform crossover between two individuals.
+
+        The actions of this individual from position1 on are replaced by the actions of the other
+        individual from position2 on. An action of the other individual replaces the action kept
+        at its location.
+        """
         if not isinstance(other, Individual):
             raise TypeError("Crossover can only be performed with another Individual")
 
-        if position1 < 0 or position2 < 0 or position1 >= len(self.actions) or position2 >= len(other.actions):
+        if position1 < 0 or position2 < 0 or position1 >= self.length or position2 >= other.length:
             raise ValueError("Invalid crossover positions")
 
-        if position1 < len(self.actions):
-            del self.actions[position1:]
-
-        for num in range(position2, len(other.actions)):
-            other_action = other.actions[num].copy()
-            self.actions.append(other_action)
+        self.truncate(position1)
+        self.add_actions(other.get_locations()[position2:], other.get_colors()[position2:])
 
     def __eq__(self, other):
         """Check if two individuals are equal."""
         if not isinstance(other, Individual):
             return False
-        return self.actions == other.actions and self.individual_origin == other.individual_origin
+        return (np.array_equal(self.get_locations(), other.get_locations())
+                and np.array_equal(self.get_colors(), other.get_colors())
+                and self.individual_origin == other.individual_origin)
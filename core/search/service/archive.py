@@ -1,21 +1,45 @@
 """Module contains the Archive class, which is a base class for the archives used in the search service."""
+from contextlib import contextmanager
 from typing import Optional
 
 import numpy as np
 
 from core.search.evaluated_individual import EvaluatedIndividual
+from core.search.individual import Individual
 from core.search.service.randomness import Randomness
+from core.search.service.sampling_buckets import SamplingBuckets
 from core.search.service.search_time_controller import SearchTimeController
 from core.search.solution import Solution
 from core.utils.images import ProcessedImage
+from core.utils.label_table import LabelTable
 from core.utils.nut_request import NutRequest
 
 
 class Archive:
 
-    """Base class for the archives used in the search service."""
+    """
+    Base class for the archives used in the search service.
 
-    def __init__(self, stc: SearchTimeController, randomness: Randomness, config: dict) -> None:
+    The archive keeps the composite image, the original image with the actions of all the archived
+    individuals applied in order, and a pixel index holding for each pixel the sequence number of
+    the last archived action written to it, or -1. Both are updated when an individual is archived,
+    so the image of a candidate is one copy of the composite plus the scatter of its actions.
+
+    A working copy of the composite is kept as well. The pixels of a candidate are written into it
+    and reverted once the request is serialized, so no image is allocated per evaluation.
+
+    The archive is shrunk without changing its image: the oldest individuals are merged into one
+    while the archive exceeds archive_max_size individuals or archive_max_bytes, and if
+    archive_drop_shadowed is enabled, the individuals whose actions are all overwritten by later
+    ones are dropped. By default the archive is unbounded and never shrunk. The merged individual
+    only keeps the image and is not sampled.
+    """
+
+    # Number of individuals from which the shadowed ones are dropped, doubled after each shrink
+    MIN_SHRINK_SIZE = 64
+
+    def __init__(self, stc: SearchTimeController, randomness: Randomness, config: dict,
+                 label_table: LabelTable) -> None:
         """Initialize the archive."""
 
         self.original_predication_results = None
@@ -26,10 +50,41 @@ class Archive:
         self.config = config
         self.image: ProcessedImage = ProcessedImage(None, None, None)
         self.minimized_solution: Optional[Solution] = None
+        # Shared with the remote controller, so the label ids of their predictions can be compared
+        self.label_table = label_table
+        self.composite: Optional[np.ndarray] = None
+        self.pixel_index: Optional[np.ndarray] = None
+        # The population list and the number of its individuals and actions applied to the composite
+        self.composite_populations: Optional[list[EvaluatedIndividual]] = None
+        self.composite_size = 0
+        self.composite_actions = 0
+        self.working_image: Optional[np.ndarray] = None
+        # The last archived action of each location, and the population list and number of individuals indexed
+        self.location_index: dict[tuple[int, int], object] = {}
+        self.indexed_populations: Optional[list[EvaluatedIndividual]] = None
+        self.indexed_size = 0
+        # The archived individuals by sampling counter, and the population list and number of individuals added
+        self.sampling_buckets = SamplingBuckets()
+        self.bucketed_populations: Optional[list[EvaluatedIndividual]] = None
+        self.bucketed_size = 0
+        # Bumped when the image or the archived individuals change, the extracted solution is kept until then
+        self.version = 0
+        self.extracted_solution: Optional[tuple[int, Solution]] = None
+        self.max_size = config.get("archive_max_size", 0)
+        self.max_bytes = config.get("archive_max_bytes", 0)
+        self.drop_shadowed = config.get("archive_drop_shadowed", False)
+        self.shrink_size = self.MIN_SHRINK_SIZE
+        # The individual the oldest ones were merged into, kept out of the sampling buckets
+        self.merged_individual: Optional[EvaluatedIndividual] = None
+        # Estimated memory of the archived individuals
+        self.populations_bytes = 0
 
     def clean_population(self):
         """Clean the populations list."""
         self.populations = []
+        self.populations_bytes = 0
+        self.merged_individual = None
+        self.version += 1
 
     def add_archive_if_needed(self, individual: EvaluatedIndividual,
                               parent: Optional[EvaluatedIndividual] = None) -> bool:
@@ -37,29 +92,113 @@ class Archive:
         if self.stc.get_current_fitness_value() > individual.fitness.value:
             self.stc.set_current_fitness(individual.fitness)
             self.populations.append(individual)
+            self.populations_bytes += individual.get_memory_size()
+            self.version += 1
             self.stc.new_action_improvement()
 
             if parent is not None:
-                parent.sampling_counter = 0
+                self.get_sampling_buckets().reset(parent)
+
+            if self.needs_shrink():
+                self.shrink_archive()
+            self.update_composite()
             return True
         return False
 
     def sample_individual(self):
-        """Sample an individual from the archive."""
+        """Sample one of the least sampled individuals of the archive at random in O(1), or None if there is none."""
 
-        if self.populations.__len__() == 0:
+        if len(self.get_sampling_buckets()) == 0:
             return
 
-        sampling_counter = np.array([i.sampling_counter for i in self.populations])
-        random_index = self.randomness.random_choice(np.flatnonzero(sampling_counter == min(sampling_counter)))
-        individual = self.populations[random_index]
+        individual = self.get_sampling_buckets().sample(self.randomness)
         self.last_chosen = individual
-        individual.sampling_counter += 1
         return individual
 
+    def get_sampling_buckets(self) -> SamplingBuckets:
+        """
+        Get the archived individuals grouped by sampling counter.
+
+        Only the individuals archived since the last call are added. The buckets are rebuilt if the
+        population list was replaced. The merged individual is left out.
+        """
+        if self.bucketed_populations is not self.populations or self.bucketed_size > len(self.populations):
+            self.sampling_buckets = SamplingBuckets()
+            self.bucketed_populations = self.populations
+            self.bucketed_size = 0
+
+        for ei in self.populations[self.bucketed_size:]:
+            if ei is not self.merged_individual:
+                self.sampling_buckets.add(ei)
+        self.bucketed_size = len(self.populations)
+        return self.sampling_buckets
+
+    def needs_shrink(self) -> bool:
+        """Check if the archive exceeds its bounds, or if it has doubled in size since it was last shrunk."""
+        return (self.exceeds_bounds(len(self.populations), self.populations_bytes)
+                or (self.drop_shadowed and len(self.populations) >= self.shrink_size))
+
+    def exceeds_bounds(self, size: int, size_bytes: int) -> bool:
+        """Check if a number of individuals and their memory exceed the bounds of the archive."""
+        return 0 < self.max_size < size or 0 < self.max_bytes < size_bytes
+
     def shrink_archive(self):
-        """Remove individuals from the archive that do not improve the fitness of the current best solution."""
-        raise NotImplementedError("This method should be implemented")
+        """
+        Remove individuals from the archive without changing its image.
+
+        The individuals shadowed by later ones are dropped, then the oldest individuals are merged
+        into one while the archive exceeds its bounds. The population list is replaced, so the
+        composite image, the location index and the sampling buckets are rebuilt.
+        """
+        populations = self.populations
+        if self.drop_shadowed:
+            populations = self.drop_shadowed_individuals(populations)
+        populations = self.merge_oldest_individuals(populations)
+
+        self.populations = populations
+        self.populations_bytes = sum(ei.get_memory_size() for ei in populations)
+        self.version += 1
+        self.shrink_size = max(self.MIN_SHRINK_SIZE, 2 * len(populations))
+
+    @staticmethod
+    def drop_shadowed_individuals(populations: list[EvaluatedIndividual]) -> list[EvaluatedIndividual]:
+        """Return the individuals with an action at a location no later individual writes. The last one is kept."""
+        written = set()
+        kept = []
+        for i, ei in enumerate(reversed(populations)):
+            locations = set(map(tuple, ei.individual.get_locations().tolist()))
+            if i == 0 or not locations <= written:
+                kept.append(ei)
+            written |= locations
+        kept.reverse()
+        return kept
+
+    def merge_oldest_individuals(self, populations: list[EvaluatedIndividual]) -> list[EvaluatedIndividual]:
+        """Merge the oldest individuals into one, merging twice as many each time, until the archive is in bounds."""
+        sizes = [ei.get_memory_size() for ei in populations]
+        merged, merged_bytes = populations, sum(sizes)
+        count = max(2, len(populations) - self.max_size + 1) if self.max_size > 0 else 2
+        while len(merged) > 1 and self.exceeds_bounds(len(merged), merged_bytes):
+            count = min(count, len(populations))
+            oldest = self.merge_individuals(populations[:count])
+            self.merged_individual = oldest
+            merged = [oldest] + populations[count:]
+            merged_bytes = oldest.get_memory_size() + sum(sizes[count:])
+            count *= 2
+        return merged
+
+    @staticmethod
+    def merge_individuals(populations: list[EvaluatedIndividual]) -> EvaluatedIndividual:
+        """Merge individuals into one with their actions applied in order, and the fitness of the last one."""
+        individual = Individual()
+        for ei in populations:
+            individual.add_actions(ei.individual.get_locations(), ei.individual.get_colors())
+        return EvaluatedIndividual(individual, populations[-1].fitness)
+
+    def get_memory_size(self) -> int:
+        """Get an estimate of the memory used by the archived individuals and the images of the archive, in bytes."""
+        images = (self.composite, self.pixel_index, self.working_image)
+        return self.populations_bytes + sum(image.nbytes for image in images if image is not None)
 
     def is_empty(self) -> bool:
         """Check if the archive is empty."""
@@ -72,6 +211,8 @@ class Archive:
     def set_image(self, image) -> None:
         """Set the image."""
         self.image = image
+        self.composite = None
+        self.version += 1
 
     def get_image(self) -> ProcessedImage:
         """Get the image."""
@@ -82,21 +223,114 @@ class Archive:
         actions = [ei.individual.get_actions() for ei in self.populations]
         return [action for sublist in actions for action in sublist]
 
+    def update_composite(self) -> None:
+        """
+        Apply the individuals archived since the last update to the composite image and the pixel index.
+
+        The composite is rebuilt from the original image if the image or the population list was replaced.
+        """
+        if self.image.array is None:
+            return
+
+        if self.composite is None or self.composite_populations is not self.populations \
+                or self.composite_size > len(self.populations):
+            self.composite = self.image.array.copy()
+            self.pixel_index = np.full(self.composite.shape[:2], -1, dtype=np.int64)
+            self.composite_populations = self.populations
+            self.composite_size = 0
+            self.composite_actions = 0
+            self.working_image = None
+
+        for ei in self.populations[self.composite_size:]:
+            locations = ei.individual.get_locations()
+            # The locations of an individual are distinct, so each pixel is written once
+            self.composite[locations[:, 0], locations[:, 1]] = ei.individual.get_colors()
+            if self.working_image is not None:
+                self.working_image[locations[:, 0], locations[:, 1]] = ei.individual.get_colors()
+            self.pixel_index[locations[:, 0], locations[:, 1]] = self.composite_actions + np.arange(len(locations))
+            self.composite_actions += len(locations)
+        self.composite_size = len(self.populations)
+
+    def get_composite_image(self) -> np.ndarray:
+        """Get the composite image, the original image with the actions of the archive. It must not be modified."""
+        self.update_composite()
+        return self.composite
+
+    def get_pixel_index(self) -> np.ndarray:
+        """Get the sequence number of the last archived action of each pixel, or -1 if none. It must not be modified."""
+        self.update_composite()
+        return self.pixel_index
+
+    @contextmanager
+    def apply_individual(self, individual=None):
+        """
+        Yield the image of the archive with the actions of the individual applied.
+
+        The actions are written into the working image and the overwritten pixels are reverted on
+        exit, so the image must be serialized or copied before the context exits. Without an image,
+        or if reuse_image_buffer is disabled, a new image is yielded instead.
+        """
+        if self.image.array is None or not self.config.get("reuse_image_buffer", True):
+            image = self.get_mutated_image()
+            yield individual.get_action_image(image) if individual is not None else image
+            return
+
+        self.update_composite()
+        if self.working_image is None:
+            self.working_image = self.composite.copy()
+        if individual is None or individual.size() == 0:
+            yield self.working_image
+            return
+
+        locations = individual.get_locations()
+        rows, columns = locations[:, 0], locations[:, 1]
+        # The undo log: the locations of an individual are distinct, so restoring them is exact
+        overwritten = self.working_image[rows, columns]
+        self.working_image[rows, columns] = individual.get_colors()
+        try:
+            yield self.working_image
+        finally:
+            self.working_image[rows, columns] = overwritten
+
+    def get_location_index(self) -> dict:
+        """
+        Get the last archived action of each location, in the order of their last write.
+
+        Only the individuals archived since the last call are indexed. The index is rebuilt if the
+        population list was replaced.
+        """
+        if self.indexed_populations is not self.populations or self.indexed_size > len(self.populations):
+            self.location_index = {}
+            self.indexed_populations = self.populations
+            self.indexed_size = 0
+
+        for ei in self.populations[self.indexed_size:]:
+            for action in ei.individual.get_actions():
+                # A location written again is moved to the end
+                self.location_index.pop(action.get_location(), None)
+                self.location_index[action.get_location()] = action
+        self.indexed_size = len(self.populations)
+        return self.location_index
+
     def get_mutated_image(self, actions=None) -> np.ndarray:
-        """Get mutated image. This image contains the actions of the archive."""
-        action_image = self.image.array.copy()
+        """
+        Get mutated image. This image contains the actions of the archive.
 
+        If actions are provided, they are applied to the original image in order instead.
+        """
         if actions is None:
-            actions = self.get_actions()
+            return self.get_composite_image().copy()
 
-        for action in actions:
-            x, y = action.get_location()
-            action_image[x, y] = action.get_color()
+        action_image = self.image.array.copy()
+        if len(actions) > 0:
+            locations = np.array([action.get_location() for action in actions])
+            # Repeated locations are assigned in order, so the last action wins
+            action_image[locations[:, 0], locations[:, 1]] = [action.get_color() for action in actions]
         return action_image
 
     def set_original_prediction_results(self, results):
         """Set the original prediction results."""
-        self.original_predication_results = NutRequest(results, self.config.get("target"))
+        self.original_predication_results = NutRequest(results, self.config.get("target"), self.label_table)
 
     def get_original_prediction_results(self):
         """Get the original prediction results."""
@@ -107,17 +341,16 @@ class Archive:
         self.minimized_solution = solution
 
     def extract_solution(self, not_minimized=False) -> Solution:
-        """Extract the solution from the archive. If the solution is already minimized, return it."""
+        """
+        Extract the solution from the archive. If the solution is already minimized, return it.
+
+        The solution is built once per version of the archive, so it must not be modified.
+        """
 
         if self.minimized_solution is not None and not not_minimized:
             return self.minimized_solution
 
-        actions = self.get_actions().copy()
-
-        for action in actions:
-            location = action.get_location()
-            number_of_locations = len([a for a in actions if a.get_location() == location])
-            if number_of_locations > 1:
-                actions.remove(action)
-
-        return Solution(actions, self.stc.get_current_fitness())
+        if self.extracted_solution is None or self.extracted_solution[0] != self.version:
+            solution = Solution(list(self.get_location_index().values()), self.stc.get_current_fitness())
+            self.extracted_solution = (self.version, solution)
+        return self.extracted_solution[1]
@@ -14,14 +14,14 @@ class SinglePointCrossover(Crossover):
         p1 = parent1.copy()
         p2 = parent2.copy()
 
-        if p1.get_actions().__len__() < 2 or p2.get_actions().__len__() < 2:
+        if p1.size() < 2 or p2.size() < 2:
             logging.debug("Crossover not applied due to insufficient actions in parents.")
             return parent1, parent2
 
         split_point = self.randomness.next_float()
 
-        pos1 = int((len(p1.get_actions()) - 1) * split_point) + 1
-        pos2 = int((len(p2.get_actions()) - 1) * split_point) + 1
+        pos1 = int((p1.size() - 1) * split_point) + 1
+        pos2 = int((p2.size() - 1) * split_point) + 1
 
         parent1.crossover(p2, pos1, pos2)
         parent2.crossover(p1, pos2, pos1)
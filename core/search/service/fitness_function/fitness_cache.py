@@ -0,0 +1,125 @@
+"""Cache of the NUT responses keyed by the pixels that differ from the original image."""
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Optional
+
+import numpy as np
+
+from core.config_parser import ConfigParser
+from core.search.action import Action
+
+
+class FitnessCache:
+
+    """
+    Cache of the NUT responses keyed by the pixels that differ from the original image.
+
+    Different individuals often end up with the same image, e.g. when a mutation rounds back to the
+    same color or a location is clamped to the image limits. The key is a hash of the final pixel
+    set, so such candidates are sent to the NUT only once. A candidate built on the composite image
+    of the archive is keyed by the archive version and its own pixels that differ from the
+    composite, so its key does not depend on the size of the archive. The entries are futures, so a
+    candidate whose response is still in flight is coalesced with the pending request.
+    """
+
+    def __init__(self, config: dict):
+        """Initialize the cache with the configured capacity and eviction policy."""
+        self.capacity = config.get("fitness_cache_size", 0)
+        self.eviction = config.get("fitness_cache_eviction", ConfigParser.FitnessCacheEviction.LRU)
+        self.entries: OrderedDict[bytes, Future] = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def is_enabled(self) -> bool:
+        """Check if the responses are cached."""
+        return self.capacity > 0
+
+    @staticmethod
+    def key(actions: list[Action], image: np.ndarray) -> bytes:
+        """
+        Return the canonical hash of the image obtained by applying the actions on the original image.
+
+        The actions must have unique locations. Pixels that keep their original color are ignored
+        and the remaining ones are sorted by location, so the key does not depend on the order of the actions.
+        """
+        if len(actions) == 0:
+            return FitnessCache.pixels_key(np.empty((0, 2), dtype=np.int64), np.empty((0, 3)), image)
+
+        locations = np.array([action.get_location() for action in actions], dtype=np.int64)
+        return FitnessCache.pixels_key(locations, np.array([action.get_color() for action in actions]), image)
+
+    @staticmethod
+    def pixels_key(locations: np.ndarray, colors: np.ndarray, image: np.ndarray,
+                   version: Optional[int] = None) -> bytes:
+        """
+        Return the canonical hash of the image obtained by writing the Nx3 colors at the Nx2 locations of the image.
+
+        The locations must be unique. Pixels that keep the color of the image are ignored and the
+        remaining ones are sorted by location. If the image is a version of a changing image, such as
+        the composite image of the archive, the keys of different versions never match.
+        """
+        person = b"" if version is None else b"v" + version.to_bytes(8, "little")
+        if len(locations) == 0:
+            return hashlib.blake2b(b"", digest_size=16, person=person).digest()
+
+        locations = np.asarray(locations, dtype=np.int64)
+        # Cast like the assignment into the image does
+        colors = np.asarray(colors).astype(image.dtype)
+        changed = np.any(image[locations[:, 0], locations[:, 1]] != colors, axis=1)
+
+        pixels = np.column_stack((locations[changed], colors[changed].astype(np.int64)))
+        pixels = pixels[np.lexsort((pixels[:, 1], pixels[:, 0]))]
+        return hashlib.blake2b(pixels.tobytes(), digest_size=16, person=person).digest()
+
+    def get(self, key: bytes) -> Optional[Future]:
+        """Return the future of the NUT response for the key, or None if it is not cached."""
+        with self.lock:
+            future = self.entries.get(key)
+            if future is None:
+                self.misses += 1
+                return None
+
+            if future.done():
+                self.hits += 1
+            else:
+                self.coalesced += 1
+            if self.eviction == ConfigParser.FitnessCacheEviction.LRU:
+                self.entries.move_to_end(key)
+            return future
+
+    def put(self, key: bytes, future: Future) -> None:
+        """Cache the future of a NUT response. Failed requests are dropped so that they are sent again."""
+        with self.lock:
+            self.entries[key] = future
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+        future.add_done_callback(lambda done: self.discard_failed(key, done))
+
+    def discard_failed(self, key: bytes, future: Future) -> None:
+        """Remove the entry of a failed request."""
+        if future.exception() is None:
+            return
+
+        with self.lock:
+            if self.entries.get(key) is future:
+                del self.entries[key]
+
+    def get_statistics(self) -> dict:
+        """Return the hit and miss counters of the cache."""
+        with self.lock:
+            return {
+                "capacity": self.capacity,
+                "eviction": self.eviction,
+                "size": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+            }
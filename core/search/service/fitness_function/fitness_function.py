@@ -1,14 +1,19 @@
 """Abstract class for fitness functions that evaluate individuals in the search space."""
-
+import time
+from concurrent.futures import Future
 from typing import TypeVar, Optional
 
+import numpy as np
+
 from core.search.action import Action
 from core.search.evaluated_individual import EvaluatedIndividual
 from core.search.fitness_value import FitnessValue
 from core.search.individual import Individual
 from core.search.service.archive import Archive
+from core.search.service.fitness_function.fitness_cache import FitnessCache
 from core.search.service.search_time_controller import SearchTimeController
 from core.remote.remote_controller import RemoteController
+from core.utils.nut_request import NutRequest
 
 T = TypeVar('T', bound=Individual)
 
@@ -17,26 +22,229 @@ class FitnessFunction:
 
     """Abstract class for fitness functions that evaluate individuals in the search space."""
 
-    def __init__(self, archive: Archive, remote_controller: RemoteController, stc: SearchTimeController) -> None:
+    def __init__(self, archive: Archive, remote_controller: RemoteController, stc: SearchTimeController,
+                 cache: Optional[FitnessCache] = None, predictions_top_k: int = 0) -> None:
         """Initialize the fitness function."""
         self.archive = archive
         self.remote_controller = remote_controller
         self.stc = stc
+        self.cache = cache
+        # Number of best scores kept in the fitness values, zero keeps all of them
+        self.predictions_top_k = predictions_top_k or 0
 
     def evaluate(self, individual: Optional[T] = None, actions: Optional[list[Action]] = None) -> FitnessValue:
         """Evaluate the fitness of the provided individual and return a fitness value."""
+        return self.compute_fitness_value(self.submit_candidate(individual, actions).result())
+
+    def evaluate_batch(self, individuals: list[T]) -> list[FitnessValue]:
+        """Evaluate the fitness of the provided individuals with a single batch request."""
+        return [self.compute_fitness_value(future.result()) for future, _ in self.submit_batch(individuals)]
+
+    def submit_batch(self, individuals: list[T]) -> list[tuple[Future, bool]]:
+        """
+        Send the candidate images of the individuals to the NUT with a single batch request.
+
+        Return a future of the response of each individual, and whether it was cached or in flight.
+        Each candidate image is built in the working image of the archive and serialized by the
+        remote controller before the next one is built, so no image is copied per candidate.
+        """
+        if self.remote_controller.is_delta():
+            return [self.submit_or_get_cached(individual=individual) for individual in individuals]
+
+        submitted = []
+        pending = []
+        for individual in individuals:
+            key = self.get_cache_key(individual)
+            future = self.get_cached_result(key)
+            if future is not None:
+                submitted.append((future, True))
+                continue
+
+            future = Future()
+            self.cache_result(key, future)
+            pending.append((future, individual))
+            submitted.append((future, False))
+
+        if pending:
+            try:
+                results = self.remote_controller.new_action_batch(
+                    self.applied_images([individual for _, individual in pending]))
+            except Exception as e:
+                for future, _ in pending:
+                    future.set_exception(e)
+                raise
+            for (future, _), result in zip(pending, results):
+                future.set_result(result)
+
+        return submitted
+
+    def applied_images(self, individuals: list[T]):
+        """Yield the candidate image of each individual, reverted once the next one is read."""
+        for individual in individuals:
+            with self.archive.apply_individual(individual) as img_array:
+                yield img_array
+
+    def submit_candidate(self, individual: Optional[T] = None, actions: Optional[list[Action]] = None) -> Future:
+        """
+        Send the candidate image to the NUT and return a future of its response.
+
+        A candidate with the same final pixels as a cached or in-flight one is not sent again.
+        """
+        return self.submit_or_get_cached(individual, actions)[0]
+
+    def submit_or_get_cached(self, individual: Optional[T] = None,
+                             actions: Optional[list[Action]] = None) -> tuple[Future, bool]:
+        """Send the candidate image unless it is cached or in flight, and return its future and whether it was."""
+        key = self.get_cache_key(individual, actions)
+        future = self.get_cached_result(key)
+        if future is not None:
+            return future, True
+
+        if self.remote_controller.is_delta():
+            future = self.remote_controller.submit_new_action_delta(self.get_candidate_actions(individual, actions))
+        elif actions is not None:
+            future = self.remote_controller.submit_new_action(self.get_candidate_image(individual, actions))
+        else:
+            # The controller serializes the image before returning, so the working image is reverted right after
+            with self.archive.apply_individual(individual) as img_array:
+                future = self.remote_controller.submit_new_action(img_array)
+        self.cache_result(key, future)
+        return future, False
+
+    def get_cache_key(self, individual: Optional[T] = None, actions: Optional[list[Action]] = None) -> Optional[bytes]:
+        """
+        Return the cache key of the candidate, or None if the cache is disabled.
+
+        A candidate built on the archive is keyed by the archive version and its own pixels checked
+        against the composite image, so the archive is not walked per evaluation.
+        """
+        if self.cache is None or not self.cache.is_enabled():
+            return None
+
+        composite = self.archive.get_composite_image() if actions is None else None
+        if composite is None:
+            return self.cache.key(self.get_candidate_actions(individual, actions), self.archive.get_image().array)
+        if individual is None:
+            return self.cache.pixels_key(np.empty((0, 2)), np.empty((0, 3)), composite, self.archive.version)
+        return self.cache.pixels_key(individual.get_locations(), individual.get_colors(), composite,
+                                     self.archive.version)
+
+    def get_cached_result(self, key: Optional[bytes]) -> Optional[Future]:
+        """Return the cached future of the NUT response. A cache hit still counts as an evaluation."""
+        if key is None:
+            return None
+
+        future = self.cache.get(key)
+        if future is not None:
+            self.stc.new_individual_evaluation()
+        return future
+
+    def cache_result(self, key: Optional[bytes], future: Future) -> None:
+        """Cache the future of a NUT response."""
+        if key is not None:
+            self.cache.put(key, future)
+
+    def compute_fitness_value(self, result: NutRequest) -> FitnessValue:
+        """Compute the fitness value from the response of the NUT."""
         raise NotImplementedError("This method should be implemented by subclasses")
 
+    def get_candidate_image(self, individual: Optional[T] = None,
+                            actions: Optional[list[Action]] = None) -> np.ndarray:
+        """Return the image that is sent to the NUT for the provided individual or actions."""
+        img_array = self.archive.get_mutated_image(actions)
+
+        if individual is not None:
+            img_array = individual.get_action_image(img_array)
+
+        return img_array
+
+    def get_candidate_actions(self, individual: Optional[T] = None,
+                              actions: Optional[list[Action]] = None) -> list[Action]:
+        """
+        Return the pixels that differ from the original image for the provided individual or actions.
+
+        The actions are ordered as they are applied by get_candidate_image, so a later action
+        overrides an earlier one at the same location. The pixels of the archive are read from its
+        pixel index and composite image, in the order of their last write.
+        """
+        if actions is not None:
+            candidate_actions = list(actions)
+        else:
+            pixel_index = self.archive.get_pixel_index()
+            if pixel_index is None:
+                candidate_actions = self.archive.get_actions()
+            else:
+                rows, columns = np.nonzero(pixel_index >= 0)
+                order = np.argsort(pixel_index[rows, columns])
+                rows, columns = rows[order], columns[order]
+                colors = self.archive.get_composite_image()[rows, columns]
+                candidate_actions = [Action((row, column), *color)
+                                     for row, column, color in zip(rows.tolist(), columns.tolist(), colors.tolist())]
+
+        if individual is not None:
+            candidate_actions = candidate_actions + individual.get_actions()
+
+        # Keep only the last action per location
+        last_actions = {action.get_location(): action for action in candidate_actions}
+        return list(last_actions.values())
+
     def calculate_fitness(self, individual: T) -> EvaluatedIndividual:
-        """Calculate the fitness of an individual."""
-
-        fitness_value = SearchTimeController.measure_time_millis(
-            self.log_execution_time,
-            lambda: self.evaluate(individual=individual),
-            individual.actions.__len__()
-        )
-        ei = EvaluatedIndividual(individual, fitness_value)
-        return ei
+        """Calculate the fitness of an individual. The time of cached responses is not logged."""
+        start_time = int(time.time() * 1000)
+        future, cached = self.submit_or_get_cached(individual)
+        fitness_value = self.compute_fitness_value(future.result())
+        if not cached:
+            self.log_execution_time(int(time.time() * 1000) - start_time, fitness_value, individual.size())
+        return EvaluatedIndividual(individual, fitness_value)
+
+    def calculate_fitness_batch(self, individuals: list[T]) -> list[EvaluatedIndividual]:
+        """Calculate the fitness of several individuals at once. The time of cached responses is not logged."""
+        if len(individuals) == 0:
+            return []
+
+        start_time = int(time.time() * 1000)
+        submitted = self.submit_batch(individuals)
+        fitness_values = [self.compute_fitness_value(future.result()) for future, _ in submitted]
+        sent = sum(1 for _, cached in submitted if not cached)
+        # The NUT processes the whole batch at once, so the elapsed time is shared equally
+        elapsed_time = (int(time.time() * 1000) - start_time) // max(sent, 1)
+
+        evaluated_individuals = []
+        for individual, fitness_value, (_, cached) in zip(individuals, fitness_values, submitted):
+            if not cached:
+                self.log_execution_time(elapsed_time, fitness_value, individual.size())
+            evaluated_individuals.append(EvaluatedIndividual(individual, fitness_value))
+        return evaluated_individuals
+
+    def submit_fitness(self, individual: T) -> Future:
+        """
+        Submit an individual for evaluation and return a future of the evaluated individual.
+
+        The candidate image is built when the individual is submitted. Depending on the remote
+        controller, the request is either completed before returning or kept in flight. The time of
+        cached responses is not logged.
+        """
+        start_time = int(time.time() * 1000)
+        nut_future, cached = self.submit_or_get_cached(individual)
+
+        future: Future = Future()
+
+        def on_done(done: Future):
+            try:
+                fitness_value = self.compute_fitness_value(done.result())
+                if not cached:
+                    self.log_execution_time(int(time.time() * 1000) - start_time, fitness_value,
+                                            individual.size())
+                future.set_result(EvaluatedIndividual(individual, fitness_value))
+            except Exception as e:
+                future.set_exception(e)
+
+        nut_future.add_done_callback(on_done)
+        return future
+
+    def get_max_in_flight(self) -> int:
+        """Return the number of evaluations that can be in flight at the same time."""
+        return self.remote_controller.max_in_flight
 
     def calculate_fitness_with_actions(self, actions: list[Action]) -> FitnessValue:
         """Calculate the fitness of a list of actions."""
@@ -1,35 +1,23 @@
 """Targeted implementation of the FitnessFunction abstract class."""
 
-from typing import Optional, TypeVar
-
-from core.search.action import Action
 from core.search.fitness_value import FitnessValue
-from core.search.individual import Individual
 from core.search.service.fitness_function.fitness_function import FitnessFunction
-
-T = TypeVar('T', bound=Individual)
+from core.utils.nut_request import NutRequest
 
 
 class TargetedFitnessFunction(FitnessFunction):
 
     """Targeted fitness function that attempts to change classification to a specific target."""
 
-    def __init__(self, archive, remote_controller, stc, target):
+    def __init__(self, archive, remote_controller, stc, target, cache=None, predictions_top_k=0):
         """Initialize the targeted fitness function with a model."""
-        super().__init__(archive, remote_controller, stc)
+        super().__init__(archive, remote_controller, stc, cache, predictions_top_k)
         self.target = target
 
-    def evaluate(self, individual: Optional[T] = None, actions: Optional[list[Action]] = None) -> FitnessValue:
+    def compute_fitness_value(self, result: NutRequest) -> FitnessValue:
         """Targeted fitness function that attempts to change classification to the target class."""
 
-        img_array = self.archive.get_mutated_image(actions)
-
-        if individual is not None:
-            img_array = individual.get_action_image(img_array)
-
-        result = self.remote_controller.new_action(img_array)
-
         fitness_value = result.max_score.value - result.target_score.value \
-            if result.max_score.label != self.target else result.target_score.value - result.max_score.value
+            if result.max_id != result.target_id else result.target_score.value - result.max_score.value
 
-        return FitnessValue(fitness_value, result.predictions)
+        return FitnessValue(fitness_value, result.get_predictions(self.predictions_top_k))
@@ -74,6 +74,7 @@ class SearchStatusUpdater(SearchListener):
             avg_size = "{:.1f}".format(avg_time_and_size[1])
 
             since_last = self.stc.get_seconds_since_last_improvement()
+            archive_megabytes = "{:.1f}".format(self.archive.get_memory_size() / 2 ** 20)
 
             self.up_line_and_erase()
             self.up_line_and_erase()
@@ -81,7 +82,8 @@ class SearchStatusUpdater(SearchListener):
             print(f"* Action size: {self.action_size}; "
                   f"time per test: {avg_time}ms ({avg_size} actions); "
                   f"since last improvement: {since_last}s; "
-                  f"fitness: {self.stc.get_current_fitness_value()}")
+                  f"fitness: {self.stc.get_current_fitness_value()}; "
+                  f"archive: {self.archive.number_of_population()} individuals ({archive_megabytes}MB)")
 
     class bcolors:
 
@@ -139,8 +141,8 @@ class SearchStatusUpdater(SearchListener):
         self.up_line_and_erase()
         print("Predictions")
         print("-----------------")
-        prediction_beginning = self.archive.get_original_prediction_results().predictions[0]
-        prediction_end = self.stc.current_fitness_value.predictions[0]
+        prediction_beginning = self.archive.get_original_prediction_results().max_score
+        prediction_end = max(self.stc.current_fitness_value.predictions, key=lambda label: label.value)
         print(f"{self.bcolors.ENDC}Beginning prediction: {self.bcolors.OKBLUE}{prediction_beginning.label} "
               f"{self.bcolors.ENDC}with confidence level: {self.bcolors.WARNING}{prediction_beginning.value}")
         self.up_line_and_erase()
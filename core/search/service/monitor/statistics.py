@@ -7,22 +7,31 @@ import numpy as np
 from PIL.Image import fromarray
 from matplotlib import pyplot as plt
 
+from core.remote.remote_controller import RemoteController
 from core.search.service.archive import Archive
+from core.search.service.fitness_function.fitness_cache import FitnessCache
 from core.search.service.monitor.search_listener import SearchListener
 from core.search.service.search_time_controller import SearchTimeController
 from core.search.solution import Solution
+from core.utils.label_table import LabelTable
+from core.utils.nut_request import Predictions
 
 
 class Statistics(SearchListener):
 
     """Class to handle the statistics of the search process."""
 
-    def __init__(self, stc: SearchTimeController, archive: Archive, config: dict):
+    def __init__(self, stc: SearchTimeController, archive: Archive, config: dict, label_table: LabelTable,
+                 remote_controller: RemoteController = None, fitness_cache: FitnessCache = None):
         """Initialize the statistics."""
 
         self.stc = stc
         self.archive = archive
         self.config = config
+        self.remote_controller = remote_controller
+        self.fitness_cache = fitness_cache
+        # Shared with the archive, so the label ids of the archived predictions match
+        self.label_table = label_table
         self.snapshots: list[Solution] = []
         self.snapshots_interval = self.config.get("snapshot_interval")
         self.snapshot_threshold = self.snapshots_interval
@@ -121,29 +130,7 @@ class Statistics(SearchListener):
         """Save the line plot. It contains the predictions of the search."""
         plt.clf()
         legend = []
-        data = {}
-
-        # First pass: collect all unique labels
-        all_labels = set()
-        for val in self.snapshots:
-            for s in val.fitness_value.predictions:
-                all_labels.add(s.label)
-
-        # Initialize all labels with empty lists
-        for label in all_labels:
-            data[label] = []
-
-        # Second pass: populate data with values or zeros
-        for val in self.snapshots:
-            # Create a dict of current snapshot's predictions
-            current_predictions = {s.label: s.value for s in val.fitness_value.predictions}
-
-            # For each label, add the value if it exists, otherwise add 0
-            for label in all_labels:
-                if label in current_predictions:
-                    data[label].append(current_predictions[label])
-                else:
-                    data[label].append(0)
+        data = self.get_prediction_series()
 
         for item in data:
             plt.plot(np.arange(len(data[item])), data[item], label=item)
@@ -160,6 +147,48 @@ class Statistics(SearchListener):
         if self.config.get("show_plots"):
             plt.show()
 
+    def get_prediction_series(self) -> dict:
+        """
+        Get the score of every label over the snapshots, zero where a snapshot has no score for the label.
+
+        The scores are stacked in a matrix indexed by label id. The scores of the label table are copied
+        into their row by id, other prediction lists are interned label by label.
+        """
+        rows = []
+        for val in self.snapshots:
+            predictions = val.fitness_value.predictions
+            if isinstance(predictions, Predictions) and predictions.label_table is self.label_table:
+                rows.append((predictions.get_ids(), predictions.scores))
+            else:
+                rows.append((self.label_table.get_ids([s.label for s in predictions]),
+                             [s.value for s in predictions]))
+
+        matrix = np.zeros((len(rows), len(self.label_table)))
+        seen = np.zeros(len(self.label_table), dtype=bool)
+        for index, (ids, scores) in enumerate(rows):
+            matrix[index, ids] = scores
+            seen[ids] = True
+        return {self.label_table.get_label(label_id): matrix[:, label_id].tolist()
+                for label_id in np.flatnonzero(seen)}
+
+    def get_nut_statistics(self):
+        """Get the request statistics of the NUT replicas."""
+        if self.remote_controller is None:
+            return []
+        return self.remote_controller.get_statistics()
+
+    def get_nut_request_statistics(self):
+        """Get the number of timeouts, retries and hedges of the NUT requests."""
+        if self.remote_controller is None:
+            return {}
+        return self.remote_controller.get_request_statistics()
+
+    def get_fitness_cache_statistics(self):
+        """Get the hit and miss counters of the fitness cache."""
+        if self.fitness_cache is None:
+            return {}
+        return self.fitness_cache.get_statistics()
+
     def save_statistics(self):
         """Save the data as a json file."""
         data = {}
@@ -173,30 +202,7 @@ class Statistics(SearchListener):
         else:
             data['flipped'] = False
 
-        # First pass: collect all unique labels
-        all_labels = set()
-        for val in self.snapshots:
-            for s in val.fitness_value.predictions:
-                all_labels.add(s.label)
-
-        # Initialize all labels with empty lists
-        predictions = {}
-        for label in all_labels:
-            predictions[label] = []
-
-        # Second pass: populate predictions with values or zeros
-        for val in self.snapshots:
-            # Create a dict of current snapshot's predictions
-            current_predictions = {s.label: s.value for s in val.fitness_value.predictions}
-
-            # For each label, add the value if it exists, otherwise add 0
-            for label in all_labels:
-                if label in current_predictions:
-                    predictions[label].append(current_predictions[label])
-                else:
-                    predictions[label].append(0)
-
-        data['predictions'] = predictions
+        data['predictions'] = self.get_prediction_series()
         data['action_size'] = len(self.archive.extract_solution().actions)
         matrix = self.archive.extract_solution().actions.copy()
         changes = []
@@ -223,6 +229,11 @@ class Statistics(SearchListener):
             data['not_minimized_size'] = None
             data['not_minimized_changes'] = []
 
+        data['archive_individuals'] = self.archive.number_of_population()
+        data['archive_bytes'] = self.archive.get_memory_size()
+        data['nut_endpoints'] = self.get_nut_statistics()
+        data['nut_requests'] = self.get_nut_request_statistics()
+        data['fitness_cache'] = self.get_fitness_cache_statistics()
         data['config'] = self.config
 
         with open(f"{self.output_dir}/{self.statistics_file_name}.json", 'w') as outfile:
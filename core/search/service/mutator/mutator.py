@@ -1,6 +1,7 @@
 """Mutator class is the base class for all mutators. It provides the basic structure for all mutators."""
 import numpy as np
 
+from core.search.action import Action
 from core.search.individual import Individual
 from core.search.service.adaptive_parameter_control import AdaptiveParameterControl
 from core.search.service.archive import Archive
@@ -26,6 +27,43 @@ class Mutator:
         """Mutates the individual."""
         raise NotImplementedError("Mutate method must be implemented in subclass.")
 
+    def mutate_batch(self, individuals: list[Individual]) -> list[Individual]:
+        """
+        Mutates several individuals at once, one random action each, like mutate.
+
+        The random values of all the individuals are drawn with single numpy calls and the actions
+        are mutated as arrays by mutate_arrays.
+        """
+        mutated = [individual.copy() for individual in individuals]
+        targets = [individual for individual in mutated if individual.size() > 0]
+        if not targets:
+            return mutated
+
+        indices = self.randomness.next_ints(0, np.array([individual.size() for individual in targets])).tolist()
+        actions = [individual.get_action(index) for individual, index in zip(targets, indices)]
+        locations, colors = self.mutate_arrays(np.array([action.get_location() for action in actions]),
+                                               np.array([action.get_color() for action in actions]))
+
+        for individual, index, (x, y), color in zip(targets, indices, locations.tolist(), colors.tolist()):
+            individual.set_action(index, Action((x, y), *color))
+        return mutated
+
+    def mutate_arrays(self, locations: np.ndarray, colors: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Mutates the Kx2 locations and Kx3 colors of K actions and returns them as integer arrays."""
+        raise NotImplementedError("Mutate arrays method must be implemented in subclass.")
+
+    def gaussian_colors(self, colors: np.ndarray) -> np.ndarray:
+        """Adds Gaussian noise with the pixel sigma of the adaptive parameter control to the colors and clamps them."""
+        delta = self.randomness.random_gaussian(np.zeros(colors.shape), self.apc.get_pixel_apc())
+        return np.round(np.clip(colors + delta, 0, 255)).astype(int)
+
+    def gaussian_locations(self, locations: np.ndarray) -> np.ndarray:
+        """Draws the locations around the current ones with the location sigma and clamps them to the image."""
+        mutated = self.randomness.random_gaussian(locations, self.apc.get_location_apc())
+        limits = np.array([self.config.get("image_height") - 1, self.config.get("image_width") - 1])
+        # Truncated like check_location_limits
+        return np.clip(mutated, 0, limits).astype(int)
+
     def mutate_and_save(self, individual: Individual, archive: Archive):
         """Mutates the individual and saves it to the archive."""
         raise NotImplementedError("Mutate method must be implemented in subclass.")
@@ -37,18 +75,18 @@ class Mutator:
         # convert to integer
         return np.round(value).astype(int)
 
-    def check_location_limits(self, width, height):
-        """Checks the limit values of the location."""
+    def check_location_limits(self, row, column):
+        """Checks the limit values of the (row, column) location."""
         max_height = self.config.get("image_height")
         max_width = self.config.get("image_width")
 
-        if height < 0:
-            height = 0
-        if height >= max_height:
-            height = max_height - 1
-        if width < 0:
-            width = 0
-        if width >= max_width:
-            width = max_width - 1
+        if row < 0:
+            row = 0
+        if row >= max_height:
+            row = max_height - 1
+        if column < 0:
+            column = 0
+        if column >= max_width:
+            column = max_width - 1
 
-        return int(width), int(height)
+        return int(row), int(column)
@@ -1,4 +1,6 @@
 """Standard mutator module."""
+import numpy as np
+
 from core.search.action import Action
 from core.search.service.mutator.mutator import Mutator
 
@@ -10,13 +12,12 @@ class OneZeroMutator(Mutator):
     def mutate(self, individual):
         """Mutates the individual."""
         mutated_individual = individual.copy()
-        actions = mutated_individual.copy().get_actions()
 
-        if len(actions) == 0:
+        if mutated_individual.size() == 0:
             return mutated_individual
 
-        action_index = self.randomness.next_int(0, len(actions))
-        action = actions[action_index].copy()
+        action_index = self.randomness.next_int(0, mutated_individual.size())
+        action = mutated_individual.get_action(action_index)
 
         if self.randomness.next_bool(self.config.get("one_mutation_rate")):
             action = self.apply_one_mutation(action)
@@ -25,30 +26,39 @@ class OneZeroMutator(Mutator):
         else:
             action = self.apply_gaussian_mutation(action)
 
-        mutated_individual.actions[action_index] = action
+        mutated_individual.set_action(action_index, action)
         return mutated_individual
 
+    def mutate_arrays(self, locations: np.ndarray, colors: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Applies the One, Zero or Gaussian mutation to the locations and colors of several actions.
+
+        As in mutate, an action gets the One mutation with the one mutation rate, otherwise the Zero
+        mutation with the zero mutation rate, otherwise the Gaussian mutation.
+        """
+        one = self.randomness.next_bools(self.config.get("one_mutation_rate"), len(colors))
+        zero = ~one & self.randomness.next_bools(self.config.get("zero_mutation_rate"), len(colors))
+        colors = self.gaussian_colors(colors)
+        colors[one] = 255
+        colors[zero] = 0
+        return self.gaussian_locations(locations), colors
+
     def apply_zero_mutation(self, action: Action):
         """Applies the Zero mutation to the action."""
-        action.set_color([0, 0, 0])
-
-        return self.mutate_location(action)
+        return self.mutate_location(action.with_color((0, 0, 0)))
 
     def apply_one_mutation(self, action: Action):
         """Applies the One mutation to the action."""
-        action.set_color([255, 255, 255])
-
-        return self.mutate_location(action)
+        return self.mutate_location(action.with_color((255, 255, 255)))
 
     def mutate_location(self, action: Action):
         """Mutates the location of the action."""
 
         sigma = self.apc.get_location_apc()
-        mutated_width = self.randomness.random_gaussian(action.get_location()[0], sigma)
-        mutated_height = self.randomness.random_gaussian(action.get_location()[1], sigma)
-        mutated_width, mutated_height = self.check_location_limits(mutated_width, mutated_height)
-        action.set_location(mutated_width, mutated_height)
-        return action
+        mutated_row = self.randomness.random_gaussian(action.get_location()[0], sigma)
+        mutated_column = self.randomness.random_gaussian(action.get_location()[1], sigma)
+        mutated_row, mutated_column = self.check_location_limits(mutated_row, mutated_column)
+        return action.with_location(mutated_row, mutated_column)
 
     def apply_gaussian_mutation(self, action: Action):
         """Applies the Gaussian mutation to the action."""
@@ -57,6 +67,4 @@ class OneZeroMutator(Mutator):
         delta = self.randomness.random_gaussian(pixels * 0, sigma)
         mutated_pixels = pixels + delta
         mutated_pixels = self.check_limit_values(mutated_pixels)
-        action.set_color(mutated_pixels)
-
-        return self.mutate_location(action)
+        return self.mutate_location(action.with_color(mutated_pixels))
@@ -1,4 +1,6 @@
 """Standard mutator module."""
+import numpy as np
+
 from core.search.action import Action
 from core.search.service.mutator.mutator import Mutator
 
@@ -10,17 +12,19 @@ class StandardMutator(Mutator):
     def mutate(self, individual):
         """Mutates the individual."""
         mutated_individual = individual.copy()
-        actions = mutated_individual.copy().get_actions()
 
-        if len(actions) == 0:
+        if mutated_individual.size() == 0:
             return mutated_individual
 
-        action_index = self.randomness.next_int(0, len(actions))
-        action = actions[action_index].copy()
-        action = self.apply_gaussian_mutation(action)
-        mutated_individual.actions[action_index] = action
+        action_index = self.randomness.next_int(0, mutated_individual.size())
+        action = self.apply_gaussian_mutation(mutated_individual.get_action(action_index))
+        mutated_individual.set_action(action_index, action)
         return mutated_individual
 
+    def mutate_arrays(self, locations: np.ndarray, colors: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Applies the Gaussian mutation to the locations and colors of several actions."""
+        return self.gaussian_locations(locations), self.gaussian_colors(colors)
+
     def apply_gaussian_mutation(self, action: Action):
         """Applies the Gaussian mutation to the action."""
 
@@ -29,12 +33,10 @@ class StandardMutator(Mutator):
         delta = self.randomness.random_gaussian(pixels * 0, sigma)
         mutated_pixels = pixels + delta
         mutated_pixels = self.check_limit_values(mutated_pixels)
-        action.set_color(mutated_pixels)
+        action = action.with_color(mutated_pixels)
 
         sigma = self.apc.get_location_apc()
-        mutated_width = self.randomness.random_gaussian(action.get_location()[0], sigma)
-        mutated_height = self.randomness.random_gaussian(action.get_location()[1], sigma)
-        mutated_width, mutated_height = self.check_location_limits(mutated_width, mutated_height)
-        action.set_location(mutated_width, mutated_height)
-
-        return action
+        mutated_row = self.randomness.random_gaussian(action.get_location()[0], sigma)
+        mutated_column = self.randomness.random_gaussian(action.get_location()[1], sigma)
+        mutated_row, mutated_column = self.check_location_limits(mutated_row, mutated_column)
+        return action.with_location(mutated_row, mutated_column)
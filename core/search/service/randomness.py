@@ -7,24 +7,89 @@ import numpy as np
 
 class Randomness:
 
-    """A class to generate random numbers and perform various random operations."""
-
-    def __init__(self, config):
-        """Initializes the Randomness object and sets the random seed."""
-        self.random = np.random
-        self.update_seed(config.get("seed"))
+    """
+    A class to generate random numbers and perform various random operations.
+
+    The numbers are drawn from a numpy Generator (PCG64) owned by the instance, so several instances
+    in one process draw independent streams. spawn derives the streams of workers or concurrent
+    attacks from the seed with SeedSequence.spawn.
+
+    With random_pool_size, the scalar uniforms and normals of next_bool, next_int and
+    random_gaussian are taken from pools of pre-drawn values, refilled with one call each time they
+    run out, instead of paying the overhead of a generator call per value.
+    """
+
+    # Scalar integers are taken from the uniform pool only for ranges the float resolution covers
+    MAX_POOLED_RANGE = 2 ** 32
+
+    def __init__(self, config, seed_sequence: Optional[np.random.SeedSequence] = None):
+        """Initializes the Randomness object and sets the random seed, or the seed sequence if given."""
+        self.config = config
+        self.pool_size = config.get("random_pool_size") or 0
+        self.seed_sequence = None
+        self.random = None
+        self.uniforms: list[float] = []
+        self.normals: list[float] = []
+        self.uniform_position = 0
+        self.normal_position = 0
+        if seed_sequence is None:
+            self.update_seed(config.get("seed"))
+        else:
+            self.update_seed_sequence(seed_sequence)
 
     def update_seed(self, seed: int):
         """
         Updates the seed of the random number generator.
 
-        If seed is negative, the generator uses the current CPU time.
+        If seed is negative, the generator is seeded with fresh entropy from the operating system.
 
         """
-        if seed < 0:
-            self.random.seed()
-        else:
-            self.random.seed(seed)
+        self.update_seed_sequence(np.random.SeedSequence() if seed < 0 else np.random.SeedSequence(seed))
+
+    def update_seed_sequence(self, seed_sequence: np.random.SeedSequence):
+        """Creates the random number generator from a seed sequence and discards the pre-drawn values."""
+        self.seed_sequence = seed_sequence
+        self.random = np.random.Generator(np.random.PCG64(seed_sequence))
+        self.uniforms = []
+        self.normals = []
+        self.uniform_position = 0
+        self.normal_position = 0
+
+    def spawn(self, count: int) -> list["Randomness"]:
+        """
+        Creates independent Randomness objects for workers, islands or concurrent attacks.
+
+        The streams depend only on the seed and on the order of the spawned objects, so the i-th
+        spawned object draws the same numbers however many are spawned with it.
+
+        Args
+        -------
+            count (int): The number of Randomness objects.
+
+        Returns
+        -------
+            list[Randomness]: Randomness objects with the configuration of this one and child seed sequences.
+
+        """
+        return [Randomness(self.config, child) for child in self.seed_sequence.spawn(count)]
+
+    def pooled_uniform(self) -> float:
+        """Returns a uniform float in [0, 1) from the pool of pre-drawn values, refilling it if needed."""
+        if self.uniform_position >= len(self.uniforms):
+            self.uniforms = self.random.random(self.pool_size).tolist()
+            self.uniform_position = 0
+        value = self.uniforms[self.uniform_position]
+        self.uniform_position += 1
+        return value
+
+    def pooled_normal(self) -> float:
+        """Returns a standard normal float from the pool of pre-drawn values, refilling it if needed."""
+        if self.normal_position >= len(self.normals):
+            self.normals = self.random.standard_normal(self.pool_size).tolist()
+            self.normal_position = 0
+        value = self.normals[self.normal_position]
+        self.normal_position += 1
+        return value
 
     def next_float(self, min_value: float = 0.0, max_value: float = 1.0):
         """
@@ -43,6 +108,21 @@ class Randomness:
 
         return self.random.uniform(min_value, max_value)
 
+    def next_floats(self, size: int) -> np.ndarray:
+        """
+        Generates an array of random float values in [0, 1).
+
+        Args
+        -------
+            size (int): The number of values.
+
+        Returns
+        -------
+            np.ndarray: The random floats.
+
+        """
+        return self.random.random(size)
+
     def next_bool(self, value: float):
         """
         Generates a boolean value based on a probability.
@@ -56,7 +136,41 @@ class Randomness:
             bool: True with probability `value`, otherwise False.
 
         """
-        return self.random.rand() < value
+        if self.pool_size:
+            return self.pooled_uniform() < value
+        return self.random.random() < value
+
+    def next_bools(self, value: float, size: int) -> np.ndarray:
+        """
+        Generates an array of boolean values based on a probability.
+
+        Args
+        -------
+            value (float): A probability (0 <= value <= 1) where each value is True.
+            size (int): The number of values.
+
+        Returns
+        -------
+            np.ndarray: Each value is True with probability `value`, otherwise False.
+
+        """
+        return self.random.random(size) < value
+
+    def next_ints(self, min_value, max_values) -> np.ndarray:
+        """
+        Generates an array of random integers, one per upper bound.
+
+        Args
+        -------
+            min_value (int or array): The minimum bound.
+            max_values (array): The maximum bound of each value, exclusive.
+
+        Returns
+        -------
+            np.ndarray: A random integer between the bounds for each upper bound.
+
+        """
+        return self.random.integers(min_value, max_values)
 
     def next_int(self, min_value: int = 0, max_value: int = sys.maxsize):
         """
@@ -77,7 +191,25 @@ class Randomness:
         if min_value == max_value:
             return min_value
 
-        return self.random.randint(min_value, max_value)
+        if self.pool_size and max_value - min_value <= self.MAX_POOLED_RANGE:
+            return min_value + int(self.pooled_uniform() * (max_value - min_value))
+        return int(self.random.integers(min_value, max_value))
+
+    def sample_indices(self, population: int, size: int) -> np.ndarray:
+        """
+        Samples distinct integers without replacement.
+
+        Args
+        -------
+            population (int): The integers are drawn from 0 to population, exclusive.
+            size (int): The number of integers, at most population.
+
+        Returns
+        -------
+            np.ndarray: The distinct integers, in random order.
+
+        """
+        return self.random.choice(population, size, replace=False)
 
     def random_choice(self, max_size: int, selection_probs: Optional[List] = None):
         """
@@ -131,4 +263,6 @@ class Randomness:
             float: A random value from the Gaussian distribution.
 
         """
+        if self.pool_size and isinstance(mean, (int, float)) and isinstance(std, (int, float)):
+            return mean + std * self.pooled_normal()
         return self.random.normal(mean, std)
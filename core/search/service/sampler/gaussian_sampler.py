@@ -1,7 +1,7 @@
 """Gaussian sampler implementation."""
+import numpy as np
 
 from core.search.action import Action
-from core.search.individual import Individual
 from core.search.service.sampler.sampler import Sampler
 
 
@@ -9,17 +9,6 @@ class GaussianSampler(Sampler):
 
     """Gaussian sampler implementation."""
 
-    def sample(self):
-        """Sample an individual randomly."""
-        individual = Individual()
-        number_of_actions = self.randomness.next_int(self.config.get("min_action_size"),
-                                                     self.config.get("max_action_size"))
-        for _ in range(number_of_actions):
-            action = self.sample_random_action()
-            while not individual.add_action(action, replace=False):
-                action = self.sample_random_action()
-        return individual
-
     def sample_random_action(self):
         """Return a random action."""
         location = (self.randomness.next_int(0, self.config.get("image_height")),
@@ -30,3 +19,9 @@ class GaussianSampler(Sampler):
         color = self.archive.image.array[location] + delta
         color = self.check_limit_values(color)
         return Action(location, color[0], color[1], color[2])
+
+    def sample_colors(self, locations: np.ndarray) -> np.ndarray:
+        """Return the image colors at the locations with Gaussian noise, drawn as one array."""
+        colors = self.archive.image.array[locations[:, 0], locations[:, 1]]
+        delta = self.randomness.random_gaussian(np.zeros(colors.shape), self.config.get("mutation_sigma"))
+        return np.round(np.clip(colors + delta, 0, 255)).astype(int)
@@ -1,7 +1,7 @@
 """Random sampler implementation."""
+import numpy as np
 
 from core.search.action import Action
-from core.search.individual import Individual
 from core.search.service.sampler.sampler import Sampler
 
 
@@ -9,20 +9,13 @@ class RandomSampler(Sampler):
 
     """Random sampler implementation."""
 
-    def sample(self):
-        """Sample an individual randomly."""
-        individual = Individual()
-        number_of_actions = self.randomness.next_int(self.config.get("min_action_size"),
-                                                     self.config.get("max_action_size"))
-        for _ in range(number_of_actions):
-            action = self.sample_random_action()
-            while not individual.add_action(action, replace=False):
-                action = self.sample_random_action()
-        return individual
-
     def sample_random_action(self):
         """Return a random action."""
-        location = (self.randomness.next_int(0, self.config.get("image_width")),
-                    self.randomness.next_int(0, self.config.get("image_height")))
+        location = (self.randomness.next_int(0, self.config.get("image_height")),
+                    self.randomness.next_int(0, self.config.get("image_width")))
         color = self.randomness.next_int(0, 255), self.randomness.next_int(0, 255), self.randomness.next_int(0, 255)
         return Action(location, color[0], color[1], color[2])
+
+    def sample_colors(self, locations: np.ndarray) -> np.ndarray:
+        """Return uniformly random colors, drawn as one array."""
+        return self.randomness.next_ints(0, np.full((len(locations), 3), 255))
@@ -1,6 +1,7 @@
 """Abstract class for sampling individuals from the search space."""
 import numpy as np
 
+from core.search.action import Action
 from core.search.individual import Individual
 from core.search.service.archive import Archive
 from core.search.service.randomness import Randomness
@@ -8,7 +9,12 @@ from core.search.service.randomness import Randomness
 
 class Sampler:
 
-    """Abstract class for sampling individuals from the search space."""
+    """
+    Abstract class for sampling individuals from the search space.
+
+    Locations are (row, column) pairs, as the image arrays are indexed, so the first coordinate is
+    bounded by the image height and the second one by the image width.
+    """
 
     def __init__(self, randomness: Randomness, archive: Archive, config: dict):
         """Initialize the sampler."""
@@ -19,6 +25,55 @@ class Sampler:
 
     def sample(self) -> Individual:
         """Sample an individual."""
+        if self.config.get("vectorized_sampling"):
+            return self.sample_batch(1)[0]
+
+        individual = Individual()
+        number_of_actions = self.randomness.next_int(self.config.get("min_action_size"),
+                                                     self.config.get("max_action_size"))
+        for _ in range(number_of_actions):
+            action = self.sample_random_action()
+            while not individual.add_action(action, replace=False):
+                action = self.sample_random_action()
+        return individual
+
+    def sample_batch(self, size: int) -> list[Individual]:
+        """
+        Sample several individuals.
+
+        With vectorized sampling, the distinct pixels of each individual are drawn with a single
+        sampling without replacement over the image pixels, and the colors of all the individuals
+        are drawn as one array by sample_colors.
+        """
+        if not self.config.get("vectorized_sampling"):
+            return [self.sample() for _ in range(size)]
+
+        height, width = self.config.get("image_height"), self.config.get("image_width")
+        min_size, max_size = self.config.get("min_action_size"), self.config.get("max_action_size")
+        if min_size == max_size:
+            sizes = np.full(size, min_size)
+        else:
+            sizes = self.randomness.next_ints(min_size, np.full(size, max_size))
+        sizes = np.minimum(sizes, height * width)
+
+        pixels = np.concatenate([self.randomness.sample_indices(height * width, n) for n in sizes.tolist()])
+        locations = np.stack(np.divmod(pixels, width), axis=1)
+        colors = self.sample_colors(locations)
+
+        individuals = []
+        for individual_locations, individual_colors in zip(np.split(locations, np.cumsum(sizes)[:-1]),
+                                                           np.split(colors, np.cumsum(sizes)[:-1])):
+            individual = Individual()
+            individual.add_actions(individual_locations, individual_colors)
+            individuals.append(individual)
+        return individuals
+
+    def sample_random_action(self) -> Action:
+        """Return a random action."""
+        raise NotImplementedError("This method should be implemented")
+
+    def sample_colors(self, locations: np.ndarray) -> np.ndarray:
+        """Return the Nx3 colors of random actions at the Nx2 locations."""
         raise NotImplementedError("This method should be implemented")
 
     def check_limit_values(self, value):
@@ -28,18 +83,18 @@ class Sampler:
         # convert to integer
         return np.round(value).astype(int)
 
-    def check_location_limits(self, width, height):
-        """Checks the limit values of the location."""
+    def check_location_limits(self, row, column):
+        """Checks the limit values of the (row, column) location."""
         max_height = self.config.get("image_height")
         max_width = self.config.get("image_width")
 
-        if height < 0:
-            height = 0
-        if height >= max_height:
-            height = max_height - 1
-        if width < 0:
-            width = 0
-        if width >= max_width:
-            width = max_width - 1
+        if row < 0:
+            row = 0
+        if row >= max_height:
+            row = max_height - 1
+        if column < 0:
+            column = 0
+        if column >= max_width:
+            column = max_width - 1
 
-        return int(width), int(height)
+        return int(row), int(column)
@@ -0,0 +1,74 @@
+"""Module contains the SamplingBuckets class, which groups the archived individuals by sampling counter."""
+from core.search.evaluated_individual import EvaluatedIndividual
+from core.search.service.randomness import Randomness
+
+
+class SamplingBuckets:
+
+    """
+    Groups the archived individuals in buckets keyed by their sampling counter.
+
+    The least sampled individuals are the bucket of the minimum counter. The minimum only moves
+    up when its bucket is emptied, to the next counter in use, and down when an individual with a
+    lower counter is added. Each individual knows its position in its bucket, so it is moved by
+    swapping it with the last one, and adding, sampling and resetting an individual are O(1).
+    """
+
+    def __init__(self):
+        """Initializes empty buckets."""
+        self.buckets: dict[int, list[EvaluatedIndividual]] = {}
+        # Position of each individual in its bucket, by id
+        self.positions: dict[int, int] = {}
+        self.min_counter = 0
+
+    def __len__(self):
+        """Returns the number of individuals in the buckets."""
+        return len(self.positions)
+
+    def __contains__(self, individual: EvaluatedIndividual):
+        """Returns whether the individual is in the buckets."""
+        return id(individual) in self.positions
+
+    def add(self, individual: EvaluatedIndividual):
+        """Adds an individual to the bucket of its sampling counter."""
+        counter = individual.sampling_counter
+        bucket = self.buckets.setdefault(counter, [])
+        self.positions[id(individual)] = len(bucket)
+        bucket.append(individual)
+        if counter < self.min_counter or len(self.positions) == 1:
+            self.min_counter = counter
+
+    def remove(self, individual: EvaluatedIndividual):
+        """Removes an individual from its bucket."""
+        counter = individual.sampling_counter
+        bucket = self.buckets[counter]
+        position = self.positions.pop(id(individual))
+        last = bucket.pop()
+        if last is not individual:
+            bucket[position] = last
+            self.positions[id(last)] = position
+
+        if not bucket:
+            del self.buckets[counter]
+
+    def sample(self, randomness: Randomness) -> EvaluatedIndividual:
+        """Picks one of the least sampled individuals at random and increments its sampling counter."""
+        if not self.buckets:
+            raise IndexError("There are no individuals to sample")
+        while self.min_counter not in self.buckets:
+            self.min_counter += 1
+        bucket = self.buckets[self.min_counter]
+        individual = bucket[randomness.random_choice(len(bucket))]
+        self.remove(individual)
+        individual.sampling_counter += 1
+        self.add(individual)
+        return individual
+
+    def reset(self, individual: EvaluatedIndividual):
+        """Resets the sampling counter of an individual to 0, moving it to the first bucket."""
+        if individual in self:
+            self.remove(individual)
+            individual.sampling_counter = 0
+            self.add(individual)
+        else:
+            individual.sampling_counter = 0
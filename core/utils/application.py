@@ -3,6 +3,9 @@
 from dependency_injector import providers
 
 from core.config_parser import ConfigParser
+from core.remote.async_remote_controller import AsyncRemoteController
+from core.remote.in_process_remote_controller import InProcessRemoteController
+from core.remote.local_remote_controller import LocalRemoteController
 from core.search.algorithms.genetic_algorithm import GeneticAlgorithm
 from core.search.algorithms.mio_algorithm import MioAlgorithm
 from core.search.algorithms.random_algorithm import RandomAlgorithm
@@ -19,6 +22,22 @@ from core.search.service.fitness_function.targeted_fitness_function import Targe
 def configure_container(container):
     """Configure the container with the provided configuration."""
 
+    if container.config.get("nut_module"):
+        container.remote_controller.override(providers.Singleton(InProcessRemoteController,
+                                                                 config=container.config,
+                                                                 stc=container.stc,
+                                                                 label_table=container.label_table))
+    elif container.config.get("nut_socket"):
+        container.remote_controller.override(providers.Singleton(LocalRemoteController,
+                                                                 config=container.config,
+                                                                 stc=container.stc,
+                                                                 label_table=container.label_table))
+    elif container.config.get("max_in_flight", 1) > 1:
+        container.remote_controller.override(providers.Singleton(AsyncRemoteController,
+                                                                 config=container.config,
+                                                                 stc=container.stc,
+                                                                 label_table=container.label_table))
+
     if container.config.get("mutator") == ConfigParser.Mutators.STANDARD_MUTATOR:
         container.mutator.override(providers.Singleton(StandardMutator,
                                                        randomness=container.randomness,
@@ -64,13 +83,17 @@ def configure_container(container):
                                                   archive=container.archive,
                                                   remote_controller=container.remote_controller,
                                                   stc=container.stc,
-                                                  target=container.config.get("target")
+                                                  target=container.config.get("target"),
+                                                  cache=container.fitness_cache,
+                                                  predictions_top_k=container.config.get("predictions_top_k")
                                                   ))
     else:
         container.ff.override(providers.Singleton(UntargetedFitnessFunction,
                                                   archive=container.archive,
                                                   remote_controller=container.remote_controller,
-                                                  stc=container.stc))
+                                                  stc=container.stc,
+                                                  cache=container.fitness_cache,
+                                                  predictions_top_k=container.config.get("predictions_top_k")))
 
     if container.config.get("pruning_method") == ConfigParser.PruningTypes.STANDARD:
         container.pruner.override(providers.Singleton(StandardPruner,
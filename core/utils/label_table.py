@@ -0,0 +1,48 @@
+"""Module contains the LabelTable class, which maps the class labels of the NUT to integer ids."""
+import threading
+
+import numpy as np
+
+
+class LabelTable:
+
+    """
+    Interns the class labels of the NUT as integer ids, in the order they are first seen.
+
+    The table is filled with the labels of the NUT when it is started, so the predictions are kept
+    as dense score vectors indexed by id and the labels are compared as integers.
+    """
+
+    def __init__(self, labels=()):
+        """Initializes the table with the provided labels."""
+        self.labels = []
+        self.index = {}
+        # Labels can be added by the threads that read the NUT responses
+        self.lock = threading.Lock()
+        self.get_ids(labels)
+
+    def __len__(self):
+        """Returns the number of labels."""
+        return len(self.labels)
+
+    def get_id(self, label) -> int:
+        """Returns the id of a label, adding it to the table if it is new."""
+        label_id = self.index.get(label)
+        if label_id is None:
+            with self.lock:
+                label_id = self.index.setdefault(label, len(self.labels))
+                if label_id == len(self.labels):
+                    self.labels.append(label)
+        return label_id
+
+    def get_ids(self, labels) -> np.ndarray:
+        """Returns the ids of the labels, adding the new ones to the table."""
+        return np.fromiter((self.get_id(label) for label in labels), dtype=np.intp, count=len(labels))
+
+    def find(self, label):
+        """Returns the id of a label, or None if it is not in the table."""
+        return self.index.get(label)
+
+    def get_label(self, label_id: int):
+        """Returns the label of an id."""
+        return self.labels[label_id]
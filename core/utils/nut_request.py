@@ -1,22 +1,155 @@
 """NutRequest class for handling requests to the Nut API."""
+from collections.abc import Sequence
+from typing import Optional
+
+import numpy as np
 
 from core.utils.label import Label
+from core.utils.label_table import LabelTable
+
+
+class Predictions(Sequence):
+
+    """
+    Scores of the labels of a label table. Label objects are only built when accessed.
+
+    The scores are either a dense vector indexed by label id, or the scores of the provided ids.
+    """
+
+    def __init__(self, label_table: LabelTable, scores: np.ndarray, ids: Optional[np.ndarray] = None):
+        """Initializes the predictions with the label table, the scores and the ids they belong to if not dense."""
+        self.label_table = label_table
+        self.scores = scores
+        self.ids = ids
+
+    def __len__(self):
+        """Returns the number of predictions."""
+        return len(self.scores)
+
+    def __getitem__(self, index):
+        """Returns the prediction at an index as a Label, or a list of Labels for a slice."""
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        label_id = index if self.ids is None else int(self.ids[index])
+        return Label(self.label_table.get_label(label_id), float(self.scores[index]))
+
+    def get_ids(self) -> np.ndarray:
+        """Returns the label id of each score."""
+        return np.arange(len(self.scores)) if self.ids is None else self.ids
+
+    def get_memory_size(self) -> int:
+        """Returns the memory used by the scores and the ids, in bytes."""
+        return self.scores.nbytes + (self.ids.nbytes if self.ids is not None else 0)
 
 
 class NutRequest:
 
-    """NutRequest class for handling requests to the Nut API."""
+    """
+    NutRequest class for handling requests to the Nut API.
+
+    The scores are kept as a dense vector indexed by the ids of a label table, and the best,
+    runner-up and target labels as ids, so they are compared as integers.
+    """
 
-    def __init__(self, request, target=None):
+    def __init__(self, request, target=None, label_table: Optional[LabelTable] = None):
         """Initializes a NutRequest object with the provided request."""
         predictions = request["predictions"]
-        self.predictions = NutRequest.request_to_label_array(predictions)
-        self.max_score = max(self.predictions, key=lambda x: x.value)
-        self.second_max_score = sorted(self.predictions, key=lambda x: x.value, reverse=True)[1]
+        label_table = label_table if label_table is not None else LabelTable()
+        ids = label_table.get_ids([prediction["label"] for prediction in predictions])
+        scores = np.fromiter((prediction["score"] for prediction in predictions), dtype=np.float64,
+                             count=len(predictions))
+        self.set_scores(label_table, ids, scores, target)
+
+    @classmethod
+    def from_scores(cls, labels, scores, target=None, label_table: Optional[LabelTable] = None):
+        """Creates a NutRequest from a score vector whose entries are ordered as the provided labels."""
+        label_table = label_table if label_table is not None else LabelTable()
+        return cls.from_ids(label_table, label_table.get_ids(labels), scores, target)
+
+    @classmethod
+    def from_ids(cls, label_table: LabelTable, ids: np.ndarray, scores, target=None):
+        """Creates a NutRequest from the scores of the provided label ids."""
+        nut_request = cls.__new__(cls)
+        nut_request.set_scores(label_table, ids, np.asarray(scores), target)
+        return nut_request
+
+    def set_scores(self, label_table: LabelTable, ids: np.ndarray, scores: np.ndarray, target=None):
+        """
+        Sets the dense score vector and the ids of the best, runner-up and target labels.
+
+        The two best scores are found in linear time among the returned ones instead of sorting all of them.
+        Ties are broken by response order, as max() does.
+        """
+        self.label_table = label_table
+        self.target = target
+        self.target_id = label_table.get_id(target) if target else None
+        dense = np.zeros(len(label_table), dtype=np.float64)
+        dense[ids] = scores
+        self.scores = dense
+
+        # argmax returns the first index among equal maxima
+        best = int(np.argmax(scores))
+        self.max_id = int(ids[best])
+        if len(scores) > 1:
+            second = int(np.argmax(np.where(np.arange(len(scores)) == best, -np.inf, scores)))
+            self.second_max_id = int(ids[second])
+        else:
+            self.second_max_id = None
+
+    @property
+    def predictions(self) -> Predictions:
+        """Returns the scores of all the labels of the table."""
+        return Predictions(self.label_table, self.scores)
+
+    def get_predictions(self, top_k: int = 0) -> Predictions:
+        """
+        Returns a compact copy of the scores as float32, to be kept once the request is discarded.
+
+        If top_k is positive, only the top_k best scores are kept, best first, plus the target. Ties are
+        broken by label id.
+        """
+        scores = self.scores.astype(np.float32)
+        if top_k <= 0 or top_k >= len(scores):
+            return Predictions(self.label_table, scores)
+
+        # Partial selection of the top_k-th score, then the labels scoring at least as much in id order
+        threshold = scores[np.argpartition(scores, -top_k)[-top_k]]
+        ids = np.flatnonzero(scores >= threshold)
+        ids = ids[np.argsort(-scores[ids], kind="stable")[:top_k]]
+        if self.target_id is not None and self.target_id not in ids:
+            ids = np.append(ids, self.target_id)
+        ids = ids.astype(np.int32)
+        return Predictions(self.label_table, scores[ids], ids)
+
+    @property
+    def max_score(self) -> Label:
+        """Returns the label with the highest score."""
+        return self.get_label(self.max_id)
+
+    @property
+    def second_max_score(self) -> Label:
+        """Returns the label with the second highest score."""
+        return self.get_label(self.second_max_id)
+
+    @property
+    def target_score(self) -> Optional[Label]:
+        """Returns the target label with its score, or None if the attack is untargeted."""
+        if self.target_id is None:
+            return None
+        return Label(self.target, float(self.scores[self.target_id]))
+
+    def get_label(self, label_id: Optional[int]) -> Label:
+        """Returns the label of an id with its score, or an empty label without score."""
+        if label_id is None:
+            return Label(None, 0.0)
+        return Label(self.label_table.get_label(label_id), float(self.scores[label_id]))
 
-        self.target_score = next(
-            (label for label in self.predictions if label.label == target), Label(target, 0.0)
-        ) if target else None
+    def get_score(self, label) -> Label:
+        """Returns the score of a label, zero if the NUT did not return it."""
+        label_id = self.label_table.find(label)
+        if label_id is None or label_id >= len(self.scores):
+            return Label(label, 0.0)
+        return self.get_label(label_id)
 
     @staticmethod
     def request_to_label(prediction):
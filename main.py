@@ -120,19 +120,29 @@ class OptiAttack:
 
         self.pc.start()
         self.stc.start_search()
-        self.algorithm.search()
+        try:
+            self.algorithm.search()
 
-        if self.config.get("enable_pruning") is True:
-            self.pc.prune()
-            final_solution = self.pruner.minimize_actions_in_archive()
-            self.archive.set_minimized_solution(final_solution)
-            self.stc.set_pruned_fitness(final_solution.fitness_value)
+            if self.config.get("enable_pruning") is True:
+                self.pc.prune()
+                final_solution = self.pruner.minimize_actions_in_archive()
+                self.archive.set_minimized_solution(final_solution)
+                self.stc.set_pruned_fitness(final_solution.fitness_value)
+        finally:
+            self.stop_nut()
 
         self.pc.end()
         self.search_status_updater.search_end()
         self.statistics.write_statistics()
         return self.statistics.output_dir
 
+    def stop_nut(self):
+        """Stop the NUT, so that it releases the image, the delta sessions and the shared memory of the run."""
+        try:
+            self.remote_controller.stop_nut()
+        except (ConnectionError, TimeoutError):
+            self.logger.warning("The NUT could not be reached to stop it.")
+
 
 if __name__ == "__main__":
 
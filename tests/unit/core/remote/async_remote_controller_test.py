@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from client.core.optiattack_client import collect_info
+from core.problem.base_module import BaseModule
+from core.remote.async_remote_controller import AsyncRemoteController
+from core.search.action import Action
+
+RESPONSE = {
+    "predictions": [
+        {"label": "zebra", "score": 0.93},
+        {"label": "horse", "score": 0.07},
+    ]
+}
+
+HOST = "localhost"
+PORT = 38031
+BATCHING_PORT = 38035
+batch_sizes = []
+
+
+@collect_info(host=HOST, port=PORT)
+def process_image(encoded_image: bytes, additional_data=None):
+    return RESPONSE
+
+
+@collect_info(host=HOST, port=BATCHING_PORT, max_batch_size=3, max_batch_delay=0.5)
+def process_image_batch(images, additional_data=None):
+    if not additional_data.get("batch_size"):
+        return RESPONSE
+    batch_sizes.append(additional_data["batch_size"])
+    return {"predictions": [RESPONSE["predictions"]] * additional_data["batch_size"]}
+
+
+@pytest.fixture
+def remote_controller():
+    container = BaseModule()
+    container.config.override(
+        {"seed": 42, "nut_host": HOST, "nut_port": PORT,
+         "base_endpoint": "/api/v1", "max_in_flight": 3})
+    return AsyncRemoteController(container.config(), container.stc(), container.label_table())
+
+
+def test_submit_new_action(remote_controller):
+    image_array = np.array(Image.new("RGB", (100, 100), color="red"))
+
+    futures = [remote_controller.submit_new_action(image_array) for _ in range(5)]
+
+    assert remote_controller.stc.get_evaluated_individuals() == 5
+    for future in futures:
+        response = future.result(timeout=10)
+        assert response.max_score.label == RESPONSE["predictions"][0]["label"]
+        assert response.second_max_score.label == RESPONSE["predictions"][1]["label"]
+
+
+def test_new_action_binary(remote_controller):
+    image_array = np.array(Image.new("RGB", (100, 100), color="red"))
+    remote_controller.wire_format = "binary"
+
+    remote_controller.run_nut(image_array)
+    response = remote_controller.new_action(image_array)
+
+    assert response.max_score.label == RESPONSE["predictions"][0]["label"]
+    assert response.max_score.value == pytest.approx(RESPONSE["predictions"][0]["score"])
+
+
+def test_submit_new_action_delta_expired_session(remote_controller):
+    image_array = np.array(Image.new("RGB", (100, 100), color="red"))
+    remote_controller.wire_format = "delta"
+
+    remote_controller.run_nut(image_array)
+    remote_controller.pool.endpoints[0].session = "expired"
+
+    response = remote_controller.submit_new_action_delta([Action((1, 2), 0, 0, 0)]).result(timeout=10)
+    assert remote_controller.pool.endpoints[0].session != "expired"
+    assert response.max_score.label == RESPONSE["predictions"][0]["label"]
+
+
+def test_connection_error():
+    container = BaseModule()
+    container.config.override({"nut_host": HOST, "nut_port": 1, "base_endpoint": "/api/v1", "max_in_flight": 2})
+    remote_controller = AsyncRemoteController(container.config(), container.stc(), container.label_table())
+    image_array = np.zeros((2, 2, 3), dtype=np.uint8)
+
+    with pytest.raises(ConnectionError):
+        remote_controller.submit_new_action(image_array).result(timeout=10)
+
+
+def test_submit_new_action_micro_batched():
+    container = BaseModule()
+    container.config.override({"nut_host": HOST, "nut_port": BATCHING_PORT, "base_endpoint": "/api/v1",
+                               "max_in_flight": 3})
+    remote_controller = AsyncRemoteController(container.config(), container.stc(), container.label_table())
+    image_array = np.array(Image.new("RGB", (100, 100), color="red"))
+    remote_controller.run_nut(image_array)
+
+    futures = [remote_controller.submit_new_action(image_array) for _ in range(3)]
+
+    for future in futures:
+        assert future.result(timeout=10).max_score.label == RESPONSE["predictions"][0]["label"]
+    # The concurrent requests reach the model as a single batch
+    assert batch_sizes == [3]
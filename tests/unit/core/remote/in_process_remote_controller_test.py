@@ -0,0 +1,124 @@
+import numpy as np
+import pytest
+
+from client.core.optiattack_client import collect_info
+from core.problem.base_module import BaseModule
+from core.remote.in_process_remote_controller import InProcessRemoteController, load_nut_function
+from core.search.action import Action
+from core.utils.application import configure_container
+
+RESPONSE = {
+    "predictions": [
+        {"label": "zebra", "score": 0.93},
+        {"label": "horse", "score": 0.07},
+    ]
+}
+
+calls = []
+
+
+def process_image(image_array, additional_data=None):
+    calls.append((image_array.copy(), additional_data))
+    if additional_data.get("batch_size"):
+        return {"predictions": [RESPONSE["predictions"]] * additional_data["batch_size"]}
+    return RESPONSE
+
+
+@collect_info(host="localhost", port=38038)
+def decorated_process_image(image_array, additional_data=None):
+    return RESPONSE
+
+
+MODULE = "tests.unit.core.remote.in_process_remote_controller_test"
+
+
+@pytest.fixture
+def remote_controller():
+    calls.clear()
+    container = BaseModule()
+    container.config.override({"nut_module": f"{MODULE}:process_image", "base_endpoint": "/api/v1",
+                               "target": "horse"})
+    return InProcessRemoteController(container.config(), container.stc(), container.label_table())
+
+
+def test_load_nut_function():
+    assert load_nut_function(f"{MODULE}:process_image") is process_image
+
+    with pytest.raises(ValueError):
+        load_nut_function(MODULE)
+
+
+def test_load_decorated_nut_function():
+    # The collect_info wrapper has started a server, so it is not used in process
+    with pytest.raises(ValueError, match="decorated by collect_info"):
+        load_nut_function(f"{MODULE}:decorated_process_image")
+
+
+def test_run_nut(remote_controller):
+    image_array = np.zeros((4, 4, 3), dtype=np.uint8)
+
+    nut_info = remote_controller.run_nut(image_array)
+
+    assert nut_info["is_running"] is True
+    assert nut_info["predictions"] == RESPONSE["predictions"]
+    assert remote_controller.stop_nut()["is_running"] is False
+
+
+def test_new_action(remote_controller):
+    image_array = np.arange(48, dtype=np.uint8).reshape((4, 4, 3))
+
+    response = remote_controller.new_action(image_array)
+
+    assert response.max_score.label == "zebra"
+    assert response.target_score.label == "horse"
+    assert remote_controller.stc.get_evaluated_individuals() == 1
+    # The function receives the flattened image, like behind collect_info
+    assert np.array_equal(calls[0][0], image_array.reshape(-1))
+    assert calls[0][1] == {"target": "horse"}
+
+
+def test_new_action_batch(remote_controller):
+    remote_controller.batch_evaluation = True
+    image_arrays = [np.zeros((4, 4, 3), dtype=np.uint8), np.ones((4, 4, 3), dtype=np.uint8)]
+
+    responses = remote_controller.new_action_batch(image_arrays)
+
+    assert len(responses) == 2
+    assert calls[0][0].shape == (2, 48)
+    assert calls[0][1]["batch_size"] == 2
+    assert remote_controller.stc.get_evaluated_individuals() == 2
+
+
+def test_new_action_batch_reused_buffer(remote_controller):
+    remote_controller.batch_evaluation = True
+    image_array = np.zeros((4, 4, 3), dtype=np.uint8)
+
+    def reused_buffer():
+        for value in (1, 2):
+            image_array[:] = value
+            yield image_array
+
+    remote_controller.new_action_batch(reused_buffer())
+
+    # Each image is copied into its row before the buffer is written again
+    assert calls[0][0][:, 0].tolist() == [1, 2]
+    assert calls[0][1]["batch_size"] == 2
+
+
+def test_new_action_delta(remote_controller):
+    remote_controller.run_nut(np.zeros((4, 4, 3), dtype=np.uint8))
+
+    remote_controller.new_action_delta([Action((1, 2), 9, 9, 9)])
+
+    assert list(calls[-1][0].reshape((4, 4, 3))[1, 2]) == [9, 9, 9]
+    assert remote_controller.is_delta() is False
+
+
+def test_configure_container():
+    container = BaseModule()
+    parameters = container.config_parser().default_params().copy()
+    parameters["nut_module"] = f"{MODULE}:process_image"
+    container.config.override(parameters)
+    configure_container(container)
+
+    assert isinstance(container.remote_controller(), InProcessRemoteController)
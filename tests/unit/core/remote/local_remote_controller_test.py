@@ -0,0 +1,199 @@
+import os
+import tempfile
+import time
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+from client.core.optiattack_client import collect_info
+from core.problem.base_module import BaseModule
+from core.remote.local_remote_controller import LocalRemoteController
+from core.search.action import Action
+from core.utils.application import configure_container
+
+SOCKET_PATH = os.path.join(tempfile.gettempdir(), f"optiattack-test-{os.getpid()}.sock")
+
+calls = []
+
+
+@collect_info(host="localhost", port=38039, socket_path=SOCKET_PATH)
+def process_image(image_array, additional_data=None):
+    calls.append((image_array.copy(), additional_data))
+    if image_array[0] == 255:
+        raise ValueError("Unreadable image")
+    if image_array[0] == 254:
+        time.sleep(0.2)
+    predictions = [{"label": "zebra", "score": 0.9}, {"label": "horse", "score": 0.1}]
+    if image_array[0] > 0:
+        # A label the controller has not seen yet, scored by the first pixel
+        predictions.append({"label": f"class_{image_array[0]}", "score": 0.95})
+    return {"predictions": predictions}
+
+
+def create_remote_controller(max_in_flight=1, **config):
+    container = BaseModule()
+    container.config.override({"nut_socket": SOCKET_PATH, "max_in_flight": max_in_flight, "target": "horse",
+                               "nut_host": "localhost", "nut_port": 38039, "base_endpoint": "/api/v1", **config})
+    return LocalRemoteController(container.config(), container.stc(), container.label_table())
+
+
+def image(first_pixel):
+    image_array = np.zeros((4, 4, 3), dtype=np.uint8)
+    image_array[0, 0, 0] = first_pixel
+    return image_array
+
+
+@pytest.fixture
+def remote_controller():
+    calls.clear()
+    remote_controller = create_remote_controller()
+    yield remote_controller
+    remote_controller.stop_nut()
+
+
+def test_run_nut(remote_controller):
+    nut_info = remote_controller.run_nut(image(0))
+
+    assert nut_info["is_running"] is True
+    assert nut_info["controller_host"] == SOCKET_PATH
+    assert remote_controller.labels == ["zebra", "horse"]
+    assert calls[-1][1] == {"target": "horse"}
+    assert remote_controller.get_nut_info()["is_running"] is True
+
+
+def test_new_action(remote_controller):
+    remote_controller.run_nut(image(0))
+    image_array = np.arange(48, dtype=np.uint8).reshape((4, 4, 3))
+
+    response = remote_controller.new_action(image_array)
+
+    assert response.max_score.label == "zebra"
+    assert response.target_score.value == pytest.approx(0.1)
+    assert remote_controller.stc.get_evaluated_individuals() == 1
+    # The model reads the flattened image from the shared memory ring
+    assert np.array_equal(calls[-1][0], image_array.reshape(-1))
+
+
+def test_new_action_with_new_labels(remote_controller):
+    remote_controller.run_nut(image(0))
+
+    response = remote_controller.new_action(image(7))
+
+    assert response.max_score.label == "class_7"
+    assert remote_controller.labels == ["zebra", "horse", "class_7"]
+    assert remote_controller.new_action(image(0)).max_score.label == "zebra"
+
+
+def test_pipelined_new_actions():
+    calls.clear()
+    remote_controller = create_remote_controller(max_in_flight=3)
+    remote_controller.run_nut(image(0))
+
+    # More evaluations than slots, so the ring is reused while responses come back
+    futures = [remote_controller.submit_new_action(image(i)) for i in range(1, 8)]
+
+    assert [future.result().max_score.label for future in futures] == [f"class_{i}" for i in range(1, 8)]
+    assert remote_controller.free_slots.qsize() == 3
+    assert remote_controller.new_action_batch([image(2), image(3)])[1].max_score.label == "class_3"
+    remote_controller.stop_nut()
+
+
+def test_model_error(remote_controller):
+    remote_controller.run_nut(image(0))
+
+    with pytest.raises(RuntimeError, match="Unreadable image"):
+        remote_controller.new_action(image(255))
+    # The connection and the slot are still usable
+    assert remote_controller.new_action(image(0)).max_score.label == "zebra"
+
+
+def test_run_nut_failure_closes_ring_and_socket(remote_controller):
+    with pytest.raises(RuntimeError, match="Unreadable image"):
+        remote_controller.run_nut(image(255))
+
+    assert remote_controller.ring is None
+    assert remote_controller.socket is None
+    # The controller connects again on the next run
+    assert remote_controller.run_nut(image(0))["is_running"] is True
+
+
+def test_lost_connection_needs_run_nut(remote_controller):
+    remote_controller.run_nut(image(0))
+
+    # The NUT keeps the ring per connection, so it is lost with the connection
+    remote_controller.disconnect()
+
+    with pytest.raises(ConnectionError, match="Call run_nut again"):
+        remote_controller.new_action(image(0))
+    assert remote_controller.free_slots.qsize() == 1
+    remote_controller.run_nut(image(0))
+    assert remote_controller.new_action(image(7)).max_score.label == "class_7"
+
+
+def test_failed_send_leaves_no_pending_future(remote_controller):
+    remote_controller.run_nut(image(0))
+    sock = remote_controller.socket
+    remote_controller.socket = MagicMock(sendall=MagicMock(side_effect=OSError("Broken pipe")))
+
+    with pytest.raises(ConnectionError, match="Broken pipe"):
+        remote_controller.new_action(image(0))
+
+    remote_controller.socket = sock
+    assert len(remote_controller.pending) == 0
+    assert remote_controller.new_action(image(0)).max_score.label == "zebra"
+
+
+def test_request_timeout_disabled():
+    remote_controller = create_remote_controller(request_timeout=0)
+
+    remote_controller.run_nut(image(0))
+
+    assert remote_controller.new_action(image(0)).max_score.label == "zebra"
+    assert remote_controller.new_action_batch([image(0)])[0].max_score.label == "zebra"
+    remote_controller.stop_nut()
+
+
+def test_request_timeout(remote_controller):
+    remote_controller.run_nut(image(0))
+    remote_controller.request_timeout = 0.05
+
+    # Raised as the builtin TimeoutError, which the concurrent.futures one is not before Python 3.11
+    with pytest.raises(TimeoutError) as error:
+        remote_controller.new_action(image(254))
+
+    assert error.type is TimeoutError
+    assert remote_controller.get_request_statistics()["timeouts"] == 1
+    remote_controller.request_timeout = 30.0
+
+
+def test_new_action_delta(remote_controller):
+    remote_controller.run_nut(image(0))
+
+    remote_controller.new_action_delta([Action((1, 2), 9, 9, 9)])
+
+    assert list(calls[-1][0].reshape((4, 4, 3))[1, 2]) == [9, 9, 9]
+    assert remote_controller.is_delta() is False
+
+
+def test_connection_error():
+    container = BaseModule()
+    container.config.override({"nut_socket": SOCKET_PATH + ".missing", "nut_host": "localhost",
+                               "nut_port": 38039, "base_endpoint": "/api/v1"})
+    remote_controller = LocalRemoteController(container.config(), container.stc(), container.label_table())
+
+    with pytest.raises(ConnectionError):
+        remote_controller.get_nut_info()
+
+
+def test_configure_container():
+    container = BaseModule()
+    parameters = container.config_parser().default_params().copy()
+    parameters["nut_socket"] = SOCKET_PATH
+    container.config.override(parameters)
+    configure_container(container)
+
+    assert isinstance(container.remote_controller(), LocalRemoteController)
+    # The label ids of the predictions are compared across the controller, the archive and the statistics
+    assert container.remote_controller().label_table is container.archive().label_table
+    assert container.statistics().label_table is container.archive().label_table
@@ -0,0 +1,118 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from client.core.optiattack_client import collect_info
+from core.problem.base_module import BaseModule
+from core.remote.nut_pool import NutPool
+from core.remote.remote_controller import RemoteController
+
+RESPONSE = {
+    "predictions": [
+        {"label": "zebra", "score": 0.93},
+        {"label": "horse", "score": 0.07},
+    ]
+}
+
+HOST = "localhost"
+PORTS = [38032, 38033]
+# Nothing listens on this port
+DEAD_PORT = 38034
+
+
+@collect_info(host=HOST, port=PORTS[0])
+def process_image(encoded_image: bytes, additional_data=None):
+    return RESPONSE
+
+
+@collect_info(host=HOST, port=PORTS[1])
+def process_image_replica(encoded_image: bytes, additional_data=None):
+    return RESPONSE
+
+
+@pytest.fixture
+def pool():
+    return NutPool(["http://a", "http://b", "http://c"])
+
+
+@pytest.fixture
+def remote_controller():
+    container = BaseModule()
+    nut_endpoints = ",".join(f"{HOST}:{port}" for port in PORTS + [DEAD_PORT])
+    container.config.override(
+        {"seed": 42, "nut_endpoints": nut_endpoints, "base_endpoint": "/api/v1", "health_check_interval": 0})
+    return RemoteController(container.config(), container.stc(), container.label_table())
+
+
+def test_acquire_least_outstanding(pool):
+    acquired = [pool.acquire() for _ in pool.endpoints]
+    pool.release(acquired[1], 1.0)
+
+    assert acquired == pool.endpoints
+    assert pool.acquire() is acquired[1]
+
+
+def test_acquire_round_robin_ties(pool):
+    acquired = []
+    for _ in range(6):
+        endpoint = pool.acquire()
+        pool.release(endpoint, 1.0)
+        acquired.append(endpoint.base_url)
+
+    assert acquired == ["http://a", "http://b", "http://c"] * 2
+
+
+def test_failing_endpoint_out_of_rotation(pool):
+    with pytest.raises(ConnectionError):
+        with pool.connect() as endpoint:
+            raise ConnectionError("Connection Error")
+
+    assert not endpoint.healthy
+    assert endpoint not in [pool.acquire() for _ in range(4)]
+
+
+def test_acquire_without_healthy_endpoints(pool):
+    for endpoint in pool.endpoints:
+        endpoint.healthy = False
+
+    assert pool.acquire() in pool.endpoints
+    with pytest.raises(ConnectionError):
+        pool.acquire(exclude=pool.endpoints)
+
+
+def test_check_health(remote_controller):
+    recovered = []
+    for endpoint in remote_controller.pool.endpoints:
+        endpoint.healthy = False
+
+    remote_controller.pool.check_health(1.0, recovered.append)
+
+    assert [endpoint.healthy for endpoint in remote_controller.pool.endpoints] == [True, True, False]
+    assert recovered == remote_controller.pool.endpoints[:2]
+
+
+def test_new_action_spread_across_replicas(remote_controller):
+    image_array = np.array(Image.new("RGB", (100, 100), color="red"))
+    remote_controller.run_nut(image_array)
+
+    for _ in range(10):
+        response = remote_controller.new_action(image_array)
+        assert response.max_score.label == "zebra"
+
+    statistics = remote_controller.get_statistics()
+    assert [endpoint["requests"] for endpoint in statistics] == [5, 5, 0]
+    assert statistics[2]["healthy"] is False
+    assert all(endpoint["latency_avg_ms"] > 0 for endpoint in statistics[:2])
+
+
+def test_new_action_fails_over(remote_controller):
+    image_array = np.array(Image.new("RGB", (100, 100), color="red"))
+
+    # The dead replica is still in rotation, as run_nut has not been called
+    for _ in range(3):
+        assert remote_controller.new_action(image_array).max_score.label == "zebra"
+
+    statistics = remote_controller.get_statistics()
+    assert statistics[2]["failures"] == 1
+    assert statistics[2]["healthy"] is False
+    assert statistics[0]["requests"] + statistics[1]["requests"] == 3
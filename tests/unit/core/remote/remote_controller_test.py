@@ -1,10 +1,12 @@
 from io import BytesIO
+from unittest.mock import MagicMock
 
 import numpy as np
 import pytest
 from PIL import Image
 
-from client.core.optiattack_client import collect_info
+from client.core.optiattack_client import DeltaSessions, collect_info, top_k_predictions
+from core.search.action import Action
 from main import OptiAttack
 from core.problem.base_module import BaseModule
 
@@ -20,6 +22,8 @@ PORT = 38030
 
 @collect_info(host=HOST, port=PORT)
 def process_image(encoded_image: bytes, additional_data=None):
+    if additional_data and additional_data.get("batch_size"):
+        return {"predictions": [RESPONSE["predictions"]] * additional_data["batch_size"]}
     return RESPONSE
 
 
@@ -77,6 +81,152 @@ def test_new_action(app):
     assert response.second_max_score.label == RESPONSE["predictions"][1]["label"]
 
 
+def test_new_action_batch(app):
+    image_array = np.array(Image.new("RGB", (100, 100), color="red"))
+    app.remote_controller.batch_evaluation = True
+
+    responses = app.remote_controller.new_action_batch([image_array, image_array])
+    assert len(responses) == 2
+    for response in responses:
+        assert response.max_score.label == RESPONSE["predictions"][0]["label"]
+        assert response.second_max_score.label == RESPONSE["predictions"][1]["label"]
+
+
+def test_new_action_batch_disabled(app):
+    image_array = np.array(Image.new("RGB", (100, 100), color="red"))
+    app.remote_controller.batch_evaluation = False
+    app.remote_controller.new_action = MagicMock(return_value="nut_request")
+
+    responses = app.remote_controller.new_action_batch([image_array, image_array])
+    assert responses == ["nut_request", "nut_request"]
+    assert app.remote_controller.new_action.call_count == 2
+
+
+def test_new_action_binary(app):
+    image_array = np.array(Image.new("RGB", (100, 100), color="red"))
+    app.remote_controller.wire_format = "binary"
+
+    app.remote_controller.run_nut(image_array)
+    response = app.remote_controller.new_action(image_array)
+
+    assert response.max_score.label == RESPONSE["predictions"][0]["label"]
+    assert response.max_score.value == pytest.approx(RESPONSE["predictions"][0]["score"])
+    assert response.second_max_score.label == RESPONSE["predictions"][1]["label"]
+    assert response.second_max_score.value == pytest.approx(RESPONSE["predictions"][1]["score"])
+
+
+def test_run_nut_binary_fallback(app):
+    image_array = np.array(Image.new("RGB", (100, 100), color="red"))
+    app.remote_controller.wire_format = "binary"
+    app.remote_controller.connection.post = MagicMock(side_effect=[
+        MagicMock(status_code=422),
+        MagicMock(status_code=200, json=MagicMock(return_value={"is_running": True})),
+    ])
+
+    response = app.remote_controller.run_nut(image_array)
+    assert response["is_running"] is True
+    assert app.remote_controller.wire_format == "json"
+    assert "json" in app.remote_controller.connection.post.call_args.kwargs
+
+
+def test_new_action_delta(app):
+    image_array = np.array(Image.new("RGB", (100, 100), color="red"))
+    app.remote_controller.wire_format = "delta"
+
+    app.remote_controller.run_nut(image_array)
+    assert app.remote_controller.pool.endpoints[0].session is not None
+
+    response = app.remote_controller.new_action_delta([Action((1, 2), 0, 0, 0), Action((3, 4), 9, 9, 9)])
+    assert response.max_score.label == RESPONSE["predictions"][0]["label"]
+    assert response.max_score.value == pytest.approx(RESPONSE["predictions"][0]["score"])
+
+
+def test_new_action_delta_expired_session(app):
+    image_array = np.array(Image.new("RGB", (100, 100), color="red"))
+    app.remote_controller.wire_format = "delta"
+
+    app.remote_controller.run_nut(image_array)
+    app.remote_controller.pool.endpoints[0].session = "expired"
+
+    response = app.remote_controller.new_action_delta([Action((1, 2), 0, 0, 0)])
+    assert app.remote_controller.pool.endpoints[0].session != "expired"
+    assert response.max_score.label == RESPONSE["predictions"][0]["label"]
+
+
+def test_delta_sessions_evict_least_recently_used():
+    sessions = DeltaSessions(max_sessions=2)
+    first = sessions.add(np.zeros((2, 2, 3), dtype=np.uint8))
+    second = sessions.add(np.zeros((2, 2, 3), dtype=np.uint8))
+
+    # Using the first session makes the second one the least recently used
+    assert sessions.get(first) is not None
+    third = sessions.add(np.zeros((2, 2, 3), dtype=np.uint8))
+
+    assert len(sessions) == 2
+    assert sessions.get(second) is None
+    assert sessions.get(first) is not None and sessions.get(third) is not None
+
+
+def test_run_nut_keeps_bounded_sessions(app):
+    image_array = np.array(Image.new("RGB", (100, 100), color="red"))
+    app.remote_controller.wire_format = "delta"
+
+    for _ in range(10):
+        app.remote_controller.run_nut(image_array)
+
+    response = app.remote_controller.new_action_delta([Action((1, 2), 0, 0, 0)])
+    assert response.max_score.label == RESPONSE["predictions"][0]["label"]
+
+
 def test_get_test_results():
     # TODO: Not implemented and tested
     pass
+
+
+TOP_K_PORT = 38040
+TOP_K_RESPONSE = {
+    "predictions": [{"label": f"class_{i}", "score": score} for i, score in enumerate([0.5, 0.3, 0.1, 0.06, 0.04])]
+}
+
+
+@collect_info(host=HOST, port=TOP_K_PORT)
+def process_image_top_k(image_array, additional_data=None):
+    return TOP_K_RESPONSE
+
+
+@pytest.mark.parametrize("wire_format", ["json", "binary"])
+def test_new_action_top_k(wire_format):
+    container = BaseModule()
+    container.config.override({"nut_host": HOST, "nut_port": TOP_K_PORT, "base_endpoint": "/api/v1",
+                               "wire_format": wire_format, "top_k": 1, "target": "class_4"})
+    remote_controller = container.remote_controller()
+    image_array = np.array(Image.new("RGB", (10, 10), color="red"))
+
+    remote_controller.run_nut(image_array)
+    response = remote_controller.new_action(image_array)
+
+    # The best prediction and the target, which the NUT always returns
+    assert [label.label for label in response.predictions if label.value > 0] == ["class_0", "class_4"]
+    assert response.max_score.label == "class_0"
+    assert response.target_score.value == pytest.approx(0.04)
+
+
+def test_top_k_predictions_ties():
+    predictions = [{"label": str(i), "score": score} for i, score in enumerate([0.3, 0.3, 0.1, 0.3])]
+
+    # The equal scores are kept and ordered by response order
+    assert [p["label"] for p in top_k_predictions(predictions, 2, set())] == ["0", "1"]
+    assert [p["label"] for p in top_k_predictions(predictions, 2, {"2"})] == ["0", "1", "2"]
+
+
+def test_run_stops_nut_after_failed_search():
+    remote_controller = MagicMock()
+    algorithm = MagicMock(search=MagicMock(side_effect=RuntimeError("Search failed")))
+    app = OptiAttack(config={}, remote_controller=remote_controller, algorithm=algorithm, pc=MagicMock(),
+                     stc=MagicMock(), logger=MagicMock())
+
+    with pytest.raises(RuntimeError, match="Search failed"):
+        app.run()
+
+    # The NUT releases the image and the shared memory of the run
+    remote_controller.stop_nut.assert_called_once()
@@ -0,0 +1,131 @@
+import time
+
+import numpy as np
+import pytest
+
+from client.core.optiattack_client import collect_info
+from core.problem.base_module import BaseModule
+from core.remote.async_remote_controller import AsyncRemoteController
+from core.remote.remote_controller import RemoteController
+
+RESPONSE = {
+    "predictions": [
+        {"label": "zebra", "score": 0.93},
+        {"label": "horse", "score": 0.07},
+    ]
+}
+
+HOST = "localhost"
+SLOW_PORT = 38036
+FAST_PORT = 38037
+SLOW_SECONDS = 1.0
+
+
+@collect_info(host=HOST, port=SLOW_PORT)
+def process_image_slow(encoded_image: bytes, additional_data=None):
+    time.sleep(SLOW_SECONDS)
+    return RESPONSE
+
+
+@collect_info(host=HOST, port=FAST_PORT)
+def process_image_fast(encoded_image: bytes, additional_data=None):
+    return RESPONSE
+
+
+def create_controller(ports, controller=RemoteController, **config):
+    container = BaseModule()
+    container.config.override({"nut_endpoints": ",".join(f"{HOST}:{port}" for port in ports),
+                               "base_endpoint": "/api/v1", "health_check_interval": 0, "retry_backoff": 0.01,
+                               **config})
+    return controller(container.config(), container.stc(), container.label_table())
+
+
+def report_round_trip_times(remote_controller, ms, samples=20):
+    for _ in range(samples):
+        remote_controller.pool.round_trip_times.append(ms)
+
+
+def test_request_timeout_adapts_to_p95():
+    remote_controller = create_controller([FAST_PORT], request_timeout=30.0, timeout_multiplier=4.0)
+    assert remote_controller.get_request_timeout() == 30.0
+
+    report_round_trip_times(remote_controller, 1000)
+    assert remote_controller.get_request_timeout() == pytest.approx(4.0)
+
+    remote_controller.pool.round_trip_times.clear()
+    report_round_trip_times(remote_controller, 10)
+    assert remote_controller.get_request_timeout() == RemoteController.MIN_TIMEOUT_SECONDS
+
+    remote_controller.request_timeout = 0
+    assert remote_controller.get_request_timeout() is None
+
+
+def test_request_timeout_scales_with_batch_size():
+    remote_controller = create_controller([FAST_PORT], request_timeout=30.0, timeout_multiplier=4.0,
+                                          hedge_requests=True)
+    report_round_trip_times(remote_controller, 250)
+
+    assert remote_controller.get_request_timeout() == pytest.approx(1.0)
+    assert remote_controller.get_request_timeout(8) == pytest.approx(8.0)
+    assert remote_controller.get_hedge_delay() == pytest.approx(0.25)
+    assert remote_controller.get_hedge_delay(8) == pytest.approx(2.0)
+
+
+def test_round_trip_time_recorded_per_image():
+    remote_controller = create_controller([FAST_PORT])
+    image_array = np.zeros((4, 4, 3), dtype=np.uint8)
+
+    remote_controller.new_action(image_array)
+    with remote_controller.pool.connect(images=4):
+        time.sleep(0.04)
+
+    single, batch = remote_controller.pool.round_trip_times
+    assert single > 0
+    assert 10 <= batch < 40
+
+
+def test_retry_backoff_is_jittered():
+    remote_controller = create_controller([FAST_PORT], retry_backoff=0.1)
+
+    assert 0.05 <= remote_controller.get_retry_backoff(0) <= 0.1
+    assert 0.2 <= remote_controller.get_retry_backoff(2) <= 0.4
+
+
+def test_timeout_retried():
+    remote_controller = create_controller([SLOW_PORT], request_timeout=0.2, max_retries=1)
+    image_array = np.zeros((4, 4, 3), dtype=np.uint8)
+
+    with pytest.raises(TimeoutError):
+        remote_controller.new_action(image_array)
+
+    statistics = remote_controller.get_request_statistics()
+    assert statistics["timeouts"] == 2
+    assert statistics["retries"] == 1
+
+
+def test_timeout_fails_over():
+    remote_controller = create_controller([SLOW_PORT, FAST_PORT], request_timeout=0.2, max_retries=0)
+    image_array = np.zeros((4, 4, 3), dtype=np.uint8)
+
+    assert remote_controller.new_action(image_array).max_score.label == "zebra"
+    assert remote_controller.get_request_statistics()["timeouts"] == 1
+    # The stalled replica is out of rotation
+    assert remote_controller.new_action(image_array).max_score.label == "zebra"
+    assert remote_controller.get_request_statistics()["timeouts"] == 1
+
+
+@pytest.mark.parametrize("controller", [RemoteController, AsyncRemoteController])
+def test_hedged_request(controller):
+    remote_controller = create_controller([SLOW_PORT, FAST_PORT], controller, hedge_requests=True,
+                                          request_timeout=5.0, max_in_flight=2)
+    report_round_trip_times(remote_controller, 10)
+    image_array = np.zeros((4, 4, 3), dtype=np.uint8)
+
+    start = time.perf_counter()
+    response = remote_controller.new_action(image_array)
+
+    assert response.max_score.label == "zebra"
+    assert time.perf_counter() - start < SLOW_SECONDS
+    statistics = remote_controller.get_request_statistics()
+    assert statistics["hedges"] == 1
+    assert statistics["hedge_wins"] == 1
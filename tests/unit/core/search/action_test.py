@@ -48,3 +48,33 @@ class TestAction:
         assert action.red == 50
         assert action.green == 100
         assert action.blue == 150
+
+    def test_color_cached_read_only(self, action):
+        """Test that the color array is cached, read-only and refreshed by set_color."""
+        color = action.get_color()
+        assert action.get_color() is color
+        with pytest.raises(ValueError):
+            color[0] = 0
+        action.set_color((1, 2, 3))
+        assert np.array_equal(action.get_color(), [1, 2, 3])
+        assert np.array_equal(color, [100, 150, 200])
+
+    def test_hash_and_equality(self, action):
+        """Test that equal actions hash the same and the setters refresh the hash."""
+        other = Action((1, 2), 100, 150, 200)
+        assert other == action and hash(other) == hash(action)
+        other.set_location(2, 1)
+        assert other != action and hash(other) == hash(Action((2, 1), 100, 150, 200))
+        assert len({action, action.copy(), Action((1, 2), 100, 150, 200)}) == 1
+
+    def test_with_color_and_location(self, action):
+        """Test that with_color and with_location derive new actions and keep the original."""
+        parent = Action((0, 0), 0, 0, 0)
+        action.set_parent(parent)
+        action.get_color()
+
+        colored = action.with_color((1, 2, 3))
+        moved = action.with_location(5, 6)
+        assert colored == Action((1, 2), 1, 2, 3) and colored.get_parent() is parent
+        assert moved == Action((5, 6), 100, 150, 200) and moved.get_parent() is parent
+        assert action == Action((1, 2), 100, 150, 200)
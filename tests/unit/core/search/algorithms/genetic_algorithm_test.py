@@ -0,0 +1,98 @@
+from concurrent.futures import Future
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+from core.search.action import Action
+from core.search.algorithms.genetic_algorithm import GeneticAlgorithm
+from core.search.evaluated_individual import EvaluatedIndividual
+from core.search.fitness_value import FitnessValue
+from core.search.individual import Individual
+from core.search.service.crossover.single_point_crossover import SinglePointCrossover
+from core.search.service.randomness import Randomness
+
+
+def evaluated(value, actions=()):
+    individual = Individual()
+    for location in actions:
+        individual.add_action(Action(location, 1, 2, 3))
+    return EvaluatedIndividual(individual, FitnessValue(value, []))
+
+
+@pytest.fixture
+def algorithm():
+    randomness = Randomness({"seed": 42})
+    return GeneticAlgorithm(MagicMock(), randomness, MagicMock(), MagicMock(), {}, MagicMock(), MagicMock(),
+                            MagicMock(), MagicMock())
+
+
+def test_selection_excludes_the_individual(algorithm):
+    algorithm.population = [evaluated(value) for value in (0.0, 0.0, 5.0)]
+
+    for _ in range(200):
+        partners = algorithm.selection()
+        assert all(partner is not individual for partner, individual in zip(partners, algorithm.population))
+
+
+def test_selection_probabilities(algorithm):
+    fitness = np.array([0.1, 0.5, 0.9, 2.0, 0.3])
+    algorithm.population = [evaluated(value) for value in fitness]
+    probs = np.exp(1.0 - fitness) / np.exp(1.0 - fitness).sum()
+
+    counts = np.zeros((5, 5))
+    for _ in range(4000):
+        for i, partner in enumerate(algorithm.selection()):
+            counts[i, algorithm.population.index(partner)] += 1
+
+    for i in range(5):
+        expected = np.where(np.arange(5) == i, 0.0, probs / (1.0 - probs[i]))
+        assert np.allclose(counts[i] / 4000, expected, atol=0.03)
+
+
+def test_selection_single_individual(algorithm):
+    algorithm.population = [evaluated(0.5)]
+
+    assert algorithm.selection() == algorithm.population
+
+
+def test_search_once_keeps_the_population_parents(algorithm):
+    algorithm.crossover = SinglePointCrossover(algorithm.randomness, MagicMock(), {}, MagicMock())
+    algorithm.mutator.mutate_batch.side_effect = lambda individuals: individuals
+    algorithm.ff.get_max_in_flight.return_value = 1
+    algorithm.ff.calculate_fitness_batch.side_effect = lambda individuals: [evaluated(1.0) for _ in individuals]
+    algorithm.population = [evaluated(0.5, [(i, j) for j in range(4)]) for i in range(3)]
+    algorithm.population_size = 3
+    parents = [(ei.individual, ei.individual.get_locations().copy()) for ei in algorithm.population]
+
+    algorithm.search_once()
+
+    assert algorithm.ff.calculate_fitness_batch.call_count == 3
+    for individual, locations in parents:
+        assert np.array_equal(individual.get_locations(), locations)
+
+
+def completed(value):
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+def test_search_once_pipelines_the_generation(algorithm):
+    algorithm.crossover = MagicMock()
+    algorithm.mutator.mutate_batch.side_effect = lambda individuals: individuals
+    algorithm.ff.get_max_in_flight.return_value = 4
+    # The second child of every pair is the better one
+    algorithm.ff.submit_fitness.side_effect = lambda individual: completed(evaluated(individual.size() / 10))
+    algorithm.population = [evaluated(0.5, [(i, j) for j in range(4)]) for i in range(3)]
+    algorithm.population_size = 3
+    partners = [evaluated(0.5, [(9, 9)]) for _ in range(3)]
+    algorithm.selection = MagicMock(return_value=partners)
+
+    algorithm.search_once()
+
+    assert algorithm.ff.submit_fitness.call_count == 6
+    algorithm.ff.calculate_fitness_batch.assert_not_called()
+    assert not algorithm.pending_evaluations
+    assert [ei.fitness.value for ei in algorithm.population] == [0.1, 0.1, 0.1]
+    assert algorithm.archive.add_archive_if_needed.call_count == 3
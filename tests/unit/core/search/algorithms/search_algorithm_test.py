@@ -0,0 +1,59 @@
+from concurrent.futures import Future
+from unittest.mock import MagicMock
+
+import pytest
+
+from core.search.algorithms.search_algorithm import SearchAlgorithm
+from core.search.individual import Individual
+
+
+def completed(value):
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+@pytest.fixture
+def algorithm():
+    ff = MagicMock()
+    ff.submit_fitness.side_effect = lambda individual: completed(f"evaluated {individual}")
+    return SearchAlgorithm(ff, MagicMock(), MagicMock(), MagicMock(), {}, MagicMock(), MagicMock(), MagicMock(),
+                           MagicMock())
+
+
+def test_submit_evaluation_without_pipelining(algorithm):
+    algorithm.ff.get_max_in_flight.return_value = 1
+    consumed = []
+
+    algorithm.submit_evaluation("a", consumed.append)
+    assert consumed == ["evaluated a"]
+
+    algorithm.submit_evaluation("b", consumed.append)
+    assert consumed == ["evaluated a", "evaluated b"]
+
+
+def test_submit_evaluation_with_pipelining(algorithm):
+    algorithm.ff.get_max_in_flight.return_value = 3
+    consumed = []
+
+    algorithm.submit_evaluation("a", consumed.append)
+    algorithm.submit_evaluation("b", consumed.append)
+    assert consumed == []
+
+    algorithm.submit_evaluation("c", consumed.append)
+    assert consumed == ["evaluated a"]
+
+    algorithm.wait_pending_evaluations()
+    assert consumed == ["evaluated a", "evaluated b", "evaluated c"]
+
+
+def test_search_waits_pending_evaluations(algorithm):
+    algorithm.ff.get_max_in_flight.return_value = 4
+    algorithm.stc.should_continue_search.side_effect = [True, True, False]
+    consumed = []
+    algorithm.search_once = lambda: algorithm.submit_evaluation(Individual(), consumed.append)
+
+    algorithm.search()
+
+    assert len(consumed) == 2
+    assert not algorithm.pending_evaluations
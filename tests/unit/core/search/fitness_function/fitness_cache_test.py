@@ -0,0 +1,77 @@
+from concurrent.futures import Future
+
+import numpy as np
+import pytest
+
+from core.search.action import Action
+from core.search.service.fitness_function.fitness_cache import FitnessCache
+
+
+@pytest.fixture
+def image():
+    return np.zeros((4, 4, 3), dtype=np.uint8)
+
+
+def completed(value):
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+def test_key_is_canonical(image):
+    actions = [Action((1, 2), 10, 20, 30), Action((0, 3), 1, 2, 3)]
+    # Same pixels in a different order, plus a pixel that keeps its original color
+    same_pixels = [Action((0, 3), 1, 2, 3), Action((3, 3), 0, 0, 0), Action((1, 2), 10, 20, 30)]
+
+    assert FitnessCache.key(actions, image) == FitnessCache.key(same_pixels, image)
+    assert FitnessCache.key(actions, image) != FitnessCache.key(actions[:1], image)
+    assert FitnessCache.key([], image) == FitnessCache.key([Action((0, 0), 0, 0, 0)], image)
+
+
+def test_pixels_key_versions(image):
+    locations, colors = np.array([[1, 2]]), np.array([[10, 20, 30]])
+
+    assert FitnessCache.pixels_key(locations, colors, image) == FitnessCache.key([Action((1, 2), 10, 20, 30)], image)
+    assert FitnessCache.pixels_key(locations, colors, image, 1) == FitnessCache.pixels_key(locations, colors, image, 1)
+    assert FitnessCache.pixels_key(locations, colors, image, 1) != FitnessCache.pixels_key(locations, colors, image, 2)
+    assert FitnessCache.pixels_key(locations, colors, image, 0) != FitnessCache.pixels_key(locations, colors, image)
+
+
+def test_get_counts_hits_misses_and_coalesced(image):
+    cache = FitnessCache({"fitness_cache_size": 2})
+    in_flight = Future()
+    cache.put(b"done", completed("result"))
+    cache.put(b"in_flight", in_flight)
+
+    assert cache.get(b"unknown") is None
+    assert cache.get(b"done").result() == "result"
+    assert cache.get(b"in_flight") is in_flight
+
+    statistics = cache.get_statistics()
+    assert (statistics["hits"], statistics["misses"], statistics["coalesced"]) == (1, 1, 1)
+
+
+@pytest.mark.parametrize("eviction, evicted", [("lru", b"b"), ("fifo", b"a")])
+def test_eviction(eviction, evicted):
+    cache = FitnessCache({"fitness_cache_size": 2, "fitness_cache_eviction": eviction})
+    cache.put(b"a", completed(1))
+    cache.put(b"b", completed(2))
+    cache.get(b"a")
+    cache.put(b"c", completed(3))
+
+    assert evicted not in cache.entries
+    assert len(cache.entries) == 2
+    assert cache.get_statistics()["evictions"] == 1
+
+
+def test_failed_request_is_discarded():
+    cache = FitnessCache({"fitness_cache_size": 2})
+    future = Future()
+    cache.put(b"a", future)
+    future.set_exception(ConnectionError("Connection Error"))
+
+    assert b"a" not in cache.entries
+
+
+def test_disabled():
+    assert not FitnessCache({"fitness_cache_size": 0}).is_enabled()
@@ -8,6 +8,7 @@ from core.search.service.archive import Archive
 from core.search.service.fitness_function.targeted_fitness_function import TargetedFitnessFunction
 from core.search.service.randomness import Randomness
 from core.search.service.search_time_controller import SearchTimeController
+from core.utils.label_table import LabelTable
 
 
 # Mock classes for dependencies
@@ -20,14 +21,14 @@ class MockArchive(Archive):
         return "mock_image"
 
     def get_original_prediction_results(self):
-        return MagicMock(max_score=MagicMock(label="original_label"))
+        return MagicMock(max_score=MagicMock(label="original_label"), max_id=0)
 
 class MockRemoteController(RemoteController):
     def new_action(self, img_array):
         return MagicMock(
-            max_score=MagicMock(value=0.9, label="original_label"),
+            max_score=MagicMock(value=0.9, label="original_label"), max_id=0,
             second_max_score=MagicMock(value=0.1),
-            target_score=MagicMock(value=0.1, label="target_label"),
+            target_score=MagicMock(value=0.1, label="target_label"), target_id=2,
         )
 
 # Fixture for the FitnessFunction instance
@@ -36,8 +37,9 @@ def fitness_function():
     stc = MagicMock(spec=SearchTimeController)
     config = {}
     randomness = MagicMock(spec=Randomness)
-    archive = MockArchive(stc, randomness, config)
-    remote_controller = MockRemoteController(config, stc)
+    label_table = LabelTable()
+    archive = MockArchive(stc, randomness, config, label_table)
+    remote_controller = MockRemoteController(config, stc, label_table)
     stc = MagicMock(spec=SearchTimeController)
     return TargetedFitnessFunction(archive, remote_controller, stc, target="target_label")
 
@@ -57,8 +59,8 @@ def test_evaluate_with_non_matching_labels(fitness_function):
     # Modify the remote controller to return a non-matching label
     fitness_function.remote_controller.new_action = MagicMock()
     fitness_function.remote_controller.new_action.return_value = MagicMock(
-        max_score=MagicMock(value=0.5, label="target_label"),
-        target_score=MagicMock(value=0.5, label="target_label")
+        max_score=MagicMock(value=0.5, label="target_label"), max_id=2,
+        target_score=MagicMock(value=0.5, label="target_label"), target_id=2
     )
 
     # Create a mock individual
@@ -1,13 +1,21 @@
+from concurrent.futures import Future
+
+import numpy as np
 import pytest
 from unittest.mock import MagicMock
 
 from core.remote.remote_controller import RemoteController
+from core.search.action import Action
+from core.search.evaluated_individual import EvaluatedIndividual
 from core.search.fitness_value import FitnessValue
 from core.search.individual import Individual
 from core.search.service.archive import Archive
+from core.search.service.fitness_function.fitness_cache import FitnessCache
 from core.search.service.fitness_function.untargeted_fitness_function import UntargetedFitnessFunction
 from core.search.service.randomness import Randomness
 from core.search.service.search_time_controller import SearchTimeController
+from core.utils.label_table import LabelTable
+from core.utils.images import ProcessedImage
 
 
 # Mock classes for dependencies
@@ -20,12 +28,12 @@ class MockArchive(Archive):
         return "mock_image"
 
     def get_original_prediction_results(self):
-        return MagicMock(max_score=MagicMock(label="original_label"))
+        return MagicMock(max_score=MagicMock(label="original_label"), max_id=0)
 
 class MockRemoteController(RemoteController):
     def new_action(self, img_array):
         return MagicMock(
-            max_score=MagicMock(value=0.9, label="original_label"),
+            max_score=MagicMock(value=0.9, label="original_label"), max_id=0,
             second_max_score=MagicMock(value=0.1)
         )
 
@@ -35,8 +43,9 @@ def fitness_function():
     stc = MagicMock(spec=SearchTimeController)
     config = {}
     randomness = MagicMock(spec=Randomness)
-    archive = MockArchive(stc, randomness, config)
-    remote_controller = MockRemoteController(config, stc)
+    label_table = LabelTable()
+    archive = MockArchive(stc, randomness, config, label_table)
+    remote_controller = MockRemoteController(config, stc, label_table)
     stc = MagicMock(spec=SearchTimeController)
     return UntargetedFitnessFunction(archive, remote_controller, stc)
 
@@ -56,7 +65,7 @@ def test_evaluate_with_non_matching_labels(fitness_function):
     # Modify the remote controller to return a non-matching label
     fitness_function.remote_controller.new_action = MagicMock()
     fitness_function.remote_controller.new_action.return_value = MagicMock(
-        max_score=MagicMock(value=0.9, label="different_label"),
+        max_score=MagicMock(value=0.9, label="different_label"), max_id=1,
         second_max_score=MagicMock(value=0.1)
     )
 
@@ -69,3 +78,213 @@ def test_evaluate_with_non_matching_labels(fitness_function):
     # Assert that the fitness value is 0 (labels do not match)
     assert isinstance(result, FitnessValue)
     assert result.value == -0.8
+
+
+def mock_new_action_batch(remote_controller, results, serialize=lambda image: image):
+    """Replace new_action_batch, serializing the images as they are read, and return the list of them."""
+    sent = []
+
+    def new_action_batch(image_arrays):
+        sent.extend(serialize(image_array) for image_array in image_arrays)
+        return results[:len(sent)]
+
+    remote_controller.new_action_batch = MagicMock(side_effect=new_action_batch)
+    return sent
+
+
+def test_calculate_fitness_batch(fitness_function):
+    sent = mock_new_action_batch(fitness_function.remote_controller, [
+        MagicMock(max_score=MagicMock(value=0.9, label="original_label"), max_id=0, second_max_score=MagicMock(value=0.1)),
+        MagicMock(max_score=MagicMock(value=0.6, label="different_label"), max_id=1, second_max_score=MagicMock(value=0.4)),
+    ])
+
+    individuals = [MockIndividual(), MockIndividual()]
+    evaluated = fitness_function.calculate_fitness_batch(individuals)
+
+    fitness_function.remote_controller.new_action_batch.assert_called_once()
+    assert sent == ["mock_image_array", "mock_image_array"]
+    assert [ei.individual for ei in evaluated] == individuals
+    assert evaluated[0].fitness.value == pytest.approx(0.8)
+    assert evaluated[1].fitness.value == pytest.approx(-0.2)
+    assert fitness_function.stc.report_executed_individual_time.call_count == 2
+
+
+def test_calculate_fitness_batch_empty(fitness_function):
+    assert fitness_function.calculate_fitness_batch([]) == []
+
+
+def test_get_candidate_actions(fitness_function):
+    archive_action = Action((1, 1), 10, 10, 10)
+    overridden_action = Action((2, 2), 20, 20, 20)
+    fitness_function.archive.get_actions = MagicMock(return_value=[archive_action, overridden_action])
+
+    individual = Individual()
+    individual_action = Action((2, 2), 30, 30, 30)
+    individual.add_action(individual_action)
+
+    assert fitness_function.get_candidate_actions(individual) == [archive_action, individual_action]
+    assert fitness_function.get_candidate_actions(actions=[overridden_action]) == [overridden_action]
+
+
+def test_evaluate_delta(fitness_function):
+    fitness_function.remote_controller.wire_format = "delta"
+    fitness_function.remote_controller.new_action_delta = MagicMock(return_value=MagicMock(
+        max_score=MagicMock(value=0.9, label="original_label"), max_id=0,
+        second_max_score=MagicMock(value=0.1)
+    ))
+    fitness_function.archive.get_actions = MagicMock(return_value=[])
+
+    individual = Individual()
+    action = Action((2, 2), 30, 30, 30)
+    individual.add_action(action)
+
+    result = fitness_function.evaluate(individual)
+
+    fitness_function.remote_controller.new_action_delta.assert_called_once_with([action])
+    assert result.value == pytest.approx(0.8)
+
+
+def test_submit_fitness(fitness_function):
+    individual = MockIndividual()
+
+    future = fitness_function.submit_fitness(individual)
+
+    ei = future.result()
+    assert ei.individual is individual
+    assert ei.fitness.value == pytest.approx(0.8)
+    fitness_function.stc.report_executed_individual_time.assert_called_once()
+    assert fitness_function.get_max_in_flight() == 1
+
+
+@pytest.fixture
+def cached_fitness_function(fitness_function):
+    fitness_function.cache = FitnessCache({"fitness_cache_size": 8})
+    fitness_function.archive.image = ProcessedImage(None, None, np.zeros((4, 4, 3), dtype=np.uint8))
+    fitness_function.archive.get_actions = MagicMock(return_value=[])
+    fitness_function.remote_controller.new_action = MagicMock(return_value=MagicMock(
+        max_score=MagicMock(value=0.9, label="original_label"), max_id=0,
+        second_max_score=MagicMock(value=0.1)
+    ))
+    return fitness_function
+
+
+def test_evaluate_cached(cached_fitness_function):
+    first = MockIndividual()
+    first.add_action(Action((1, 1), 10, 10, 10))
+    same_pixels = MockIndividual()
+    same_pixels.add_action(Action((1, 1), 10, 10, 10))
+    same_pixels.add_action(Action((2, 2), 0, 0, 0))
+
+    assert cached_fitness_function.evaluate(first).value == pytest.approx(0.8)
+    assert cached_fitness_function.evaluate(same_pixels).value == pytest.approx(0.8)
+
+    cached_fitness_function.remote_controller.new_action.assert_called_once()
+    # The cache hit still counts as an evaluation for the search budget
+    cached_fitness_function.stc.new_individual_evaluation.assert_called_once()
+    assert cached_fitness_function.cache.get_statistics()["hits"] == 1
+
+
+def test_submit_fitness_coalesces_in_flight(cached_fitness_function):
+    nut_future = Future()
+    cached_fitness_function.remote_controller.submit_new_action = MagicMock(return_value=nut_future)
+    individuals = [MockIndividual(), MockIndividual()]
+    for individual in individuals:
+        individual.add_action(Action((1, 1), 10, 10, 10))
+
+    futures = [cached_fitness_function.submit_fitness(individual) for individual in individuals]
+    nut_future.set_result(MagicMock(max_score=MagicMock(value=0.9, label="original_label"), max_id=0,
+                                    second_max_score=MagicMock(value=0.1)))
+
+    cached_fitness_function.remote_controller.submit_new_action.assert_called_once()
+    assert [future.result().fitness.value for future in futures] == [pytest.approx(0.8)] * 2
+    assert cached_fitness_function.cache.get_statistics()["coalesced"] == 1
+
+
+def test_calculate_fitness_batch_cached(cached_fitness_function):
+    sent = mock_new_action_batch(cached_fitness_function.remote_controller, [
+        MagicMock(max_score=MagicMock(value=0.9, label="original_label"), max_id=0, second_max_score=MagicMock(value=0.1)),
+    ])
+    individuals = [MockIndividual(), MockIndividual()]
+    for individual in individuals:
+        individual.add_action(Action((1, 1), 10, 10, 10))
+
+    evaluated = cached_fitness_function.calculate_fitness_batch(individuals)
+
+    assert len(sent) == 1
+    assert [ei.fitness.value for ei in evaluated] == [pytest.approx(0.8)] * 2
+
+
+def test_calculate_fitness_batch_without_image_copies(cached_fitness_function):
+    archive = cached_fitness_function.archive
+    archive.get_mutated_image = MagicMock(side_effect=AssertionError("the image is copied"))
+    result = MagicMock(max_score=MagicMock(value=0.9, label="original_label"), max_id=0,
+                       second_max_score=MagicMock(value=0.1))
+    working_images = []
+
+    def serialize(image_array):
+        working_images.append(image_array is archive.working_image)
+        return image_array.tobytes()
+
+    sent = mock_new_action_batch(cached_fitness_function.remote_controller, [result] * 2, serialize)
+    individuals = [Individual(), Individual()]
+    individuals[0].add_action(Action((1, 1), 10, 10, 10))
+    individuals[1].add_action(Action((2, 3), 20, 20, 20))
+
+    cached_fitness_function.calculate_fitness_batch(individuals)
+
+    # Each candidate is serialized from the working image of the archive, which is reverted afterwards
+    assert working_images == [True, True]
+    assert [np.frombuffer(image, dtype=np.uint8).reshape((4, 4, 3))[location].tolist()
+            for image, location in zip(sent, [(1, 1), (2, 3)])] == [[10, 10, 10], [20, 20, 20]]
+    assert not np.frombuffer(sent[1], dtype=np.uint8).reshape((4, 4, 3))[1, 1].any()
+    assert not archive.working_image.any()
+
+
+def archive_individual(archive, *actions):
+    individual = Individual()
+    for action in actions:
+        individual.add_action(action)
+    archive.populations.append(EvaluatedIndividual(individual, FitnessValue(0.5, [])))
+    archive.version += 1
+
+
+def test_cache_key_does_not_walk_the_archive(cached_fitness_function):
+    archive = cached_fitness_function.archive
+    archive_individual(archive, Action((0, 0), 5, 5, 5))
+    archive.get_actions = MagicMock(side_effect=AssertionError("the archive is walked"))
+    individual = MockIndividual()
+    individual.add_action(Action((1, 1), 10, 10, 10))
+    # Same image: the second action writes the color the composite already has
+    same_pixels = MockIndividual()
+    same_pixels.add_action(Action((1, 1), 10, 10, 10))
+    same_pixels.add_action(Action((0, 0), 5, 5, 5))
+
+    key = cached_fitness_function.get_cache_key(individual)
+    assert cached_fitness_function.get_cache_key(same_pixels) == key
+
+    archive_individual(archive, Action((2, 2), 5, 5, 5))
+    assert cached_fitness_function.get_cache_key(individual) != key
+
+
+def test_get_candidate_actions_from_composite(cached_fitness_function):
+    archive = cached_fitness_function.archive
+    archive_individual(archive, Action((1, 1), 10, 10, 10), Action((2, 2), 20, 20, 20))
+    archive_individual(archive, Action((1, 1), 11, 11, 11))
+    individual = Individual()
+    individual.add_action(Action((2, 2), 30, 30, 30))
+
+    # The archived pixels come in the order of their last write
+    assert cached_fitness_function.get_candidate_actions(individual) == [Action((2, 2), 30, 30, 30),
+                                                                         Action((1, 1), 11, 11, 11)]
+
+
+def test_submit_fitness_does_not_log_cache_hits(cached_fitness_function):
+    individuals = [MockIndividual(), MockIndividual()]
+    for individual in individuals:
+        individual.add_action(Action((1, 1), 10, 10, 10))
+
+    for individual in individuals:
+        assert cached_fitness_function.submit_fitness(individual).result().fitness.value == pytest.approx(0.8)
+
+    cached_fitness_function.remote_controller.new_action.assert_called_once()
+    cached_fitness_function.stc.report_executed_individual_time.assert_called_once()
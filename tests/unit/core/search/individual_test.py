@@ -180,3 +180,120 @@ def test_individual_crossover():
     individual.crossover(other, position1, position2)
     assert individual.size() == 2
 
+
+
+def test_add_action_without_replace(individual):
+    individual.add_action(Action((1, 2), 100, 150, 200))
+
+    assert individual.add_action(Action((1, 2), 0, 0, 0), replace=False) is False
+    assert individual.get_actions() == [Action((1, 2), 100, 150, 200)]
+
+
+def test_struct_of_arrays(individual):
+    individual.add_action(Action((1, 2), 100, 150, 200))
+    individual.add_action(Action((3, 4), 50, 75, 100))
+
+    assert individual.get_locations().dtype == np.int16
+    assert individual.get_colors().dtype == np.uint8
+    assert individual.get_locations().tolist() == [[1, 2], [3, 4]]
+    assert individual.get_colors().tolist() == [[100, 150, 200], [50, 75, 100]]
+    assert individual.location_index == {(1, 2): 0, (3, 4): 1}
+
+
+def test_add_actions(individual):
+    individual.add_action(Action((1, 2), 100, 150, 200))
+
+    # The second action replaces the existing one, the last one replaces the third one
+    individual.add_actions(np.array([[3, 4], [1, 2], [5, 6], [5, 6]]),
+                           np.array([[1, 1, 1], [2, 2, 2], [3, 3, 3], [4, 4, 4]]))
+
+    assert individual.get_actions() == [Action((1, 2), 2, 2, 2), Action((3, 4), 1, 1, 1), Action((5, 6), 4, 4, 4)]
+
+    individual.add_actions(np.array([[1, 2], [7, 8]]), np.array([[9, 9, 9], [8, 8, 8]]), replace=False)
+    assert individual.get_action(0) == Action((1, 2), 2, 2, 2)
+    assert individual.get_action(3) == Action((7, 8), 8, 8, 8)
+
+
+def test_set_action(individual):
+    for i in range(3):
+        individual.add_action(Action((i, i), i, i, i))
+
+    individual.set_action(2, Action((5, 5), 9, 9, 9))
+    assert individual.get_actions() == [Action((0, 0), 0, 0, 0), Action((1, 1), 1, 1, 1), Action((5, 5), 9, 9, 9)]
+
+    # Moving an action onto the location of another one removes the other one
+    individual.set_action(2, Action((0, 0), 7, 7, 7))
+    assert individual.get_actions() == [Action((1, 1), 1, 1, 1), Action((0, 0), 7, 7, 7)]
+    assert individual.location_index == {(1, 1): 0, (0, 0): 1}
+
+
+def test_copy_is_independent(individual):
+    individual.add_action(Action((1, 2), 100, 150, 200))
+
+    copy = individual.copy()
+    copy.add_action(Action((3, 4), 50, 75, 100))
+    copy.set_action(0, Action((1, 2), 0, 0, 0))
+
+    assert copy == copy.copy()
+    assert individual.get_actions() == [Action((1, 2), 100, 150, 200)]
+    assert individual != copy
+
+
+def test_individual_crossover_location_collision():
+    individual = Individual()
+    other = Individual()
+    for i in range(3):
+        individual.add_action(Action((i, i), 1, 1, 1))
+        other.add_action(Action((2 - i, 2 - i), 2, 2, 2))
+
+    individual.crossover(other, 2, 1)
+
+    # The actions of the other individual replace the kept ones at the same locations
+    assert individual.get_actions() == [Action((0, 0), 2, 2, 2), Action((1, 1), 2, 2, 2)]
+
+
+def test_copy_on_write(individual):
+    """Test that copies share the buffers until one of them writes."""
+    for i in range(4):
+        individual.add_action(Action((i, i), i, i, i))
+    copy = individual.copy()
+    assert copy.location_buffer is individual.location_buffer
+
+    # Setting an action on shared buffers only overrides its slot
+    copy.set_action(1, Action((5, 6), 7, 7, 7))
+    assert copy.location_buffer is individual.location_buffer
+    assert copy.get_action(1) == Action((5, 6), 7, 7, 7)
+    assert copy.find((5, 6)) == 1 and copy.find((1, 1)) is None
+    assert individual.get_action(1) == Action((1, 1), 1, 1, 1)
+
+    # Reading the arrays writes the overrides into own buffers
+    assert copy.get_locations().tolist() == [[0, 0], [5, 6], [2, 2], [3, 3]]
+    assert copy.location_buffer is not individual.location_buffer
+    assert individual.get_locations().tolist() == [[0, 0], [1, 1], [2, 2], [3, 3]]
+    assert copy.location_index == {(0, 0): 0, (5, 6): 1, (2, 2): 2, (3, 3): 3}
+
+    # The original copies the buffers before writing as well
+    other = individual.copy()
+    individual.add_action(Action((9, 9), 9, 9, 9))
+    assert other.size() == 4 and individual.size() == 5
+    assert (9, 9) not in other.location_index
+
+
+def test_copy_on_write_overrides_swap_locations(individual):
+    """Test overrides that take the location of another overridden slot."""
+    individual.add_action(Action((0, 0), 1, 1, 1))
+    individual.add_action(Action((1, 1), 2, 2, 2))
+    copy = individual.copy()
+
+    copy.set_action(0, Action((2, 2), 1, 1, 1))
+    copy.set_action(1, Action((0, 0), 2, 2, 2))
+    copy.set_action(1, Action((3, 3), 2, 2, 2))
+    copy.set_action(1, Action((0, 0), 2, 2, 2))
+    assert copy.get_actions() == [Action((2, 2), 1, 1, 1), Action((0, 0), 2, 2, 2)]
+    assert copy.location_index == {(2, 2): 0, (0, 0): 1}
+
+    # An action at the location of another one removes it, on own buffers
+    copy = individual.copy()
+    copy.set_action(0, Action((1, 1), 5, 5, 5))
+    assert copy.get_actions() == [Action((1, 1), 5, 5, 5)]
+    assert individual.size() == 2
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+from unittest.mock import MagicMock
+
+from core.search.service.randomness import Randomness
+from core.search.service.sampler.gaussian_sampler import GaussianSampler
+
+
+@pytest.fixture
+def gaussian_sampler():
+    config = {
+        "seed": 42,
+        "min_action_size": 1,
+        "max_action_size": 20,
+        "image_width": 40,
+        "image_height": 30,
+        "mutation_sigma": 0,
+        "vectorized_sampling": True
+    }
+    image = np.random.default_rng(0).integers(0, 256, (30, 40, 3))
+    return GaussianSampler(Randomness(config), MagicMock(image=MagicMock(array=image)), config)
+
+
+@pytest.mark.parametrize("vectorized", [True, False])
+def test_sample_keeps_image_colors(gaussian_sampler, vectorized):
+    gaussian_sampler.config["vectorized_sampling"] = vectorized
+    image = gaussian_sampler.archive.image.array
+
+    for individual in gaussian_sampler.sample_batch(20):
+        locations = individual.get_locations()
+        assert 1 <= individual.size() < 20
+        assert len({tuple(location) for location in locations.tolist()}) == individual.size()
+        assert (individual.get_colors() == image[locations[:, 0], locations[:, 1]]).all()
+
+
+def test_sample_colors_clamps(gaussian_sampler):
+    gaussian_sampler.config["mutation_sigma"] = 1e9
+
+    colors = gaussian_sampler.sample_colors(np.array([[0, 0], [29, 39], [10, 20]]))
+
+    assert colors.shape == (3, 3)
+    assert set(colors.ravel().tolist()) <= {0, 255}
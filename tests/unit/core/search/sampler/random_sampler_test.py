@@ -1,7 +1,9 @@
+import numpy as np
 import pytest
 from unittest.mock import MagicMock
 from core.search.action import Action
 from core.search.individual import Individual
+from core.search.service.randomness import Randomness
 from core.search.service.sampler.random_sampler import RandomSampler
 
 # Fixture for the RandomSampler instance
@@ -82,3 +84,65 @@ def test_sample_with_retry(random_sampler):
     assert all(actions[0].get_color() == [255, 128, 0])
     assert actions[1].get_location() == (70, 80)
     assert all(actions[1].get_color() == [128, 0, 255])
+
+
+@pytest.fixture
+def vectorized_sampler():
+    config = {
+        "seed": 42,
+        "min_action_size": 1,
+        "max_action_size": 50,
+        "image_width": 40,
+        "image_height": 30,
+        "vectorized_sampling": True
+    }
+    return RandomSampler(Randomness(config), MagicMock(), config)
+
+
+def test_sample_random_action_bounds_non_square():
+    config = {"seed": 42, "image_width": 40, "image_height": 3}
+    sampler = RandomSampler(Randomness(config), MagicMock(), config)
+
+    locations = np.array([sampler.sample_random_action().get_location() for _ in range(200)])
+
+    # Locations are (row, column), the row is bounded by the height
+    assert locations[:, 0].max() == 2
+    assert locations[:, 1].max() > 2
+
+
+def test_sample_batch_vectorized(vectorized_sampler):
+    individuals = vectorized_sampler.sample_batch(100)
+
+    assert len(individuals) == 100
+    for individual in individuals:
+        locations = individual.get_locations()
+        assert 1 <= individual.size() < 50
+        assert len({tuple(location) for location in locations.tolist()}) == individual.size()
+        assert locations[:, 0].min() >= 0 and locations[:, 0].max() < 30
+        assert locations[:, 1].min() >= 0 and locations[:, 1].max() < 40
+        assert individual.get_colors().min() >= 0 and individual.get_colors().max() < 255
+
+
+def test_sample_vectorized_is_reproducible(vectorized_sampler):
+    vectorized_sampler.randomness.update_seed(7)
+    first = vectorized_sampler.sample()
+    vectorized_sampler.randomness.update_seed(7)
+    second = vectorized_sampler.sample()
+
+    assert first == second
+    assert (first.get_colors() == second.get_colors()).all()
+
+
+def test_sample_vectorized_all_pixels(vectorized_sampler):
+    vectorized_sampler.config.update({"min_action_size": 30 * 40, "max_action_size": 30 * 40})
+
+    individual = vectorized_sampler.sample()
+
+    assert individual.size() == 30 * 40
+    assert len({tuple(location) for location in individual.get_locations().tolist()}) == 30 * 40
+
+
+def test_sample_vectorized_more_actions_than_pixels(vectorized_sampler):
+    vectorized_sampler.config.update({"min_action_size": 2000, "max_action_size": 3000})
+
+    assert all(individual.size() == 30 * 40 for individual in vectorized_sampler.sample_batch(3))
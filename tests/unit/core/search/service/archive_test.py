@@ -14,6 +14,7 @@ from core.search.phase_controller import PhaseController
 from core.search.service.randomness import Randomness
 from core.search.service.search_time_controller import SearchTimeController
 from core.utils.images import ProcessedImage
+from core.utils.label_table import LabelTable
 from core.search.service.archive import Archive
 
 
@@ -23,7 +24,7 @@ def archive():
     randomness = MagicMock(spec=Randomness)
     config = {"image_width": 100, "image_height": 100}
     stc = SearchTimeController(config, pc = PhaseController())
-    return Archive(stc, randomness, config)
+    return Archive(stc, randomness, config, LabelTable())
 
 # Test cases
 def test_clean_population(archive):
@@ -131,15 +132,13 @@ def test_get_mutated_image(archive):
     archive.image = MagicMock(spec=ProcessedImage)
     archive.image.array = image_array
 
-    action1 = MagicMock(spec=Action)
-    action1.get_location.return_value = (0, 1)
-    action1.get_color.return_value = np.array([255, 255, 255])
-    action2 = MagicMock(spec=Action)
-    action2.get_location.return_value = (1, 2)
-    action2.get_color.return_value = np.array([128, 128, 128])
+    individual1 = Individual()
+    individual1.add_action(Action((0, 1), 255, 255, 255))
+    individual2 = Individual()
+    individual2.add_action(Action((1, 2), 128, 128, 128))
     archive.populations = [
-        MagicMock(individual=MagicMock(get_actions=MagicMock(return_value=[action1]))),
-        MagicMock(individual=MagicMock(get_actions=MagicMock(return_value=[action2])))
+        MagicMock(individual=individual1),
+        MagicMock(individual=individual2)
     ]
 
     # Get the mutated image
@@ -149,6 +148,85 @@ def test_get_mutated_image(archive):
     assert all(mutated_image[0][1] == [255, 255, 255])
     assert all(mutated_image[1][2] == [128, 128, 128])
 
+def test_composite_image_updated_on_archive(archive):
+    image_array = np.zeros((4, 4, 3), dtype=np.uint8)
+    archive.set_image(ProcessedImage(None, None, image_array))
+    archive.stc.set_current_fitness(FitnessValue(1.0, []))
+
+    individual1 = Individual()
+    individual1.add_action(Action((0, 1), 10, 10, 10))
+    individual1.add_action(Action((2, 2), 20, 20, 20))
+    archive.add_archive_if_needed(EvaluatedIndividual(individual1, FitnessValue(0.5, [])))
+    composite = archive.get_composite_image()
+
+    individual2 = Individual()
+    individual2.add_action(Action((2, 2), 30, 30, 30))
+    archive.add_archive_if_needed(EvaluatedIndividual(individual2, FitnessValue(0.4, [])))
+
+    # The composite is updated in place and the original image is kept
+    assert archive.get_composite_image() is composite
+    assert not image_array.any()
+    assert all(composite[0][1] == [10, 10, 10])
+    assert all(composite[2][2] == [30, 30, 30])
+    pixel_index = archive.get_pixel_index()
+    assert pixel_index[0][1] == 0 and pixel_index[2][2] == 2
+    assert (pixel_index >= 0).sum() == 2
+
+    mutated_image = archive.get_mutated_image()
+    assert np.array_equal(mutated_image, composite) and mutated_image is not composite
+
+    # The composite is rebuilt when the population is cleaned
+    archive.clean_population()
+    assert not archive.get_composite_image().any()
+    assert (archive.get_pixel_index() == -1).all()
+
+def test_get_mutated_image_with_actions(archive):
+    archive.set_image(ProcessedImage(None, None, np.zeros((4, 4, 3), dtype=np.uint8)))
+    individual = Individual()
+    individual.add_action(Action((0, 0), 1, 1, 1))
+    archive.populations = [MagicMock(individual=individual)]
+
+    # The provided actions replace the ones of the archive, the last one wins at a location
+    mutated_image = archive.get_mutated_image([Action((3, 3), 5, 5, 5), Action((3, 3), 7, 7, 7)])
+    assert not mutated_image[0][0].any()
+    assert all(mutated_image[3][3] == [7, 7, 7])
+    assert not archive.get_mutated_image([]).any()
+
+def test_apply_individual_reverts_working_image(archive):
+    archive.set_image(ProcessedImage(None, None, np.zeros((4, 4, 3), dtype=np.uint8)))
+    archived = Individual()
+    archived.add_action(Action((1, 1), 9, 9, 9))
+    archive.populations.append(MagicMock(individual=archived))
+
+    individual = Individual()
+    individual.add_action(Action((1, 1), 5, 5, 5))
+    individual.add_action(Action((2, 3), 7, 7, 7))
+    with archive.apply_individual(individual) as image:
+        working_image = image
+        assert all(image[1][1] == [5, 5, 5])
+        assert all(image[2][3] == [7, 7, 7])
+
+    # The overwritten pixels are restored and the buffer is reused
+    assert np.array_equal(working_image, archive.get_composite_image())
+    with archive.apply_individual() as image:
+        assert image is working_image
+
+    # A newly archived individual is applied to the working image as well
+    archive.populations.append(MagicMock(individual=individual))
+    with archive.apply_individual() as image:
+        assert np.array_equal(image, archive.get_composite_image())
+
+def test_apply_individual_without_buffer_reuse(archive):
+    archive.config["reuse_image_buffer"] = False
+    archive.set_image(ProcessedImage(None, None, np.zeros((4, 4, 3), dtype=np.uint8)))
+    individual = Individual()
+    individual.add_action(Action((0, 0), 5, 5, 5))
+
+    with archive.apply_individual(individual) as image:
+        image_copy = image
+    assert all(image_copy[0][0] == [5, 5, 5])
+    assert not archive.get_composite_image().any()
+
 def test_archive_extract(archive):
     # Mock the actions
     action1 = MagicMock(spec=Action)
@@ -182,3 +260,107 @@ def test_archive_extract(archive):
     assert solution.actions == [action2, action3]
 
 
+
+def test_extract_solution_memoized(archive):
+    archive.stc.set_current_fitness(FitnessValue(1.0, []))
+    individual1 = Individual()
+    individual1.add_action(Action((0, 0), 1, 1, 1))
+    individual1.add_action(Action((1, 1), 2, 2, 2))
+    archive.add_archive_if_needed(EvaluatedIndividual(individual1, FitnessValue(0.5, [])))
+
+    solution = archive.extract_solution()
+    assert archive.extract_solution() is solution
+    assert solution.fitness_value.value == 0.5
+
+    individual2 = Individual()
+    individual2.add_action(Action((0, 0), 3, 3, 3))
+    archive.add_archive_if_needed(EvaluatedIndividual(individual2, FitnessValue(0.4, [])))
+
+    # The solution is extracted again once an individual is archived, the last action of a location wins
+    solution2 = archive.extract_solution()
+    assert solution2 is not solution
+    assert solution2.actions == [Action((1, 1), 2, 2, 2), Action((0, 0), 3, 3, 3)]
+    assert solution2.fitness_value.value == 0.4
+
+def test_sample_individual_least_sampled(archive):
+    archive.randomness = Randomness({"seed": 42})
+    archive.stc.set_current_fitness(FitnessValue(1.0, []))
+    individuals = [EvaluatedIndividual(Individual(), FitnessValue(1.0 - i / 10, [])) for i in range(1, 4)]
+    for individual in individuals:
+        archive.add_archive_if_needed(individual)
+
+    sampled = [archive.sample_individual() for _ in range(3)]
+    assert {id(individual) for individual in sampled} == {id(individual) for individual in individuals}
+    assert archive.last_chosen is sampled[-1]
+
+    # An improvement from a parent resets its sampling counter, so it is sampled with the new individual
+    child = EvaluatedIndividual(Individual(), FitnessValue(0.1, []))
+    archive.add_archive_if_needed(child, sampled[0])
+    assert sampled[0].sampling_counter == 0
+    assert {id(archive.sample_individual()) for _ in range(2)} == {id(sampled[0]), id(child)}
+
+def archive_individuals(archive, locations_per_individual):
+    archive.stc.set_current_fitness(FitnessValue(1.0, []))
+    individuals = []
+    for i, locations in enumerate(locations_per_individual):
+        individual = Individual()
+        for location in locations:
+            individual.add_action(Action(location, i, i, i))
+        individuals.append(EvaluatedIndividual(individual, FitnessValue(0.9 - i / 100, [])))
+        archive.add_archive_if_needed(individuals[-1])
+    return individuals
+
+def test_archive_not_shrunk_by_default(archive):
+    archive.set_image(ProcessedImage(None, None, np.zeros((4, 4, 3), dtype=np.uint8)))
+    individuals = archive_individuals(archive, [[(0, 0)]] * (2 * Archive.MIN_SHRINK_SIZE))
+
+    # Every individual stays sampleable, even if shadowed by a later one
+    assert archive.populations == individuals
+    assert len(archive.get_sampling_buckets()) == len(individuals)
+
+def test_shrink_archive_drops_shadowed(archive):
+    archive.drop_shadowed = True
+    archive.set_image(ProcessedImage(None, None, np.zeros((4, 4, 3), dtype=np.uint8)))
+    individuals = archive_individuals(archive, [[(0, 0)], [(0, 0), (1, 1)], [(1, 1)], [(0, 0)]])
+    composite = archive.get_composite_image().copy()
+
+    archive.shrink_archive()
+
+    # The first individual is overwritten by the second one, the second one by the last two
+    assert archive.populations == individuals[2:]
+    assert np.array_equal(archive.get_composite_image(), composite)
+    assert archive.populations_bytes == sum(ei.get_memory_size() for ei in individuals[2:])
+
+def test_archive_max_size_merges_oldest(archive):
+    archive.config["archive_max_size"] = 3
+    archive = Archive(archive.stc, archive.randomness, archive.config, archive.label_table)
+    archive.set_image(ProcessedImage(None, None, np.zeros((4, 4, 3), dtype=np.uint8)))
+    individuals = archive_individuals(archive, [[(0, 0)], [(0, 0), (1, 1)], [(2, 2)], [(3, 3)], [(0, 1)]])
+
+    expected_image = np.zeros((4, 4, 3), dtype=np.uint8)
+    for ei in individuals:
+        ei.individual.get_action_image(expected_image)
+
+    # The archive is shrunk when it exceeds its size, keeping its image and solution
+    assert archive.number_of_population() == 3
+    assert archive.populations[1:] == individuals[3:]
+    merged = archive.populations[0]
+    assert merged.fitness is individuals[2].fitness
+    assert merged.individual.get_actions() == [Action((0, 0), 1, 1, 1), Action((1, 1), 1, 1, 1),
+                                                Action((2, 2), 2, 2, 2)]
+    assert np.array_equal(archive.get_composite_image(), expected_image)
+    assert len(archive.extract_solution().actions) == 5
+    # The merged individual only keeps the image, it is not sampled
+    archive.randomness = Randomness({"seed": 42})
+    assert {id(archive.sample_individual()) for _ in range(6)} == {id(ei) for ei in individuals[3:]}
+
+def test_archive_max_bytes(archive):
+    archive.config["archive_max_bytes"] = 1
+    archive = Archive(archive.stc, archive.randomness, archive.config, archive.label_table)
+    archive_individuals(archive, [[(0, 0)], [(1, 1)], [(2, 2)]])
+
+    # The bound cannot be met, so all the individuals are merged into one
+    assert archive.number_of_population() == 1
+    assert archive.populations[0].individual.size() == 3
+    assert archive.get_memory_size() == archive.populations[0].get_memory_size()
+    assert archive.sample_individual() is None
@@ -21,6 +21,8 @@ class TestSearchStatusUpdater:
         mock_time.get_seconds_since_last_improvement.return_value = 5  # 5 seconds
         mock_time.get_current_fitness_value.return_value = 0.5  # 50% fitness
         mock_archive.number_of_covered_targets.return_value = 42  # 42 covered targets
+        mock_archive.number_of_population.return_value = 3
+        mock_archive.get_memory_size.return_value = 3 * 2 ** 20
 
         # Create the SearchStatusUpdater instance
         return SearchStatusUpdater(mock_time, mock_config, mock_archive)
@@ -42,6 +44,7 @@ class TestSearchStatusUpdater:
         assert "* Consumed search budget: 50.000%" in output
         assert "* Action size: 0; time per test: 100.0ms (10.0 actions); since" in output
         assert "fitness: 0.5" in output
+        assert "archive: 3 individuals (3.0MB)" in output
 
     def test_new_action_evaluated_skips_when_disabled(self, updater):
         # Disable the updater
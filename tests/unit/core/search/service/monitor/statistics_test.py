@@ -11,6 +11,8 @@ from core.search.service.archive import Archive
 from core.search.service.monitor.statistics import Statistics
 from core.search.service.search_time_controller import SearchTimeController
 from core.search.solution import Solution
+from core.utils.label_table import LabelTable
+from core.utils.nut_request import NutRequest
 
 # Fixture for the Statistics instance
 @pytest.fixture
@@ -29,7 +31,7 @@ def statistics():
         "image_width": 100,
         "image_height": 100
     }
-    return Statistics(stc, archive, config)
+    return Statistics(stc, archive, config, LabelTable())
 
 
 def test_new_action_evaluated_with_snapshot(statistics):
@@ -203,6 +205,8 @@ def test_save_statistics(statistics):
     statistics.stc.get_evaluated_individuals.return_value = 100
     statistics.stc.current_fitness_value = MagicMock(spec=FitnessValue)
     statistics.stc.current_fitness_value.value = 0.5
+    statistics.archive.number_of_population.return_value = 2
+    statistics.archive.get_memory_size.return_value = 4096
 
     # Call the save_data_as_json method
     statistics.save_statistics()
@@ -217,8 +221,50 @@ def test_save_statistics(statistics):
         assert data["execution_time"] == 10
         assert data["eval_count"] == 100
         assert data["current_fitness"] == 0.5
+        assert data["archive_individuals"] == 2
+        assert data["archive_bytes"] == 4096
         # TODO - we need to fix and activate these assertions.
         # assert data["predictions"] == {"label1": [0.1]}
         # assert data["action_size"] == 1
         # assert data["changes"] == [{"location": (50, 50), "color": [255, 0, 0]}]
         assert data["config"] == statistics.config
+
+
+def test_save_statistics_nut_endpoints(statistics):
+    statistics.snapshots = []
+    statistics.stc.get_elapsed_seconds.return_value = 10
+    statistics.stc.get_evaluated_individuals.return_value = 100
+    statistics.stc.current_fitness_value = MagicMock(spec=FitnessValue)
+    statistics.stc.current_fitness_value.value = 0.5
+    endpoint_statistics = [{"url": "http://localhost:38000/api/v1", "healthy": True, "requests": 3,
+                            "failures": 0, "latency_avg_ms": 2.0, "latency_min_ms": 1.0, "latency_max_ms": 3.0}]
+    statistics.remote_controller = MagicMock()
+    statistics.remote_controller.get_statistics.return_value = endpoint_statistics
+
+    statistics.save_statistics()
+
+    with open(f"{statistics.output_dir}/{statistics.statistics_file_name}.json", "r") as file:
+        data = json.load(file)
+        assert data["nut_endpoints"] == endpoint_statistics
+
+def test_get_prediction_series(statistics):
+    # Snapshots of dense score vectors of the label table and of a plain prediction list
+    label_table = statistics.label_table
+    predictions = [
+        NutRequest.from_scores(["label1", "label2"], [0.7, 0.3], label_table=label_table).predictions,
+        NutRequest.from_scores(["label1", "label2", "label3"], [0.2, 0.5, 0.3], label_table=label_table).predictions,
+        [MagicMock(label="label3", value=0.9)],
+        NutRequest.from_scores(["label1", "label2", "label3"], [0.25, 0.5, 0.25],
+                               label_table=label_table).get_predictions(top_k=1),
+    ]
+    statistics.snapshots = []
+    for prediction in predictions:
+        solution = MagicMock(spec=Solution)
+        solution.fitness_value = FitnessValue(0.1, prediction)
+        statistics.snapshots.append(solution)
+
+    assert statistics.get_prediction_series() == {
+        "label1": [0.7, 0.2, 0.0, 0.0],
+        "label2": [0.3, 0.5, 0.0, 0.5],
+        "label3": [0.0, 0.3, 0.9, 0.0],
+    }
@@ -6,6 +6,7 @@ from core.search.action import Action
 from core.search.individual import Individual
 from core.search.phase_controller import PhaseController
 from core.search.service.adaptive_parameter_control import AdaptiveParameterControl
+from core.search.service.mutator.one_zero_mutator import OneZeroMutator
 from core.search.service.mutator.standard_mutator import StandardMutator
 from core.search.service.randomness import Randomness
 from core.search.service.search_time_controller import SearchTimeController
@@ -83,3 +84,72 @@ def not_test_apply_gaussian_mutation_with_limit_values(standard_mutator):
 
     # Assert that the color was clamped to the limit values
     assert result.get_color() == pytest.approx([255, 255, 255])
+
+
+def individuals_with_actions(size):
+    individuals = []
+    for i in range(size):
+        individual = Individual()
+        individual.add_action(Action((i, i), 100, 150, 200))
+        individual.add_action(Action((i, i + 1), 10, 20, 30))
+        individuals.append(individual)
+    return individuals
+
+
+def test_mutate_batch_zero_sigma(standard_mutator):
+    """Test that a batch mutation with zero sigmas keeps the actions and the originals."""
+    standard_mutator.apc.get_pixel_apc = MagicMock(return_value=0)
+    standard_mutator.apc.get_location_apc = MagicMock(return_value=0)
+    individuals = individuals_with_actions(5) + [Individual()]
+
+    mutated = standard_mutator.mutate_batch(individuals)
+
+    assert len(mutated) == 6
+    for individual, child in zip(individuals, mutated):
+        assert child == individual and child is not individual
+
+
+def test_mutate_batch_clamps(standard_mutator):
+    """Test that a batch mutation changes one action per individual, clamped to the image and colors."""
+    standard_mutator.apc.get_pixel_apc = MagicMock(return_value=1000)
+    standard_mutator.apc.get_location_apc = MagicMock(return_value=1000)
+    individuals = individuals_with_actions(20)
+
+    mutated = standard_mutator.mutate_batch(individuals)
+
+    for individual, child in zip(individuals, mutated):
+        assert child.size() <= 2
+        assert ((child.get_locations() >= 0) & (child.get_locations() < 224)).all()
+        # The colors are uint8, so the clamped colors are checked on the unchanged action
+        kept = [action for action in child.get_actions() if action in individual.get_actions()]
+        assert len(kept) == 1
+        assert individual.get_actions() == [Action((individual.get_action(0).location), 100, 150, 200),
+                                            Action((individual.get_action(1).location), 10, 20, 30)]
+
+
+def test_mutate_arrays_clamps(standard_mutator):
+    """Test that the mutated arrays are clamped to the colors and the image."""
+    standard_mutator.apc.get_pixel_apc = MagicMock(return_value=1e9)
+    standard_mutator.apc.get_location_apc = MagicMock(return_value=1e9)
+
+    locations, colors = standard_mutator.mutate_arrays(np.full((100, 2), 100), np.full((100, 3), 100))
+
+    assert set(np.unique(colors)) == {0, 255}
+    assert set(np.unique(locations)) == {0, 223}
+
+
+@pytest.mark.parametrize("one_rate, zero_rate, color", [(1.0, 0.0, 255), (0.0, 1.0, 0)])
+def test_one_zero_mutate_batch(one_rate, zero_rate, color):
+    """Test that the one and zero mutation rates are honoured by the batch mutation."""
+    config = {"seed": 42, "image_height": 224, "image_width": 224, "one_mutation_rate": one_rate,
+              "zero_mutation_rate": zero_rate}
+    apc = MagicMock(get_pixel_apc=MagicMock(return_value=5), get_location_apc=MagicMock(return_value=0))
+    mutator = OneZeroMutator(Randomness(config), MagicMock(), config, apc)
+    individuals = individuals_with_actions(10)
+
+    mutated = mutator.mutate_batch(individuals)
+
+    for individual, child in zip(individuals, mutated):
+        changed = [action for action in child.get_actions() if action not in individual.get_actions()]
+        assert len(changed) == 1
+        assert changed[0].get_color().tolist() == [color] * 3
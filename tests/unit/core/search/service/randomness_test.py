@@ -1,7 +1,11 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 import pytest
 
 from main import OptiAttack
 from core.problem.base_module import BaseModule
+from core.search.service.randomness import Randomness
 
 
 @pytest.fixture
@@ -61,3 +65,58 @@ def test_random_gaussian(app):
     b = "".join(str(app.randomness.random_gaussian(mean, std)) for _ in range(100))
 
     assert a == b
+
+
+def test_pooled_draws_are_reproducible():
+    randomness = Randomness({"seed": 42, "random_pool_size": 16})
+
+    def draws():
+        return ([randomness.next_int(0, 10) for _ in range(40)], [randomness.next_bool(0.5) for _ in range(40)],
+                [randomness.random_gaussian(1, 2) for _ in range(40)], randomness.next_ints(0, np.full(5, 10)).tolist())
+
+    randomness.update_seed(42)
+    a = draws()
+    randomness.update_seed(42)
+    b = draws()
+
+    assert a == b
+    assert all(0 <= value < 10 for value in a[0])
+    assert set(a[1]) == {True, False}
+
+
+def test_instances_do_not_share_state():
+    first = Randomness({"seed": 42})
+    second = Randomness({"seed": 42})
+
+    a = [first.next_int(0, 1000) for _ in range(20)]
+    # Draws from another instance do not move the stream of the first one
+    second.next_float()
+    first.update_seed(42)
+
+    assert [first.next_int(0, 1000) for _ in range(20)] == a
+
+
+def run_attacks(attacks: int, workers: int) -> list:
+    streams = Randomness({"seed": 42, "random_pool_size": 8}).spawn(attacks)
+
+    def attack(randomness):
+        return [randomness.next_int(0, 1000) for _ in range(50)] + [randomness.random_gaussian(0, 1)]
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(attack, streams))
+
+
+def test_spawn_is_reproducible_across_worker_counts():
+    results = [run_attacks(8, workers) for workers in (1, 2, 4, 8)]
+
+    assert all(result == results[0] for result in results)
+    assert len({tuple(stream) for stream in results[0]}) == 8
+
+
+def test_spawn_does_not_depend_on_count():
+    randomness = Randomness({"seed": 42})
+    two = [child.next_float() for child in randomness.spawn(2)]
+    randomness.update_seed(42)
+    four = [child.next_float() for child in randomness.spawn(4)]
+
+    assert four[:2] == two
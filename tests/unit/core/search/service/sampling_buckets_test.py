@@ -0,0 +1,65 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from core.search.evaluated_individual import EvaluatedIndividual
+from core.search.individual import Individual
+from core.search.service.randomness import Randomness
+from core.search.service.sampling_buckets import SamplingBuckets
+
+
+@pytest.fixture
+def randomness():
+    return Randomness({"seed": 42})
+
+
+def evaluated_individuals(size):
+    return [EvaluatedIndividual(Individual(), MagicMock()) for _ in range(size)]
+
+
+def test_sample_least_sampled(randomness):
+    buckets = SamplingBuckets()
+    individuals = evaluated_individuals(5)
+    for individual in individuals:
+        buckets.add(individual)
+
+    # Every individual is sampled once before any is sampled twice
+    first_round = {id(buckets.sample(randomness)) for _ in range(5)}
+    assert first_round == {id(individual) for individual in individuals}
+    assert all(individual.sampling_counter == 1 for individual in individuals)
+    assert buckets.sample(randomness).sampling_counter == 2
+    assert len(buckets) == 5
+
+
+def test_reset_and_remove(randomness):
+    buckets = SamplingBuckets()
+    individuals = evaluated_individuals(3)
+    for individual in individuals:
+        buckets.add(individual)
+    for _ in range(3):
+        buckets.sample(randomness)
+
+    buckets.reset(individuals[1])
+    assert individuals[1].sampling_counter == 0
+    assert buckets.sample(randomness) is individuals[1]
+
+    buckets.remove(individuals[0])
+    assert individuals[0] not in buckets
+    assert {id(buckets.sample(randomness)) for _ in range(2)} == {id(individuals[1]), id(individuals[2])}
+
+    # An individual out of the buckets is only reset
+    buckets.reset(individuals[0])
+    assert individuals[0].sampling_counter == 0 and individuals[0] not in buckets
+
+
+def test_sample_single_individual(randomness):
+    buckets = SamplingBuckets()
+    individual = evaluated_individuals(1)[0]
+    buckets.add(individual)
+    for counter in range(1, 100):
+        assert buckets.sample(randomness) is individual
+        assert buckets.min_counter == counter
+
+    buckets.remove(individual)
+    with pytest.raises(IndexError):
+        buckets.sample(randomness)
@@ -6,6 +6,8 @@ from PIL import Image
 
 from core.utils.images import read_image, resize_image, img_to_array
 from core.utils.incremental_average import IncrementalAverage
+from core.utils.label_table import LabelTable
+from core.utils.nut_request import NutRequest
 
 
 def test_image_read():
@@ -85,4 +87,79 @@ def not_test_add_value_after_timer():
 
     avg.add_value(50)
     assert avg.n == 2
-    assert avg.mean == pytest.approx((avg.mean * 1 + 50) / 2, rel=1e-1)
\ No newline at end of file
+    assert avg.mean == pytest.approx((avg.mean * 1 + 50) / 2, rel=1e-1)
+
+
+def test_nut_request():
+    request = NutRequest({"predictions": [{"label": "cat", "score": 0.2}, {"label": "dog", "score": 0.7},
+                                          {"label": "fox", "score": 0.1}]}, target="fox")
+
+    assert (request.max_score.label, request.max_score.value) == ("dog", 0.7)
+    assert (request.second_max_score.label, request.second_max_score.value) == ("cat", 0.2)
+    assert request.target_score.value == 0.1
+    # The predictions keep the response order
+    assert [label.label for label in request.predictions] == ["cat", "dog", "fox"]
+    assert request.predictions[0].value == 0.2
+
+
+def test_nut_request_from_scores():
+    request = NutRequest.from_scores(["a", "b", "c", "d"], np.array([0.1, 0.4, 0.4, 0.1], dtype=np.float32), "e")
+
+    # Ties are broken by the order of the labels
+    assert request.max_score.label == "b"
+    assert request.second_max_score.label == "c"
+    # A target the NUT did not return has a zero score
+    assert request.target_score.value == 0.0
+    assert NutRequest.from_scores(["a"], [1.0]).second_max_score.value == 0.0
+
+
+def test_nut_request_ties():
+    request = NutRequest.from_scores(["0", "1", "2", "3"], [0.3, 0.3, 0.1, 0.3])
+
+    # The first equal maxima in response order
+    assert (request.max_score.label, request.second_max_score.label) == ("0", "1")
+    # The top_k best scores with the equal ones in label id order
+    assert [label.label for label in request.get_predictions(top_k=2)] == ["0", "1"]
+    assert [label.label for label in request.get_predictions(top_k=3)] == ["0", "1", "3"]
+    assert NutRequest.from_scores(["a", "b", "c"], [0.5, 0.5, 0.5]).max_score.label == "a"
+
+
+def test_label_table():
+    label_table = LabelTable(["cat", "dog"])
+
+    assert label_table.get_id("dog") == 1
+    assert label_table.get_id("fox") == 2
+    assert list(label_table.get_ids(["fox", "cat"])) == [2, 0]
+    assert label_table.find("owl") is None
+    assert label_table.get_label(2) == "fox"
+    assert len(label_table) == 3
+
+
+def test_nut_request_shared_label_table():
+    label_table = LabelTable(["cat", "dog", "fox"])
+
+    request = NutRequest({"predictions": [{"label": "fox", "score": 0.6}, {"label": "cat", "score": 0.4}]},
+                         target="dog", label_table=label_table)
+
+    assert (request.max_id, request.second_max_id, request.target_id) == (2, 0, 1)
+    # Dense score vector indexed by label id, zero for the labels the NUT did not return
+    assert list(request.scores) == [0.4, 0.0, 0.6]
+    assert request.target_score.value == 0.0
+    assert NutRequest.from_ids(label_table, np.array([1, 2]), [0.9, 0.1]).max_id == 1
+
+
+def test_nut_request_compact_predictions():
+    label_table = LabelTable(["cat", "dog", "fox", "owl"])
+    request = NutRequest.from_scores(["cat", "dog", "fox", "owl"], [0.1, 0.05, 0.6, 0.25], target="dog",
+                                     label_table=label_table)
+
+    predictions = request.get_predictions()
+    assert predictions.scores.dtype == np.float32
+    assert [label.label for label in predictions] == ["cat", "dog", "fox", "owl"]
+    assert predictions.get_memory_size() == 16
+
+    # The best scores first, plus the target
+    top_predictions = request.get_predictions(top_k=2)
+    assert [label.label for label in top_predictions] == ["fox", "owl", "dog"]
+    assert list(top_predictions.get_ids()) == [2, 3, 1]
+    assert top_predictions[0].value == pytest.approx(0.6)